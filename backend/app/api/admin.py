@@ -0,0 +1,143 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, Any, Optional
+import asyncio
+import secrets
+import logging
+from app.models.model_registry import model_registry
+from app.utils.degradation import degradation_controller, MAX_LEVEL
+from app.utils.diagnostics import (
+    cpu_profiler, memory_tracker, get_rss_bytes, get_model_parameter_bytes
+)
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+async def require_admin_key(x_admin_key: Optional[str] = Header(None)) -> None:
+    """Reject requests without the configured admin key."""
+    if not settings.ADMIN_API_KEY:
+        raise HTTPException(
+            status_code=403,
+            detail="Admin endpoints are disabled (ADMIN_API_KEY not set)"
+        )
+    if not secrets.compare_digest(x_admin_key or "", settings.ADMIN_API_KEY):
+        raise HTTPException(
+            status_code=403,
+            detail="Invalid admin key"
+        )
+
+admin_router = APIRouter(dependencies=[Depends(require_admin_key)])
+
+@admin_router.get("/models/versions")
+async def get_model_versions() -> Dict[str, Any]:
+    return {
+        "models": model_registry.get_versions_info()
+    }
+
+@admin_router.post("/models/{model_name}/reload", status_code=202)
+async def reload_model(model_name: str, source: Optional[str] = None) -> Dict[str, Any]:
+    if model_registry.loader is None or model_name not in model_registry.loader.model_names:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown model: {model_name}"
+        )
+
+    if not model_registry.reload_async(model_name, source):
+        raise HTTPException(
+            status_code=409,
+            detail=f"A reload of {model_name} is already in progress"
+        )
+
+    logger.info(f"Hot reload of {model_name} requested (source={source})")
+    return {
+        "status": "reloading",
+        "model": model_name,
+        "current_version": model_registry.get_version_key(model_name)
+    }
+
+@admin_router.get("/degradation")
+async def get_degradation_status() -> Dict[str, Any]:
+    return degradation_controller.status()
+
+@admin_router.post("/degradation")
+async def set_degradation_level(level: Optional[int] = Query(None, ge=0, le=MAX_LEVEL)) -> Dict[str, Any]:
+    """Pin a degradation level, or go back to the automatic level when `level` is omitted."""
+    degradation_controller.force(level)
+    logger.info(f"Degradation level {'set to ' + str(level) if level is not None else 'back to automatic'}")
+    return degradation_controller.status()
+
+@admin_router.post("/profile/cpu/start")
+async def start_cpu_profile(
+    seconds: Optional[float] = Query(None, gt=0, le=600),
+    interval_ms: float = Query(10, ge=1, le=1000)
+) -> Dict[str, Any]:
+    if not cpu_profiler.start(interval=interval_ms / 1000, duration=seconds):
+        raise HTTPException(
+            status_code=409,
+            detail="A CPU profile is already running"
+        )
+    return {
+        "status": "profiling",
+        "seconds": seconds,
+        "interval_ms": interval_ms
+    }
+
+@admin_router.post("/profile/cpu/stop", response_class=PlainTextResponse)
+async def stop_cpu_profile() -> str:
+    # stop() joins the sampler thread
+    return await run_in_threadpool(cpu_profiler.stop)
+
+@admin_router.get("/profile/cpu", response_class=PlainTextResponse)
+async def run_cpu_profile(
+    seconds: float = Query(10, gt=0, le=120),
+    interval_ms: float = Query(10, ge=1, le=1000)
+) -> str:
+    if not cpu_profiler.start(interval=interval_ms / 1000, duration=seconds):
+        raise HTTPException(
+            status_code=409,
+            detail="A CPU profile is already running"
+        )
+    await asyncio.sleep(seconds)
+    return await run_in_threadpool(cpu_profiler.stop)
+
+@admin_router.post("/memory/tracemalloc/start")
+async def start_tracemalloc(frames: int = Query(25, ge=1, le=100)) -> Dict[str, Any]:
+    await run_in_threadpool(memory_tracker.start, frames)
+    return {"status": "tracing", "frames": frames}
+
+@admin_router.post("/memory/tracemalloc/snapshot")
+async def take_tracemalloc_snapshot(
+    limit: int = Query(20, ge=1, le=200),
+    key_type: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    path_filter: Optional[str] = None
+) -> Dict[str, Any]:
+    try:
+        # Taking, filtering and diffing snapshots can take seconds with many traced frames
+        return await run_in_threadpool(
+            memory_tracker.snapshot, limit=limit, key_type=key_type, path_filter=path_filter
+        )
+    except RuntimeError as e:
+        # Stopped, possibly by a concurrent request
+        raise HTTPException(
+            status_code=409,
+            detail=str(e)
+        )
+
+@admin_router.post("/memory/tracemalloc/stop")
+async def stop_tracemalloc() -> Dict[str, Any]:
+    # Frees every trace
+    await run_in_threadpool(memory_tracker.stop)
+    return {"status": "stopped"}
+
+@admin_router.get("/memory")
+async def get_memory_report() -> Dict[str, Any]:
+    return {
+        "rss_bytes": get_rss_bytes(),
+        "model_parameter_bytes": {
+            name: get_model_parameter_bytes(model)
+            for name, model in model_registry.get_all_models().items()
+        },
+        "tracemalloc_running": memory_tracker.running,
+        "cpu_profiler_running": cpu_profiler.running
+    }
@@ -0,0 +1,287 @@
+import math
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from fastapi import HTTPException, Request
+from app.utils.metrics import metrics
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, served strictly in this order
+PRIORITIES = ["interactive", "bulk"]
+
+# Per-client state is pruned once this many clients are tracked
+MAX_TRACKED_CLIENTS = 10000
+
+# Retry-After sent when no token will ever be available (quota with a rate of 0)
+MAX_RETRY_AFTER = 3600
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate` tokens per second."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, cost: int = 1) -> Tuple[bool, float]:
+        """
+        Take `cost` tokens if available.
+
+        A cost above the burst could never be paid at once: it is admitted when the
+        bucket is full and leaves the bucket in debt until the tokens refill.
+
+        Returns:
+            (acquired, seconds until enough tokens are available)
+        """
+        self._refill(time.monotonic())
+        needed = min(cost, self.burst)
+        if self.tokens >= needed:
+            self.tokens -= cost
+            return True, 0.0
+        if self.rate <= 0:
+            return False, float("inf")
+        return False, (needed - self.tokens) / self.rate
+
+    def is_full(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.burst
+
+class Ticket:
+    """A prediction request waiting for, or holding, an inference slot."""
+
+    def __init__(self, client_id: str, priority: str, weight: float, cost: int = 1):
+        self.client_id = client_id
+        self.priority = priority
+        self.weight = weight
+        self.cost = cost
+        self.enqueued_at = time.perf_counter()
+        self.granted_at: Optional[float] = None
+        self.start_tag = 0.0
+        self.cancelled = False
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    @property
+    def queue_wait(self) -> float:
+        """Seconds spent waiting for a slot."""
+        end = self.granted_at if self.granted_at is not None else time.perf_counter()
+        return end - self.enqueued_at
+
+class AdmissionController:
+    """
+    Admission control for the prediction routes.
+
+    Each client (API key or IP) has a token bucket. Admitted requests wait for
+    one of MAX_CONCURRENT_PREDICTIONS slots; waiting requests are ordered by
+    priority class, then by weighted fair queuing between clients so one bulk
+    client cannot starve the others.
+    """
+
+    def __init__(self):
+        self.slots = max(1, settings.MAX_CONCURRENT_PREDICTIONS)
+        self.active = 0
+        self.queued = 0
+        self._buckets: Dict[str, TokenBucket] = {}
+        # Weighted fair queuing state: global virtual time and last finish tag per client
+        self._virtual_time = 0.0
+        self._finish_tags: Dict[str, float] = {}
+        self._queues: Dict[str, List] = {priority: [] for priority in PRIORITIES}
+        self._sequence = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def attach_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Set the event loop worker threads go through (see admit_from_thread)."""
+        self._loop = loop
+
+    @property
+    def queue_depth(self) -> int:
+        return self.queued
+
+    def identify(self, request: Request) -> Tuple[str, Dict]:
+        """
+        Identify the client of a request and its quota.
+
+        Returns:
+            (client id, quota dictionary)
+        """
+        host = request.client.host if request.client else "unknown"
+        if settings.TRUST_PROXY_HEADERS:
+            forwarded = request.headers.get("x-forwarded-for")
+            if forwarded:
+                host = forwarded.split(",")[0].strip()
+        return self.identify_client(request.headers.get("x-api-key"), host)
+
+    def identify_client(self, api_key: Optional[str], host: str) -> Tuple[str, Dict]:
+        """Client id and quota from an API key, falling back to the peer address."""
+        if api_key and api_key in settings.CLIENT_QUOTAS:
+            return f"key:{api_key}", settings.CLIENT_QUOTAS[api_key]
+        return f"ip:{host}", {}
+
+    def resolve_priority(self, requested: Optional[str], quota: Dict) -> str:
+        """Clients may lower their priority (X-Priority), never raise it."""
+        allowed = quota.get("priority", "interactive")
+        if requested not in PRIORITIES:
+            requested = allowed
+        return max(allowed, requested, key=PRIORITIES.index)
+
+    def _reject(self, reason: str, retry_after: float, detail: str) -> HTTPException:
+        metrics.inc("admission_rejections_total", reason=reason)
+        return HTTPException(
+            status_code=429,
+            detail=detail,
+            headers={"Retry-After": str(max(1, math.ceil(min(retry_after, MAX_RETRY_AFTER))))}
+        )
+
+    def _estimated_wait(self) -> float:
+        """Rough time until the current queue drains."""
+        service_time = metrics.mean("prediction_inference_seconds") or 1.0
+        return (self.queued + 1) * service_time / self.slots
+
+    async def acquire(self, request: Request) -> Ticket:
+        """
+        Wait for an inference slot.
+
+        Raises:
+            HTTPException: 429 when rate limited, the queue is full or the wait times out
+        """
+        client_id, quota = self.identify(request)
+        priority = self.resolve_priority(request.headers.get("x-priority"), quota)
+        return await self.acquire_for(client_id, quota, priority)
+
+    async def acquire_for(self, client_id: str, quota: Dict, priority: str, cost: int = 1) -> Ticket:
+        """
+        Wait for an inference slot on behalf of an already identified client.
+
+        Args:
+            cost: Number of images predicted in the slot, charged to the client's
+                token bucket and fair share
+
+        Raises:
+            HTTPException: 429 when rate limited, the queue is full or the wait times out
+        """
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_CLIENTS:
+                self._prune()
+            bucket = TokenBucket(
+                quota.get("rate", settings.RATE_LIMIT_RATE),
+                quota.get("burst", settings.RATE_LIMIT_BURST)
+            )
+            self._buckets[client_id] = bucket
+
+        acquired, retry_after = bucket.try_acquire(cost)
+        if not acquired:
+            raise self._reject("rate_limited", retry_after, "Rate limit exceeded")
+
+        if self.queued >= settings.MAX_QUEUE_SIZE:
+            raise self._reject("queue_full", self._estimated_wait(), "Server busy, too many queued requests")
+
+        ticket = Ticket(client_id, priority, float(quota.get("weight", 1.0)), cost)
+        self._enqueue(ticket)
+        self._dispatch()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(ticket.future), timeout=settings.MAX_QUEUE_WAIT)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if ticket.future.done():
+                # Granted at the same moment the wait ended: give the slot back
+                self.release(ticket)
+            else:
+                ticket.cancelled = True
+                ticket.future.cancel()
+                self.queued -= 1
+                self._update_gauges()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self._reject("queue_timeout", self._estimated_wait(), "Server busy, timed out waiting in queue")
+
+        metrics.observe("prediction_queue_wait_seconds", ticket.queue_wait, priority=ticket.priority)
+        return ticket
+
+    def release(self, ticket: Ticket) -> None:
+        """Free the slot held by a ticket and admit the next waiter."""
+        self.active -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def admit(self, request: Request) -> AsyncIterator[Ticket]:
+        """Hold an inference slot for the duration of the block."""
+        ticket = await self.acquire(request)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    @contextmanager
+    def admit_from_thread(self, client_id: str, quota: Dict, priority: str, cost: int = 1) -> Iterator[Ticket]:
+        """
+        Hold an inference slot from a worker thread (gRPC handlers, job workers).
+
+        The controller is not thread safe, so acquiring and releasing run on the
+        event loop set with attach_loop(), the one serving the HTTP routes.
+
+        Raises:
+            HTTPException: 429 as for acquire()
+        """
+        loop = self._loop
+        if loop is None:
+            raise RuntimeError("Admission controller is not attached to an event loop")
+        ticket = asyncio.run_coroutine_threadsafe(self.acquire_for(client_id, quota, priority, cost), loop).result()
+        try:
+            yield ticket
+        finally:
+            loop.call_soon_threadsafe(self.release, ticket)
+
+    def _enqueue(self, ticket: Ticket) -> None:
+        start = max(self._virtual_time, self._finish_tags.get(ticket.client_id, 0.0))
+        finish = start + ticket.cost / max(ticket.weight, 1e-6)
+        self._finish_tags[ticket.client_id] = finish
+        ticket.start_tag = start
+        heapq.heappush(self._queues[ticket.priority], (finish, next(self._sequence), ticket))
+        self.queued += 1
+
+    def _dispatch(self) -> None:
+        while self.active < self.slots:
+            ticket = self._pop_next()
+            if ticket is None:
+                break
+            self.queued -= 1
+            self.active += 1
+            self._virtual_time = max(self._virtual_time, ticket.start_tag)
+            ticket.granted_at = time.perf_counter()
+            ticket.future.set_result(True)
+        self._update_gauges()
+
+    def _pop_next(self) -> Optional[Ticket]:
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            while queue:
+                _, _, ticket = heapq.heappop(queue)
+                if not ticket.cancelled:
+                    return ticket
+        return None
+
+    def _prune(self) -> None:
+        """Forget idle clients whose bucket has fully refilled."""
+        idle = [client_id for client_id, bucket in self._buckets.items() if bucket.is_full()]
+        for client_id in idle:
+            del self._buckets[client_id]
+            if self._finish_tags.get(client_id, 0.0) <= self._virtual_time:
+                self._finish_tags.pop(client_id, None)
+
+    def _update_gauges(self) -> None:
+        metrics.set_gauge("admission_active_predictions", self.active)
+        metrics.set_gauge("admission_queue_depth", self.queued)
+
+# Global instance
+admission_controller = AdmissionController()
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, Any, Optional
+from app.api.admin import require_admin_key
+from app.history.recorder import history_recorder
+from app.history.store import history_store
+from app.config import settings
+
+# Audit data: same key as the admin endpoints
+history_router = APIRouter(dependencies=[Depends(require_admin_key)])
+
+@history_router.get("/history")
+async def list_history(
+    limit: int = Query(settings.HISTORY_PAGE_SIZE, ge=1, le=500),
+    before_id: Optional[int] = Query(None, ge=1),
+    breed: Optional[str] = None,
+    image_hash: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None
+) -> Dict[str, Any]:
+    items = await run_in_threadpool(
+        history_store.list_entries, limit, before_id, breed, image_hash, since, until
+    )
+    return {
+        "items": items,
+        # Pass as before_id to get the next page
+        "next_before_id": items[-1]["id"] if len(items) == limit else None
+    }
+
+@history_router.get("/history/stats")
+async def get_history_stats(
+    days: int = Query(30, ge=1, le=366),
+    top: int = Query(10, ge=1, le=120)
+) -> Dict[str, Any]:
+    stats = await run_in_threadpool(history_store.get_stats, days, top)
+    # Entries still waiting for the writer are not counted yet
+    stats["pending_entries"] = history_recorder.queue_depth
+    return stats
+
+@history_router.get("/history/{entry_id}")
+async def get_history_entry(entry_id: int) -> Dict[str, Any]:
+    entry = await run_in_threadpool(history_store.get, entry_id)
+    if entry is None:
+        raise HTTPException(
+            status_code=404,
+            detail="History entry not found"
+        )
+    return entry
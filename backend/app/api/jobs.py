@@ -0,0 +1,78 @@
+from fastapi import APIRouter, File, UploadFile, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, Any, List
+import uuid
+import logging
+from app.jobs.manager import job_manager
+from app.jobs.store import job_store, TERMINAL_STATUSES
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+jobs_router = APIRouter()
+
+@jobs_router.post("/jobs", status_code=202)
+async def create_job(files: List[UploadFile] = File(...)) -> Dict[str, Any]:
+    job_id = uuid.uuid4().hex
+    uploads = [(file.filename, file.file) for file in files]
+
+    try:
+        items = await run_in_threadpool(job_manager.stage_files, job_id, uploads)
+        await run_in_threadpool(job_manager.submit, job_id, items)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error creating job: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Internal server error while creating job"
+        )
+
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "total_items": len(items)
+    }
+
+@jobs_router.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(settings.JOB_RESULTS_PAGE_SIZE, ge=1, le=500)
+) -> Dict[str, Any]:
+    job = await run_in_threadpool(job_store.get_job, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Job not found"
+        )
+
+    results = await run_in_threadpool(job_store.get_results, job_id, offset, limit)
+    finished = job["processed_items"]
+    job["progress"] = round(finished / job["total_items"], 4) if job["total_items"] else 1.0
+    job["results"] = results
+    job["offset"] = offset
+    job["next_offset"] = offset + len(results) if offset + len(results) < finished else None
+    return job
+
+@jobs_router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str) -> Dict[str, Any]:
+    status = await run_in_threadpool(job_manager.cancel, job_id)
+    if status is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Job not found"
+        )
+    if status in ("completed", "failed"):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job already {status}"
+        )
+
+    return {
+        "job_id": job_id,
+        "status": status if status in TERMINAL_STATUSES else "cancelling"
+    }
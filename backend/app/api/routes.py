@@ -1,23 +1,41 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
-from typing import Dict, Any
+from fastapi import APIRouter, File, Form, UploadFile, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Callable, Dict, Any, Optional
+from functools import partial
+import io
+import json
+import math
+import time
 import logging
+import numpy as np
+from PIL import Image
+from app.api.admission import admission_controller
+from app.history.recorder import history_recorder
 from app.models.predictor import dog_breed_predictor
+from app.models.model_registry import model_registry
+from app.models.dog_gate import dog_gate
+from app.utils.degradation import degradation_controller
+from app.utils.metrics import metrics
 from app.config import settings
 
-try:
-    from app.models.real_model_loader import real_model_loader
-    USE_REAL_MODELS = True
-except ImportError:
-    from app.models.model_loader import model_loader
-    USE_REAL_MODELS = False
-
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 @router.post("/predict")
-async def predict_dog_breed(file: UploadFile = File(...)) -> Dict[str, Any]:
+async def predict_dog_breed(request: Request, file: UploadFile = File(...),
+                            client_predictions: Optional[str] = Form(None)) -> Dict[str, Any]:
+    """
+    Prediction from an uploaded image.
+    
+    client_predictions optionally carries, as JSON, results the browser computed
+    itself for models of CLIENT_PREDICTION_MODELS, e.g.
+    {"MPO_MODELE_SCRATCH": {"version": "...", "predictions": [{"breed": ..., "confidence": ...}]}}.
+    Those models are then not run on the server but still count in the aggregation,
+    at every degradation level. The version must match the served model's web
+    export (client_model_versions of /models), otherwise the server runs the model.
+    """
     try:
         if not file.content_type or not file.content_type.startswith('image/'):
             raise HTTPException(
@@ -33,52 +51,240 @@ async def predict_dog_breed(file: UploadFile = File(...)) -> Dict[str, Any]:
                 detail=f"File size too large. Maximum size: {settings.MAX_FILE_SIZE // (1024*1024)}MB"
             )
         
+        _validate_image(file_content)
+        
+        predict = dog_breed_predictor.predict_all_models
+        parsed_client_predictions = _parse_client_predictions(client_predictions)
+        if parsed_client_predictions:
+            predict = partial(predict, client_predictions=parsed_client_predictions)
+        
+        return await _run_prediction(request, predict, file_content, "multipart")
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in predict endpoint: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Internal server error during prediction"
+        )
+
+@router.post("/predict/raw")
+async def predict_dog_breed_raw(request: Request) -> Dict[str, Any]:
+    """Prediction from the image sent as the request body (Content-Type: image/jpeg, ...)."""
+    try:
+        content_type = request.headers.get("content-type", "")
+        if not content_type.startswith("image/"):
+            raise HTTPException(
+                status_code=415,
+                detail="Content-Type must be an image type (image/jpeg, image/png, image/webp)"
+            )
+        
+        file_content = await _read_body(request)
+        _validate_image(file_content)
+        
+        return await _run_prediction(request, dog_breed_predictor.predict_all_models, file_content, "raw")
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in raw predict endpoint: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Internal server error during prediction"
+        )
+
+@router.post("/predict/tensor")
+async def predict_dog_breed_tensor(request: Request) -> Dict[str, Any]:
+    """
+    Prediction from a decoded image: the body holds uint8 RGB pixels in
+    row-major (height, width, 3) order and X-Tensor-Shape gives "height,width,3".
+    Azure Custom Vision is skipped since it needs an encoded image.
+    """
+    try:
         try:
-            from PIL import Image
-            import io
-            Image.open(io.BytesIO(file_content))
-        except Exception:
+            height, width, channels = (int(dim) for dim in request.headers.get("x-tensor-shape", "").split(","))
+        except ValueError:
             raise HTTPException(
                 status_code=400,
-                detail="Invalid image file"
+                detail="X-Tensor-Shape header must be 'height,width,3'"
+            )
+        min_side, max_side = settings.TENSOR_MIN_SIDE, settings.TENSOR_MAX_SIDE
+        if channels != 3 or not (min_side <= height <= max_side and min_side <= width <= max_side):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Tensor must be uint8 RGB with {min_side} to {max_side} pixels per side"
             )
         
-        results = dog_breed_predictor.predict_all_models(file_content)
-        
-        if "error" in results:
+        # Capped by the declared shape rather than MAX_FILE_SIZE: a full
+        # TENSOR_MAX_SIDE tensor is larger than any accepted encoded image
+        body = await _read_body(request, height * width * channels)
+        if len(body) != height * width * channels:
             raise HTTPException(
-                status_code=500,
-                detail=results["error"]
+                status_code=400,
+                detail=f"Expected {height * width * channels} bytes for shape {height}x{width}x{channels}, got {len(body)}"
             )
         
-        return JSONResponse(content=results)
+        image_array = np.frombuffer(body, dtype=np.uint8).reshape(height, width, channels)
+        
+        return await _run_prediction(request, dog_breed_predictor.predict_from_array, image_array, "tensor")
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error in predict endpoint: {e}")
+        logger.error(f"Error in tensor predict endpoint: {e}")
         raise HTTPException(
             status_code=500,
             detail="Internal server error during prediction"
         )
 
+async def _read_body(request: Request, max_size: Optional[int] = None) -> bytearray:
+    """Read the request body into a single buffer, enforcing max_size (default MAX_FILE_SIZE) while streaming."""
+    if max_size is None:
+        max_size = settings.MAX_FILE_SIZE
+    limit = f"{max_size // (1024*1024)}MB" if max_size >= 1024 * 1024 else f"{max_size} bytes"
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"File size too large. Maximum size: {limit}"
+    )
+    
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit():
+        expected = int(content_length)
+        if expected > max_size:
+            raise too_large
+        # Preallocate and fill in place instead of concatenating chunks
+        body = bytearray(expected)
+        view = memoryview(body)
+        received = 0
+        async for chunk in request.stream():
+            if received + len(chunk) > expected:
+                raise HTTPException(status_code=400, detail="Body longer than Content-Length")
+            view[received:received + len(chunk)] = chunk
+            received += len(chunk)
+        view.release()
+        if received != expected:
+            raise HTTPException(status_code=400, detail="Body shorter than Content-Length")
+        return body
+    
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > max_size:
+            raise too_large
+    return body
+
+def _validate_image(file_content: bytes) -> None:
+    try:
+        Image.open(io.BytesIO(file_content))
+    except Exception:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid image file"
+        )
+
+def _parse_client_predictions(raw: Optional[str]) -> Optional[Dict[str, Dict]]:
+    """Check the shape of the client_predictions field; breeds are checked by the predictor."""
+    if not raw:
+        return None
+    
+    def invalid(detail: str) -> HTTPException:
+        return HTTPException(status_code=400, detail=f"Invalid client_predictions: {detail}")
+    
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        raise invalid("not valid JSON")
+    if not isinstance(data, dict):
+        raise invalid("expected an object keyed by model name")
+    
+    parsed = {}
+    for model_name, result in data.items():
+        if model_name not in settings.CLIENT_PREDICTION_MODELS:
+            raise invalid(f"model {model_name} cannot be computed by the client")
+        if not isinstance(result, dict) or not isinstance(result.get("predictions"), list):
+            raise invalid(f"{model_name} must have a predictions list")
+        version = result.get("version")
+        if version is not None and (not isinstance(version, str) or len(version) > 64):
+            raise invalid(f"{model_name} version must be a short string")
+        
+        predictions = result["predictions"]
+        if not 1 <= len(predictions) <= 5:
+            raise invalid(f"{model_name} must have 1 to 5 predictions")
+        for pred in predictions:
+            if not isinstance(pred, dict) or not isinstance(pred.get("breed"), str):
+                raise invalid(f"{model_name} predictions need a breed")
+            confidence = pred.get("confidence")
+            if (not isinstance(confidence, (int, float)) or isinstance(confidence, bool)
+                    or not math.isfinite(confidence) or not 0 <= confidence <= 1):
+                raise invalid(f"{model_name} confidences must be between 0 and 1")
+        
+        parsed[model_name] = {
+            "version": version,
+            "predictions": [{"breed": pred["breed"], "confidence": float(pred["confidence"])} for pred in predictions]
+        }
+    return parsed
+
+async def _run_prediction(request: Request, predict: Callable, payload: Any, transport: str) -> JSONResponse:
+    """
+    Run a prediction through admission control and attach queue / inference timings.
+    
+    The degradation level is decided once the request holds a slot, from the
+    queue still waiting behind it and the recent inference latency.
+    """
+    async with admission_controller.admit(request) as ticket:
+        degradation_level = degradation_controller.evaluate(admission_controller.queue_depth)
+        inference_start = time.perf_counter()
+        results = await run_in_threadpool(predict, payload, degradation_level=degradation_level)
+        inference_time = time.perf_counter() - inference_start
+    
+    metrics.observe("prediction_inference_seconds", inference_time)
+    metrics.inc("predictions_total", transport=transport)
+    metrics.inc("predictions_by_degradation_level_total", level=degradation_level)
+    degradation_controller.observe(inference_time)
+    
+    if "error" in results:
+        raise HTTPException(
+            status_code=500,
+            detail=results["error"]
+        )
+    
+    results["timings"] = {
+        "queue_wait_ms": round(ticket.queue_wait * 1000, 2),
+        "inference_ms": round(inference_time * 1000, 2)
+    }
+    history_recorder.record(results, transport, results["timings"])
+    
+    return JSONResponse(
+        content=results,
+        headers={
+            "Server-Timing": f"queue;dur={results['timings']['queue_wait_ms']}, "
+                             f"inference;dur={results['timings']['inference_ms']}",
+            "X-Degradation-Level": str(degradation_level)
+        }
+    )
+
 @router.get("/health")
 async def health_check() -> Dict[str, Any]:
     return {
         "status": "healthy",
         "service": "Dog Breed Classifier API",
-        "version": settings.VERSION
+        "version": settings.VERSION,
+        "dog_gate": dog_gate.status()
     }
 
 @router.get("/models")
 async def get_models_info() -> Dict[str, Any]:
-    if USE_REAL_MODELS:
-        loaded_models = real_model_loader.get_loaded_model_names()
-    else:
-        loaded_models = model_loader.get_loaded_model_names()
+    loaded_models = model_registry.get_loaded_model_names()
     
     return {
         "loaded_models": loaded_models,
+        "model_versions": {name: model_registry.get_version_key(name) for name in loaded_models},
+        # Web export version the browser's local model must have (None: local results are not accepted)
+        "client_model_versions": {
+            name: getattr(model_registry.get_model(name), "client_version", None)
+            for name in settings.CLIENT_PREDICTION_MODELS if name in loaded_models
+        },
         "total_models": len(loaded_models),
         "supported_breeds": len(settings.DOG_BREEDS),
         "image_size": settings.IMAGE_SIZE,
@@ -91,3 +297,7 @@ async def get_supported_breeds() -> Dict[str, Any]:
         "breeds": settings.DOG_BREEDS,
         "total_count": len(settings.DOG_BREEDS)
     }
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> str:
+    return metrics.render_prometheus()
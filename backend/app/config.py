@@ -1,4 +1,5 @@
-from typing import List
+from typing import Dict, List, Optional
+import json
 import os
 
 class Settings:
@@ -18,12 +19,127 @@ class Settings:
     # Model Configuration
     MODELS_DIR: str = os.path.join(os.path.dirname(__file__), "models", "models")
     MODEL_NAMES: List[str] = ["model1", "model2", "model3"]
+    HF_MODEL_NAME: str = os.getenv("HF_MODEL_NAME", "anonauthors/stanford_dogs-resnet50")
+    MPO_MODEL_PATH: str = os.getenv(
+        "MPO_MODEL_PATH",
+        os.path.join(os.path.dirname(__file__), "..", "MPO_modele_scratch_apres_data_augmentation 1.keras")
+    )
+    STUDENT_MODEL_PATH: str = os.getenv(
+        "STUDENT_MODEL_PATH",
+        os.path.join(os.path.dirname(__file__), "models", "models", "distilled_student.keras")
+    )
+    # "ensemble" runs every loaded model, "student" serves the distilled model alone when it is loaded
+    SERVING_MODE: str = os.getenv("SERVING_MODE", "ensemble")
+    # Models a browser may run itself (frontend local mode) and send as client_predictions
+    CLIENT_PREDICTION_MODELS: List[str] = json.loads(os.getenv("CLIENT_PREDICTION_MODELS", '["MPO_MODELE_SCRATCH"]'))
+    
+    # Simulator: demo models with realistic latency / CPU / memory, used even when real models are available
+    SIMULATOR_ENABLED: bool = os.getenv("SIMULATOR_ENABLED", "false").lower() == "true"
+    # Per model profiles, e.g. {"default": {"latency_ms": 40}, "resnet": {"latency_ms": 120, "memory_mb": 100}}
+    # When set, the keys other than "default" replace MODEL_NAMES
+    SIMULATOR_PROFILES: Dict[str, Dict] = json.loads(os.getenv("SIMULATOR_PROFILES", "{}"))
+    # Fixed seed for reproducible runs (models still get distinct streams)
+    SIMULATOR_SEED: Optional[int] = int(os.environ["SIMULATOR_SEED"]) if os.getenv("SIMULATOR_SEED") else None
+    
+    # "Is this a dog?" gate run before the ensemble. Unset: enabled only when real models are
+    # served, so simulator and demo modes do not load TensorFlow and the ImageNet MobileNetV3
+    DOG_GATE_ENABLED: Optional[bool] = (
+        os.getenv("DOG_GATE_ENABLED").lower() == "true" if os.getenv("DOG_GATE_ENABLED") else None
+    )
+    # Minimum ImageNet dog-class probability mass for an image to reach the ensemble
+    DOG_GATE_THRESHOLD: float = float(os.getenv("DOG_GATE_THRESHOLD", "0.15"))
+    
+    # Model Registry / Hot Reload
+    MODEL_WATCH_ENABLED: bool = os.getenv("MODEL_WATCH_ENABLED", "false").lower() == "true"
+    MODEL_WATCH_INTERVAL: float = float(os.getenv("MODEL_WATCH_INTERVAL", "5"))
+    PREDICTION_CACHE_SIZE: int = int(os.getenv("PREDICTION_CACHE_SIZE", "256"))
+    
+    # Admin endpoints are disabled unless a key is configured
+    ADMIN_API_KEY: str = os.getenv("ADMIN_API_KEY", "")
+    
+    # Admission Control for prediction routes
+    MAX_CONCURRENT_PREDICTIONS: int = int(os.getenv("MAX_CONCURRENT_PREDICTIONS", "2"))
+    MAX_QUEUE_SIZE: int = int(os.getenv("MAX_QUEUE_SIZE", "64"))
+    MAX_QUEUE_WAIT: float = float(os.getenv("MAX_QUEUE_WAIT", "20"))
+    # Default token bucket per client (requests per second / burst size)
+    RATE_LIMIT_RATE: float = float(os.getenv("RATE_LIMIT_RATE", "2"))
+    RATE_LIMIT_BURST: int = int(os.getenv("RATE_LIMIT_BURST", "10"))
+    # Per API key overrides, e.g. {"key": {"rate": 20, "burst": 50, "weight": 4, "priority": "bulk"}}
+    CLIENT_QUOTAS: Dict[str, Dict] = json.loads(os.getenv("CLIENT_QUOTAS", "{}"))
+    # Use X-Forwarded-For to identify clients (only behind a trusted proxy)
+    TRUST_PROXY_HEADERS: bool = os.getenv("TRUST_PROXY_HEADERS", "false").lower() == "true"
+    
+    # Load-aware degradation: level 1 drops Azure, 2 serves the distilled student (or the
+    # two fastest models), 3 the fastest model alone without the dog gate
+    DEGRADATION_ENABLED: bool = os.getenv("DEGRADATION_ENABLED", "true").lower() == "true"
+    # Queue depth / p95 inference seconds entering levels 1, 2 and 3
+    DEGRADATION_QUEUE_THRESHOLDS: List[int] = json.loads(os.getenv("DEGRADATION_QUEUE_THRESHOLDS", "[8, 24, 48]"))
+    DEGRADATION_LATENCY_THRESHOLDS: List[float] = json.loads(os.getenv("DEGRADATION_LATENCY_THRESHOLDS", "[4, 8, 12]"))
+    # Stepping down needs both signals below this fraction of the current level's thresholds
+    DEGRADATION_RECOVERY_RATIO: float = float(os.getenv("DEGRADATION_RECOVERY_RATIO", "0.5"))
+    DEGRADATION_MIN_HOLD: float = float(os.getenv("DEGRADATION_MIN_HOLD", "15"))
+    DEGRADATION_WINDOW: float = float(os.getenv("DEGRADATION_WINDOW", "30"))
+    DEGRADATION_MIN_SAMPLES: int = int(os.getenv("DEGRADATION_MIN_SAMPLES", "20"))
+    # Expected seconds per image, ranking models that have no measured latency yet (e.g. after a restart)
+    DEGRADATION_LATENCY_HINTS: Dict[str, float] = json.loads(os.getenv(
+        "DEGRADATION_LATENCY_HINTS",
+        '{"Distilled_Student": 0.02, "MPO_MODELE_SCRATCH": 0.05, "HuggingFace_ResNet50": 0.2, "Azure_Custom_Vision": 1.0}'
+    ))
+    
+    # Local data (job queue, uploaded job files)
+    DATA_DIR: str = os.getenv("DATA_DIR", os.path.join(os.path.dirname(__file__), "..", "data"))
+    
+    # Asynchronous Jobs
+    JOBS_DB_PATH: str = os.path.join(DATA_DIR, "jobs.sqlite3")
+    JOBS_FILES_DIR: str = os.path.join(DATA_DIR, "jobs")
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "1"))
+    JOB_BATCH_SIZE: int = int(os.getenv("JOB_BATCH_SIZE", "8"))
+    JOB_MAX_IMAGES: int = int(os.getenv("JOB_MAX_IMAGES", "1000"))
+    # Total bytes of images staged for one job
+    JOB_MAX_TOTAL_SIZE: int = int(os.getenv("JOB_MAX_TOTAL_SIZE", str(500 * 1024 * 1024)))
+    JOB_RESULTS_PAGE_SIZE: int = 50
+    
+    # Prediction History
+    HISTORY_ENABLED: bool = os.getenv("HISTORY_ENABLED", "true").lower() == "true"
+    HISTORY_DB_PATH: str = os.path.join(DATA_DIR, "history.sqlite3")
+    HISTORY_SPILL_PATH: str = os.path.join(DATA_DIR, "history_spill.jsonl")
+    HISTORY_QUEUE_SIZE: int = int(os.getenv("HISTORY_QUEUE_SIZE", "10000"))
+    HISTORY_BATCH_SIZE: int = int(os.getenv("HISTORY_BATCH_SIZE", "500"))
+    HISTORY_FLUSH_INTERVAL: float = float(os.getenv("HISTORY_FLUSH_INTERVAL", "1"))
+    # What to do with entries when the queue is full: "spill" to disk or "drop"
+    HISTORY_OVERFLOW: str = os.getenv("HISTORY_OVERFLOW", "spill")
+    HISTORY_SPILL_MAX_BYTES: int = int(os.getenv("HISTORY_SPILL_MAX_BYTES", str(100 * 1024 * 1024)))
+    HISTORY_PAGE_SIZE: int = 50
     
     # Image Processing
     IMAGE_SIZE: tuple = (224, 224)
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
     ALLOWED_EXTENSIONS: List[str] = ["jpg", "jpeg", "png", "webp"]
+    # Bounds on each side of preprocessed uint8 tensors (/predict/tensor, gRPC)
+    TENSOR_MIN_SIDE: int = 16
+    TENSOR_MAX_SIDE: int = 4096
     
+    # gRPC Service (stubs generated from app/rpc/dog_breed.proto)
+    GRPC_ENABLED: bool = os.getenv("GRPC_ENABLED", "false").lower() == "true"
+    GRPC_PORT: int = int(os.getenv("GRPC_PORT", "50051"))
+    GRPC_MAX_WORKERS: int = int(os.getenv("GRPC_MAX_WORKERS", "4"))
+    GRPC_MAX_MESSAGE_SIZE: int = 64 * 1024 * 1024  # Batches of several images
+
+    # Runtime / Thread Configuration
+    # Number of uvicorn worker processes sharing the container's cores
+    RUNTIME_WORKERS: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+    # Explicit core budget override (0 = detect from cgroup / affinity)
+    RUNTIME_CPU_LIMIT: int = int(os.getenv("RUNTIME_CPU_LIMIT", "0"))
+    # Measure throughput across thread settings at startup and persist the best one. The saved
+    # plan is reused on later starts until the hardware changes or RUNTIME_AUTOTUNE_FORCE is set
+    RUNTIME_AUTOTUNE: bool = os.getenv("RUNTIME_AUTOTUNE", "false").lower() == "true"
+    RUNTIME_AUTOTUNE_FORCE: bool = os.getenv("RUNTIME_AUTOTUNE_FORCE", "false").lower() == "true"
+    RUNTIME_AUTOTUNE_ITERATIONS: int = int(os.getenv("RUNTIME_AUTOTUNE_ITERATIONS", "10"))
+    RUNTIME_CONFIG_PATH: str = os.getenv(
+        "RUNTIME_CONFIG_PATH",
+        os.path.join(os.path.dirname(__file__), "models", "models", "runtime_config.json")
+    )
+
     # Dog Breeds (120 most common breeds)
     DOG_BREEDS: List[str] = [
         "Affenpinscher", "Afghan Hound", "Airedale Terrier", "Akita", "Alaskan Malamute",
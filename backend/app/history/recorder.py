@@ -0,0 +1,237 @@
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from itertools import islice
+from typing import Dict, List, Optional
+from app.history.store import history_store, to_row
+from app.utils.metrics import metrics
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait before replaying the spill file again after a failed attempt
+REPLAY_RETRY_DELAY = 5.0
+
+def _snapshot(results: Dict) -> Dict:
+    """
+    Copy the parts of a result the history stores.
+
+    The prediction lists are shared with the prediction cache and the response,
+    so they are copied before the entry leaves the request.
+    """
+    return {
+        "image_hash": results.get("image_hash"),
+        "dog_detected": results.get("dog_detected", True),
+        "dog_score": results.get("dog_score"),
+        "model_versions": dict(results.get("model_versions") or {}),
+        "model_predictions": {
+            model_name: [dict(prediction) for prediction in predictions]
+            for model_name, predictions in (results.get("model_predictions") or {}).items()
+        },
+        "aggregated_results": [dict(prediction) for prediction in results.get("aggregated_results") or []],
+    }
+
+class HistoryRecorder:
+    """
+    Asynchronous writer of the prediction history.
+
+    Requests only enqueue their result; a background thread writes the queue to
+    the history store in batches. When the queue is full, entries are handed to
+    a spill thread that appends them to a spill file (or dropped, depending on
+    HISTORY_OVERFLOW), so a request never serializes or writes to disk, and the
+    spill file is replayed once the writer has caught up. Entries are also
+    spilled when the database write fails.
+    """
+
+    def __init__(self):
+        self.spill_path = settings.HISTORY_SPILL_PATH
+        self._queue: queue.Queue = queue.Queue(maxsize=settings.HISTORY_QUEUE_SIZE)
+        # Entries that did not fit in the queue, waiting for the spill thread
+        self._spill_queue: queue.Queue = queue.Queue(maxsize=settings.HISTORY_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._spill_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._spill_lock = threading.Lock()
+        self._spill_bytes = 0
+        self._replay_after = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def record(self, results: Dict, transport: str, timings: Optional[Dict] = None) -> bool:
+        """
+        Queue a prediction for the history without blocking.
+
+        Args:
+            results: Predictor result dictionary
+            transport: How the prediction was requested (multipart, raw, tensor, grpc, job)
+            timings: queue_wait_ms / inference_ms of the request, if known
+
+        Returns:
+            bool: False if the entry was dropped
+        """
+        if not settings.HISTORY_ENABLED:
+            return False
+        item = (time.time(), transport, _snapshot(results), dict(timings) if timings else None)
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+
+        if settings.HISTORY_OVERFLOW == "spill":
+            try:
+                self._spill_queue.put_nowait(item)
+                return True
+            except queue.Full:
+                pass
+        metrics.inc("history_entries_dropped_total")
+        return False
+
+    # Writer
+
+    def start(self) -> None:
+        if not settings.HISTORY_ENABLED or self._thread is not None:
+            return
+        if os.path.exists(self.spill_path):
+            self._spill_bytes = os.path.getsize(self.spill_path)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+        self._spill_thread = threading.Thread(target=self._run_spill, name="history-spill", daemon=True)
+        self._spill_thread.start()
+        logger.info("History writer started")
+
+    def stop(self) -> None:
+        """Write what is still queued, then stop the writer."""
+        self._stop_event.set()
+        for thread in (self._thread, self._spill_thread):
+            if thread is not None:
+                thread.join(timeout=30)
+        self._thread = None
+        self._spill_thread = None
+
+    def _run(self) -> None:
+        self._replay_spill()
+        while not (self._stop_event.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            metrics.set_gauge("history_queue_depth", self._queue.qsize())
+            if batch:
+                self._write([to_row(*item) for item in batch])
+            if self._spill_pending() and self._queue.qsize() < settings.HISTORY_BATCH_SIZE:
+                self._replay_spill()
+
+    def _run_spill(self) -> None:
+        """Spill the entries the writer had no room for."""
+        while not (self._stop_event.is_set() and self._spill_queue.empty()):
+            batch = self._next_batch(self._spill_queue)
+            if batch:
+                self._overflow([to_row(*item) for item in batch])
+
+    def _next_batch(self, source: Optional[queue.Queue] = None) -> List:
+        """Collect up to HISTORY_BATCH_SIZE entries, waiting at most HISTORY_FLUSH_INTERVAL."""
+        if source is None:
+            source = self._queue
+        batch = []
+        deadline = time.monotonic() + settings.HISTORY_FLUSH_INTERVAL
+        while len(batch) < settings.HISTORY_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0 and not self._stop_event.is_set():
+                    batch.append(source.get(timeout=remaining))
+                else:
+                    batch.append(source.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, rows: List[Dict]) -> bool:
+        start = time.perf_counter()
+        try:
+            history_store.insert_many(rows)
+        except Exception as e:
+            logger.error(f"Could not write {len(rows)} history entries: {e}")
+            self._overflow(rows)
+            return False
+        metrics.observe("history_flush_seconds", time.perf_counter() - start)
+        metrics.inc("history_entries_written_total", len(rows))
+        return True
+
+    # Overflow
+
+    def _overflow(self, rows: List[Dict]) -> bool:
+        if settings.HISTORY_OVERFLOW == "spill" and self._spill(rows):
+            return True
+        metrics.inc("history_entries_dropped_total", len(rows))
+        return False
+
+    def _spill(self, rows: List[Dict]) -> bool:
+        """Append rows to the spill file, unless it has reached HISTORY_SPILL_MAX_BYTES."""
+        data = "".join(json.dumps(row) + "\n" for row in rows)
+        with self._spill_lock:
+            if self._spill_bytes + len(data) > settings.HISTORY_SPILL_MAX_BYTES:
+                return False
+            try:
+                os.makedirs(os.path.dirname(self.spill_path), exist_ok=True)
+                with open(self.spill_path, "a") as f:
+                    f.write(data)
+            except OSError as e:
+                logger.error(f"Could not spill history entries: {e}")
+                return False
+            self._spill_bytes += len(data)
+        metrics.inc("history_entries_spilled_total", len(rows))
+        return True
+
+    def _spill_pending(self) -> bool:
+        if time.monotonic() < self._replay_after:
+            return False
+        return self._spill_bytes > 0 or os.path.exists(self._replay_path)
+
+    @property
+    def _replay_path(self) -> str:
+        return f"{self.spill_path}.replay"
+
+    def _replay_spill(self) -> None:
+        """Move the spill file aside and insert its entries, keeping what could not be written."""
+        with self._spill_lock:
+            if not os.path.exists(self._replay_path):
+                if not os.path.exists(self.spill_path):
+                    return
+                os.replace(self.spill_path, self._replay_path)
+                self._spill_bytes = 0
+
+        replayed = 0
+        with open(self._replay_path) as f:
+            while True:
+                lines = list(islice(f, settings.HISTORY_BATCH_SIZE))
+                if not lines:
+                    break
+                rows = []
+                for line in lines:
+                    try:
+                        rows.append(json.loads(line))
+                    except ValueError:
+                        # Torn last line after a crash
+                        logger.warning("Skipping unreadable spilled history entry")
+                try:
+                    history_store.insert_many(rows)
+                except Exception as e:
+                    logger.error(f"History replay interrupted, retrying in {REPLAY_RETRY_DELAY}s: {e}")
+                    self._replay_after = time.monotonic() + REPLAY_RETRY_DELAY
+                    remaining = lines + f.readlines()
+                    with open(f"{self._replay_path}.tmp", "w") as rest:
+                        rest.writelines(remaining)
+                    os.replace(f"{self._replay_path}.tmp", self._replay_path)
+                    return
+                replayed += len(rows)
+
+        os.remove(self._replay_path)
+        metrics.inc("history_entries_replayed_total", replayed)
+        logger.info(f"Replayed {replayed} spilled history entries")
+
+# Global instance
+history_recorder = HistoryRecorder()
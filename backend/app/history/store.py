@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    image_hash TEXT,
+    transport TEXT NOT NULL,
+    dog_detected INTEGER NOT NULL,
+    dog_score REAL,
+    top_breed TEXT,
+    top_confidence REAL,
+    queue_wait_ms REAL,
+    inference_ms REAL,
+    model_versions TEXT NOT NULL,
+    model_predictions TEXT NOT NULL,
+    aggregated_results TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_created ON predictions (created_at);
+CREATE INDEX IF NOT EXISTS idx_predictions_breed ON predictions (top_breed, id);
+CREATE INDEX IF NOT EXISTS idx_predictions_hash ON predictions (image_hash, id);
+
+-- Aggregates maintained with every insert so statistics never scan predictions
+CREATE TABLE IF NOT EXISTS breed_counts (
+    breed TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    confidence_sum REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS daily_counts (
+    day TEXT PRIMARY KEY,
+    predictions INTEGER NOT NULL,
+    no_dog INTEGER NOT NULL,
+    inference_ms_sum REAL NOT NULL,
+    inference_count INTEGER NOT NULL
+);
+"""
+
+SUMMARY_COLUMNS = (
+    "id, created_at, image_hash, transport, dog_detected, dog_score, "
+    "top_breed, top_confidence, queue_wait_ms, inference_ms"
+)
+
+class HistoryStore:
+    """SQLite-backed log of served predictions with incrementally maintained statistics."""
+
+    def __init__(self, db_path: str = settings.HISTORY_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, creating the schema on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+        with self._init_lock:
+            if not self._initialized:
+                conn.executescript(SCHEMA)
+                self._initialized = True
+
+        self._local.conn = conn
+        return conn
+
+    def insert_many(self, entries: List[Dict]) -> None:
+        """
+        Insert a batch of history entries and update the aggregates in one transaction.
+
+        Args:
+            entries: Rows as built by to_row()
+        """
+        if not entries:
+            return
+
+        breed_updates: Dict[str, Tuple[int, float, float]] = {}
+        day_updates: Dict[str, List[float]] = {}
+        for entry in entries:
+            if entry["top_breed"] is not None:
+                count, confidence_sum, last_seen = breed_updates.get(entry["top_breed"], (0, 0.0, 0.0))
+                breed_updates[entry["top_breed"]] = (
+                    count + 1, confidence_sum + entry["top_confidence"], max(last_seen, entry["created_at"])
+                )
+            day = time.strftime("%Y-%m-%d", time.gmtime(entry["created_at"]))
+            totals = day_updates.setdefault(day, [0, 0, 0.0, 0])
+            totals[0] += 1
+            totals[1] += 0 if entry["dog_detected"] else 1
+            if entry["inference_ms"] is not None:
+                totals[2] += entry["inference_ms"]
+                totals[3] += 1
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO predictions (created_at, image_hash, transport, dog_detected, dog_score, "
+                "top_breed, top_confidence, queue_wait_ms, inference_ms, model_versions, "
+                "model_predictions, aggregated_results) VALUES (:created_at, :image_hash, :transport, "
+                ":dog_detected, :dog_score, :top_breed, :top_confidence, :queue_wait_ms, :inference_ms, "
+                ":model_versions, :model_predictions, :aggregated_results)",
+                entries
+            )
+            conn.executemany(
+                "INSERT INTO breed_counts (breed, count, confidence_sum, last_seen) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (breed) DO UPDATE SET count = count + excluded.count, "
+                "confidence_sum = confidence_sum + excluded.confidence_sum, "
+                "last_seen = MAX(last_seen, excluded.last_seen)",
+                [(breed, *values) for breed, values in breed_updates.items()]
+            )
+            conn.executemany(
+                "INSERT INTO daily_counts (day, predictions, no_dog, inference_ms_sum, inference_count) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (day) DO UPDATE SET predictions = predictions + excluded.predictions, "
+                "no_dog = no_dog + excluded.no_dog, "
+                "inference_ms_sum = inference_ms_sum + excluded.inference_ms_sum, "
+                "inference_count = inference_count + excluded.inference_count",
+                [(day, *values) for day, values in day_updates.items()]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def list_entries(self, limit: int, before_id: Optional[int] = None, breed: Optional[str] = None,
+                     image_hash: Optional[str] = None, since: Optional[float] = None,
+                     until: Optional[float] = None) -> List[Dict]:
+        """
+        Get a page of entries, newest first (keyset pagination on id).
+
+        Args:
+            before_id: Only entries older than this id (the last id of the previous page)
+            breed: Only entries whose top aggregated breed is this one
+            image_hash: Only entries for this image
+            since / until: Unix time bounds on created_at
+        """
+        clauses, params = [], []
+        if before_id is not None:
+            clauses.append("id < ?")
+            params.append(before_id)
+        if breed is not None:
+            clauses.append("top_breed = ?")
+            params.append(breed)
+        if image_hash is not None:
+            clauses.append("image_hash = ?")
+            params.append(image_hash)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connect().execute(
+            f"SELECT {SUMMARY_COLUMNS} FROM predictions {where} ORDER BY id DESC LIMIT ?",
+            (*params, limit)
+        ).fetchall()
+        return [self._summary(row) for row in rows]
+
+    def get(self, entry_id: int) -> Optional[Dict]:
+        row = self._connect().execute(
+            f"SELECT {SUMMARY_COLUMNS}, model_versions, model_predictions, aggregated_results "
+            "FROM predictions WHERE id = ?",
+            (entry_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        entry = self._summary(row)
+        for column in ("model_versions", "model_predictions", "aggregated_results"):
+            entry[column] = json.loads(row[column])
+        return entry
+
+    def get_stats(self, days: int, top: int) -> Dict:
+        """Totals, most predicted breeds and per-day counts from the aggregate tables."""
+        conn = self._connect()
+        totals = conn.execute(
+            "SELECT COALESCE(SUM(predictions), 0) AS predictions, COALESCE(SUM(no_dog), 0) AS no_dog "
+            "FROM daily_counts"
+        ).fetchone()
+        breeds = conn.execute(
+            "SELECT breed, count, confidence_sum / count AS mean_confidence, last_seen "
+            "FROM breed_counts ORDER BY count DESC LIMIT ?",
+            (top,)
+        ).fetchall()
+        first_day = time.strftime("%Y-%m-%d", time.gmtime(time.time() - (days - 1) * 86400))
+        daily = conn.execute(
+            "SELECT day, predictions, no_dog, "
+            "CASE WHEN inference_count > 0 THEN inference_ms_sum / inference_count END AS mean_inference_ms "
+            "FROM daily_counts WHERE day >= ? ORDER BY day",
+            (first_day,)
+        ).fetchall()
+        return {
+            "total_predictions": totals["predictions"],
+            "no_dog_detected": totals["no_dog"],
+            "top_breeds": [dict(row) for row in breeds],
+            "daily": [dict(row) for row in daily],
+        }
+
+    def _summary(self, row: sqlite3.Row) -> Dict:
+        entry = {key: row[key] for key in SUMMARY_COLUMNS.split(", ")}
+        entry["dog_detected"] = bool(entry["dog_detected"])
+        return entry
+
+def to_row(created_at: float, transport: str, results: Dict, timings: Optional[Dict]) -> Dict:
+    """Flatten a predictor result into a predictions row."""
+    aggregated = results.get("aggregated_results") or []
+    top = aggregated[0] if aggregated else None
+    timings = timings or {}
+    return {
+        "created_at": created_at,
+        "image_hash": results.get("image_hash"),
+        "transport": transport,
+        "dog_detected": int(results.get("dog_detected", True)),
+        "dog_score": results.get("dog_score"),
+        "top_breed": top["breed"] if top else None,
+        "top_confidence": top["confidence"] if top else None,
+        "queue_wait_ms": timings.get("queue_wait_ms"),
+        "inference_ms": timings.get("inference_ms"),
+        "model_versions": json.dumps(results.get("model_versions", {})),
+        "model_predictions": json.dumps(results.get("model_predictions", {})),
+        "aggregated_results": json.dumps(aggregated),
+    }
+
+# Global instance
+history_store = HistoryStore()
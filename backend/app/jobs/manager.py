@@ -0,0 +1,277 @@
+import os
+import time
+import shutil
+import tarfile
+import zipfile
+import logging
+import threading
+from typing import BinaryIO, List, Optional, Tuple
+from fastapi import HTTPException
+from app.api.admission import admission_controller
+from app.jobs.store import job_store, TERMINAL_STATUSES
+from app.history.recorder import history_recorder
+from app.models.predictor import dog_breed_predictor
+from app.utils.degradation import degradation_controller
+from app.utils.metrics import metrics
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz")
+
+# Admission client shared by all job workers
+JOB_CLIENT_ID = "jobs"
+
+# Staged directories without a job are only swept once this old, another worker
+# process may still be staging them
+STAGING_GRACE_SECONDS = 3600
+
+class JobManager:
+    """Stages job inputs on disk and processes queued jobs with a pool of worker threads."""
+
+    def __init__(self):
+        self.files_dir = settings.JOBS_FILES_DIR
+        self._workers: List[threading.Thread] = []
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+
+    # Staging
+
+    def stage_files(self, job_id: str, uploads: List[Tuple[str, BinaryIO]]) -> List[Tuple[str, str]]:
+        """
+        Copy uploaded images, or the images inside uploaded archives, to the job's directory.
+
+        Files are stored under their index rather than their uploaded name so
+        archive members cannot escape the job directory.
+
+        Args:
+            job_id: Identifier of the job
+            uploads: (filename, file object) for every uploaded file
+
+        Returns:
+            (original filename, path on disk) for every image
+
+        Raises:
+            ValueError: If no image was found, a file is not an image or a limit is exceeded
+        """
+        job_dir = os.path.join(self.files_dir, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        items: List[Tuple[str, str]] = []
+        staged_bytes = 0
+
+        def stage(name: str, declared_size: int, source: BinaryIO) -> None:
+            nonlocal staged_bytes
+            if len(items) >= settings.JOB_MAX_IMAGES:
+                raise ValueError(f"Too many images. Maximum per job: {settings.JOB_MAX_IMAGES}")
+            if declared_size > settings.MAX_FILE_SIZE:
+                raise ValueError(f"Image {name} is too large")
+            if staged_bytes + declared_size > settings.JOB_MAX_TOTAL_SIZE:
+                raise self._total_too_large()
+
+            path = os.path.join(job_dir, str(len(items)))
+            with open(path, "wb") as target:
+                shutil.copyfileobj(source, target, length=1024 * 1024)
+            # Declared archive sizes can lie, the limits are checked again on what was written
+            size = os.path.getsize(path)
+            if size > settings.MAX_FILE_SIZE:
+                raise ValueError(f"Image {name} is too large")
+            staged_bytes += size
+            if staged_bytes > settings.JOB_MAX_TOTAL_SIZE:
+                raise self._total_too_large()
+            items.append((os.path.basename(name), path))
+
+        try:
+            for filename, fileobj in uploads:
+                lower_name = (filename or "").lower()
+                if lower_name.endswith(".zip"):
+                    with zipfile.ZipFile(fileobj) as archive:
+                        for member in archive.infolist():
+                            # Archives may hold other files (READMEs, metadata), those are skipped
+                            if member.is_dir() or not self._is_image(member.filename):
+                                continue
+                            with archive.open(member) as source:
+                                stage(member.filename, member.file_size, source)
+                elif lower_name.endswith(ARCHIVE_EXTENSIONS):
+                    with tarfile.open(fileobj=fileobj, mode="r:*") as archive:
+                        for member in archive:
+                            if not member.isfile() or not self._is_image(member.name):
+                                continue
+                            stage(member.name, member.size, archive.extractfile(member))
+                else:
+                    if not self._is_image(lower_name):
+                        raise ValueError(
+                            f"Unsupported file {filename}. Allowed: {', '.join(settings.ALLOWED_EXTENSIONS)} "
+                            f"images or {', '.join(ARCHIVE_EXTENSIONS)} archives"
+                        )
+                    stage(filename, 0, fileobj)
+
+            if not items:
+                raise ValueError("No images found in upload")
+        except Exception:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+
+        return items
+
+    def _is_image(self, filename: str) -> bool:
+        return filename.rsplit(".", 1)[-1].lower() in settings.ALLOWED_EXTENSIONS
+
+    def _total_too_large(self) -> ValueError:
+        return ValueError(f"Upload too large. Maximum per job: {settings.JOB_MAX_TOTAL_SIZE // (1024*1024)}MB")
+
+    def submit(self, job_id: str, items: List[Tuple[str, str]]) -> None:
+        """Persist a staged job and wake up a worker."""
+        job_store.create_job(job_id, items)
+        self._wake_event.set()
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """
+        Cancel a job, deleting its staged files right away if no worker had claimed it.
+
+        Returns:
+            The job status after the request, or None if the job does not exist
+        """
+        status = job_store.request_cancel(job_id)
+        if status == "cancelled":
+            # No worker will claim the job, so none would clean it up
+            self._cleanup(job_id)
+        return status
+
+    # Workers
+
+    def start(self) -> None:
+        """Resume interrupted jobs and start the worker threads."""
+        if self._workers:
+            return
+        requeued = job_store.requeue_interrupted()
+        if requeued:
+            logger.info(f"Resuming {requeued} interrupted job(s)")
+        self._sweep_staged()
+
+        self._stop_event.clear()
+        for index in range(max(1, settings.JOB_WORKERS)):
+            worker = threading.Thread(target=self._run, name=f"job-worker-{index}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        logger.info(f"Started {len(self._workers)} job worker(s)")
+
+    def stop(self) -> None:
+        """
+        Stop the workers after their current batch.
+
+        A job interrupted here stays 'running' in the store and is resumed on the next start.
+        """
+        self._stop_event.set()
+        self._wake_event.set()
+        for worker in self._workers:
+            worker.join(timeout=30)
+        self._workers = []
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            job_id = job_store.claim_next_job()
+            if job_id is None:
+                self._wake_event.wait(timeout=1.0)
+                self._wake_event.clear()
+                continue
+            try:
+                self._process_job(job_id)
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {e}")
+                job_store.finish_job(job_id, "failed", str(e))
+                self._cleanup(job_id)
+
+    def _process_job(self, job_id: str) -> None:
+        logger.info(f"Processing job {job_id}")
+        while True:
+            if self._stop_event.is_set():
+                return
+            if job_store.is_cancel_requested(job_id):
+                job_store.finish_job(job_id, "cancelled")
+                logger.info(f"Job {job_id} cancelled")
+                break
+
+            items = job_store.get_pending_items(job_id, settings.JOB_BATCH_SIZE)
+            if not items:
+                job_store.finish_job(job_id, "completed")
+                logger.info(f"Job {job_id} completed")
+                break
+
+            results = self._process_batch(items)
+            if results is None:
+                # Stopped while waiting for an inference slot, the batch is retried on resume
+                return
+            job_store.save_results(job_id, results)
+
+        self._cleanup(job_id)
+
+    def _process_batch(self, items: List[dict]) -> Optional[List[Tuple[int, Optional[dict], Optional[str]]]]:
+        """
+        Predict a batch of job items inside a bulk admission slot, so jobs never take
+        more than their share of the inference slots from interactive requests.
+        Batches are served at the current degradation level like interactive requests,
+        but their latency is not fed to the controller: it covers a whole batch.
+        
+        Returns:
+            (item index, result, error) per item, or None if the manager stopped first
+        """
+        contents = []
+        for item in items:
+            try:
+                with open(item["path"], "rb") as f:
+                    contents.append(f.read())
+            except OSError:
+                contents.append(None)
+
+        readable = [content for content in contents if content is not None]
+        while True:
+            try:
+                with admission_controller.admit_from_thread(JOB_CLIENT_ID, {}, "bulk"):
+                    degradation_level = degradation_controller.evaluate(admission_controller.queue_depth)
+                    predictions = iter(dog_breed_predictor.predict_batch(readable, degradation_level))
+                break
+            except HTTPException as e:
+                # Rate limited or crowded out by interactive traffic: back off and retry
+                retry_after = float((e.headers or {}).get("Retry-After", 1))
+                logger.info(f"Job batch not admitted ({e.detail}), retrying in {retry_after:.0f}s")
+                if self._stop_event.wait(retry_after):
+                    return None
+        metrics.inc("predictions_by_degradation_level_total", len(readable), level=degradation_level)
+
+        results = []
+        for item, content in zip(items, contents):
+            if content is None:
+                results.append((item["item_index"], None, "Input file missing"))
+                continue
+            result = next(predictions)
+            if "error" in result:
+                results.append((item["item_index"], None, result["error"]))
+            else:
+                results.append((item["item_index"], result, None))
+                history_recorder.record(result, "job")
+        return results
+
+    def _sweep_staged(self) -> None:
+        """Delete staged files left behind by finished or unknown jobs (e.g. after a crash)."""
+        if not os.path.isdir(self.files_dir):
+            return
+        swept = 0
+        for job_id in os.listdir(self.files_dir):
+            job = job_store.get_job(job_id)
+            if job is None:
+                age = time.time() - os.path.getmtime(os.path.join(self.files_dir, job_id))
+                if age < STAGING_GRACE_SECONDS:
+                    continue
+            elif job["status"] not in TERMINAL_STATUSES:
+                continue
+            self._cleanup(job_id)
+            swept += 1
+        if swept:
+            logger.info(f"Deleted staged files of {swept} finished job(s)")
+
+    def _cleanup(self, job_id: str) -> None:
+        """Delete a finished job's input files, its results live in the store."""
+        shutil.rmtree(os.path.join(self.files_dir, job_id), ignore_errors=True)
+
+# Global instance
+job_manager = JobManager()
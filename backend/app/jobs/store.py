@@ -0,0 +1,231 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    total_items INTEGER NOT NULL,
+    processed_items INTEGER NOT NULL DEFAULT 0,
+    failed_items INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at);
+
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL,
+    item_index INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    path TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    result TEXT,
+    error TEXT,
+    PRIMARY KEY (job_id, item_index)
+);
+CREATE INDEX IF NOT EXISTS idx_job_items_status ON job_items (job_id, status, item_index);
+"""
+
+# Job states that will not change anymore
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+class JobStore:
+    """SQLite-backed persistence of jobs and their per-image results."""
+
+    def __init__(self, db_path: str = settings.JOBS_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, creating the schema on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+        with self._init_lock:
+            if not self._initialized:
+                conn.executescript(SCHEMA)
+                self._initialized = True
+
+        self._local.conn = conn
+        return conn
+
+    def create_job(self, job_id: str, items: List[Tuple[str, str]]) -> None:
+        """
+        Create a queued job.
+
+        Args:
+            job_id: Identifier of the job
+            items: (filename, path on disk) for every image of the job
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO jobs (id, status, created_at, updated_at, total_items) VALUES (?, 'queued', ?, ?, ?)",
+                (job_id, now, now, len(items))
+            )
+            conn.executemany(
+                "INSERT INTO job_items (job_id, item_index, filename, path) VALUES (?, ?, ?, ?)",
+                [(job_id, index, filename, path) for index, (filename, path) in enumerate(items)]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def claim_next_job(self) -> Optional[str]:
+        """Atomically mark the oldest queued job as running and return its id."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?",
+                    (time.time(), row["id"])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return row["id"] if row is not None else None
+
+    def requeue_interrupted(self) -> int:
+        """Put jobs left running by a previous process back in the queue."""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = 'queued', updated_at = ? WHERE status = 'running'",
+            (time.time(),)
+        )
+        return cursor.rowcount
+
+    def get_pending_items(self, job_id: str, limit: int) -> List[Dict]:
+        rows = self._connect().execute(
+            "SELECT item_index, filename, path FROM job_items "
+            "WHERE job_id = ? AND status = 'pending' ORDER BY item_index LIMIT ?",
+            (job_id, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def save_results(self, job_id: str, results: List[Tuple[int, Optional[Dict], Optional[str]]]) -> None:
+        """
+        Store the results of a batch and update the job's progress in one transaction.
+
+        Args:
+            results: (item index, result dictionary or None, error message or None)
+        """
+        conn = self._connect()
+        failed = sum(1 for _, _, error in results if error)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "UPDATE job_items SET status = ?, result = ?, error = ? WHERE job_id = ? AND item_index = ?",
+                [
+                    ("failed" if error else "done", json.dumps(result) if result is not None else None,
+                     error, job_id, index)
+                    for index, result, error in results
+                ]
+            )
+            conn.execute(
+                "UPDATE jobs SET processed_items = processed_items + ?, failed_items = failed_items + ?, "
+                "updated_at = ? WHERE id = ?",
+                (len(results), failed, time.time(), job_id)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def finish_job(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+            (status, error, time.time(), job_id)
+        )
+
+    def request_cancel(self, job_id: str) -> Optional[str]:
+        """
+        Cancel a job. Queued jobs are cancelled immediately, running jobs stop after the current batch.
+
+        Returns:
+            The job status after the request, or None if the job does not exist
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            status = row["status"]
+            if status == "queued":
+                status = "cancelled"
+                conn.execute(
+                    "UPDATE jobs SET status = 'cancelled', cancel_requested = 1, updated_at = ? WHERE id = ?",
+                    (time.time(), job_id)
+                )
+            elif status == "running":
+                conn.execute(
+                    "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ?",
+                    (time.time(), job_id)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return status
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        row = self._connect().execute(
+            "SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        row = self._connect().execute(
+            "SELECT id, status, created_at, updated_at, total_items, processed_items, failed_items, "
+            "cancel_requested, error FROM jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def get_results(self, job_id: str, offset: int, limit: int) -> List[Dict]:
+        """Get a page of finished items, in upload order."""
+        rows = self._connect().execute(
+            "SELECT item_index, filename, status, result, error FROM job_items "
+            "WHERE job_id = ? AND status != 'pending' ORDER BY item_index LIMIT ? OFFSET ?",
+            (job_id, limit, offset)
+        ).fetchall()
+        results = []
+        for row in rows:
+            item = dict(row)
+            item["result"] = json.loads(item["result"]) if item["result"] else None
+            results.append(item)
+        return results
+
+# Global instance
+job_store = JobStore()
@@ -1,37 +1,60 @@
 from contextlib import asynccontextmanager
+import asyncio
+import logging
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# Thread-count env vars must be exported before torch / tensorflow are imported below
+from app.utils.runtime_config import runtime_configurator
+runtime_configurator.apply_environment()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import router
+from app.api.admin import admin_router
+from app.api.jobs import jobs_router
+from app.api.history import history_router
+from app.api.admission import admission_controller
+from app.history.recorder import history_recorder
+from app.jobs.manager import job_manager
+from app.rpc.server import grpc_server
 from app.config import settings
-import logging
 
 try:
     from app.models.real_model_loader import real_model_loader
-    USE_REAL_MODELS = True
+    USE_REAL_MODELS = not settings.SIMULATOR_ENABLED
 except ImportError:
     USE_REAL_MODELS = False
 
 from app.models.model_loader import model_loader
+from app.models.model_registry import model_registry
+from app.models.dog_gate import dog_gate
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
 logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     if USE_REAL_MODELS:
         logger.info("Starting Dog Breed Classifier API with REAL MODELS...")
+    elif settings.SIMULATOR_ENABLED:
+        logger.info("Starting Dog Breed Classifier API with SIMULATED MODELS...")
     else:
         logger.info("Starting Dog Breed Classifier API with DEMO MODELS...")
     
+    runtime_configurator.apply_framework_threads()
+    
     if USE_REAL_MODELS:
         success = real_model_loader.load_models()
         if success:
             loaded_models = real_model_loader.get_loaded_model_names()
             logger.info(f"Real models loaded successfully: {loaded_models}")
             logger.info("Using your real trained models!")
+            
+            if settings.RUNTIME_AUTOTUNE:
+                runtime_configurator.autotune(real_model_loader)
         else:
             logger.warning("Failed to load real models - falling back to demo models")
             model_loader.load_models()
@@ -40,8 +63,32 @@ async def lifespan(app: FastAPI):
         model_loader.load_models()
         logger.info("Using demo models - install dependencies for real models")
     
+    serving_real_models = bool(USE_REAL_MODELS and real_model_loader.get_loaded_model_names())
+    if serving_real_models:
+        model_registry.attach(real_model_loader)
+    else:
+        model_registry.attach(model_loader)
+    
+    # Unless configured, the gate only runs in front of real models
+    dog_gate.load(default_enabled=serving_real_models)
+    
+    if settings.MODEL_WATCH_ENABLED:
+        model_registry.start_watcher()
+    
+    # gRPC handlers and job workers take their inference slots on this loop
+    admission_controller.attach_loop(asyncio.get_running_loop())
+    history_recorder.start()
+    job_manager.start()
+    
+    if settings.GRPC_ENABLED:
+        grpc_server.start()
+    
     yield
     
+    grpc_server.stop()
+    job_manager.stop()
+    history_recorder.stop()
+    model_registry.stop_watcher()
     logger.info("Shutting down Dog Breed Classifier API...")
 
 # Create FastAPI app
@@ -61,10 +108,18 @@ app.add_middleware(
 )
 
 app.include_router(router, prefix=settings.API_V1_STR)
+app.include_router(jobs_router, prefix=settings.API_V1_STR)
+app.include_router(history_router, prefix=settings.API_V1_STR)
+app.include_router(admin_router, prefix=f"{settings.API_V1_STR}/admin")
 
 @app.get("/")
 async def root():
-    model_info = "Real Models" if USE_REAL_MODELS else "Demo Models"
+    if USE_REAL_MODELS:
+        model_info = "Real Models"
+    elif settings.SIMULATOR_ENABLED:
+        model_info = "Simulated Models"
+    else:
+        model_info = "Demo Models"
     return {
         "message": "Dog Breed Classifier API",
         "version": settings.VERSION,
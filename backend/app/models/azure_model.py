@@ -7,6 +7,7 @@ import logging
 from typing import List, Tuple
 from azure.cognitiveservices.vision.customvision.prediction import CustomVisionPredictionClient
 from msrest.authentication import ApiKeyCredentials
+from app.models.model_names import AZURE_MODEL_NAME
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +18,7 @@ class AzureCustomVisionModel:
         self.cv_key = ''
         self.cv_endpoint = ''
         self.model_name = 'Iteration1'
-        self.name = "Azure_Custom_Vision"
+        self.name = AZURE_MODEL_NAME
         
         try:
             credentials = ApiKeyCredentials(in_headers={"Prediction-key": self.cv_key})
@@ -0,0 +1,132 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from PIL import Image
+from app.utils.metrics import metrics
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# ImageNet-1k class indices 151 (Chihuahua) to 268 (Mexican hairless) are dog breeds
+IMAGENET_DOG_CLASSES = slice(151, 269)
+
+# Images per forward pass of the gate model
+GATE_BATCH_SIZE = 32
+
+class DogGate:
+    """
+    Cheap pre-classification deciding whether an image contains a dog.
+
+    Uses an ImageNet MobileNetV3-Small and sums the probability mass of the
+    ImageNet dog classes. Images below the threshold skip the ensemble.
+    """
+
+    def __init__(self):
+        self.model = None
+        self.input_size = (224, 224)
+        self.threshold = settings.DOG_GATE_THRESHOLD
+        self.enabled = bool(settings.DOG_GATE_ENABLED)
+        # Why the gate is inactive, reported by /health
+        self.load_error: Optional[str] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.model is not None
+
+    def status(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "loaded": self.is_loaded,
+            "threshold": self.threshold,
+            "error": self.load_error,
+        }
+
+    def load(self, default_enabled: bool = True) -> bool:
+        """
+        Load the gate model.
+
+        Args:
+            default_enabled: Whether to load it when DOG_GATE_ENABLED is not set
+                (True when real models are served)
+
+        Returns:
+            bool: True if the gate is active; images are not filtered otherwise
+        """
+        self.load_error = None
+        self.enabled = default_enabled if settings.DOG_GATE_ENABLED is None else settings.DOG_GATE_ENABLED
+        if not self.enabled:
+            logger.info("Dog gate disabled")
+            return False
+        try:
+            import tensorflow as tf
+            height, width = self.input_size
+            self.model = tf.keras.applications.MobileNetV3Small(
+                input_shape=(height, width, 3),
+                weights="imagenet",
+                include_top=True
+            )
+            # Trace the graph now rather than on the first request
+            self.model(np.zeros((1, height, width, 3), dtype=np.float32), training=False)
+            logger.info(f"Dog gate loaded (threshold={self.threshold})")
+            return True
+        except ImportError:
+            self.load_error = "TensorFlow not available"
+            logger.warning("TensorFlow not available, dog gate disabled")
+        except Exception as e:
+            self.load_error = str(e)
+            logger.warning(f"Could not load dog gate, images will not be filtered: {e}")
+        self.model = None
+        return False
+
+    def dog_scores(self, images: List[Image.Image]) -> List[float]:
+        """Probability mass of the ImageNet dog classes for RGB images, GATE_BATCH_SIZE per forward pass."""
+        height, width = self.input_size
+        scores = []
+        for start in range(0, len(images), GATE_BATCH_SIZE):
+            # MobileNetV3 rescales internally and expects [0, 255] input
+            batch = np.stack([
+                np.asarray(image.resize((width, height)), dtype=np.float32)
+                for image in images[start:start + GATE_BATCH_SIZE]
+            ])
+            probabilities = np.asarray(self.model(batch, training=False))
+            scores.extend(float(score) for score in probabilities[:, IMAGENET_DOG_CLASSES].sum(axis=1))
+        return scores
+
+    def dog_score(self, image: Image.Image) -> float:
+        """Probability mass of the ImageNet dog classes for an RGB image."""
+        return self.dog_scores([image])[0]
+
+    def check(self, image: Image.Image) -> Tuple[bool, Optional[float]]:
+        """
+        Decide whether an image should go through the ensemble.
+
+        Returns:
+            (dog detected, dog score or None when the gate is inactive)
+        """
+        return self.check_batch([image])[0]
+
+    def check_batch(self, images: List[Image.Image]) -> List[Tuple[bool, Optional[float]]]:
+        """check() for several images, batched through the gate model."""
+        if self.model is None or not images:
+            return [(True, None)] * len(images)
+
+        try:
+            scores = self.dog_scores(images)
+        except Exception as e:
+            # Never reject an image because the gate itself failed
+            logger.error(f"Dog gate error: {e}")
+            return [(True, None)] * len(images)
+
+        decisions = [(score >= self.threshold, score) for score in scores]
+        metrics.inc("dog_gate_checks_total", len(decisions))
+        rejections = sum(1 for is_dog, _ in decisions if not is_dog)
+        if rejections:
+            metrics.inc("dog_gate_rejections_total", rejections)
+        checks = metrics.get_counter("dog_gate_checks_total")
+        metrics.set_gauge("dog_gate_rejection_rate", metrics.get_counter("dog_gate_rejections_total") / checks)
+        for score in scores:
+            metrics.observe("dog_gate_score", score)
+        return decisions
+
+# Global instance
+dog_gate = DogGate()
@@ -1,38 +1,137 @@
 import os
+import time
+import zlib
+import threading
 import numpy as np
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import logging
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Side of the square matrices multiplied to burn CPU time
+BURN_SIZE = 512
+
+_burn_seconds: Optional[float] = None
+_burn_lock = threading.Lock()
+
+def _full_burn_seconds(operand: np.ndarray) -> float:
+    """Time of one BURN_SIZE matmul on this machine, measured once per process."""
+    global _burn_seconds
+    with _burn_lock:
+        if _burn_seconds is None:
+            np.dot(operand, operand)
+            start = time.perf_counter()
+            for _ in range(3):
+                np.dot(operand, operand)
+            _burn_seconds = max((time.perf_counter() - start) / 3, 1e-6)
+        return _burn_seconds
+
 class DummyModel:
     """Dummy model for demonstration purposes."""
     
-    def __init__(self, model_name: str):
+    def __init__(self, model_name: str, seed: Optional[int] = None):
         self.name = model_name
-        np.random.seed(hash(model_name) % 2**32)  # Different seed per model
+        # Own generator per model (stable across processes, unlike hash()) instead of the global state
+        self._rng = np.random.default_rng(zlib.crc32(model_name.encode()) if seed is None else seed)
+        # Generators are not thread-safe and requests run in a thread pool
+        self._rng_lock = threading.Lock()
     
-    def predict(self, image_array: np.ndarray, verbose=0) -> np.ndarray:
+    def predict(self, image_array: np.ndarray, verbose=0, strict: bool = False) -> np.ndarray:
         """Generate dummy predictions."""
         batch_size = image_array.shape[0]
         num_classes = len(settings.DOG_BREEDS)
         
         # Generate realistic-looking probabilities
-        logits = np.random.normal(0, 1, (batch_size, num_classes))
+        with self._rng_lock:
+            logits = self._rng.normal(0, 1, (batch_size, num_classes))
         # Apply softmax to get probabilities
         exp_logits = np.exp(logits - np.max(logits, axis=1, keepdims=True))
         probabilities = exp_logits / np.sum(exp_logits, axis=1, keepdims=True)
         
         return probabilities
 
+class SimulatedModel(DummyModel):
+    """
+    Dummy model with the resource profile of a real one, for load tests without weights.
+    
+    Profile keys (see settings.SIMULATOR_PROFILES):
+        latency_ms: Median latency of a batch of one
+        latency_sigma: Spread of the lognormal latency distribution
+        cpu_fraction: Share of the latency spent computing (the rest sleeps, like I/O or a GPU wait)
+        memory_mb: Memory held while the model is loaded
+        batch_exponent: Latency grows as batch_size ** batch_exponent (1 = no batching gain)
+        input_size: [height, width] the predictor resizes images to
+    """
+    
+    DEFAULT_PROFILE = {
+        "latency_ms": 50.0,
+        "latency_sigma": 0.25,
+        "cpu_fraction": 0.8,
+        "memory_mb": 100,
+        "batch_exponent": 0.7,
+        "input_size": [224, 224],
+    }
+    
+    def __init__(self, model_name: str, profile: Optional[Dict] = None, seed: Optional[int] = None):
+        super().__init__(model_name, seed)
+        self.profile = {**self.DEFAULT_PROFILE, **(profile or {})}
+        self.input_size: Tuple[int, int] = tuple(self.profile["input_size"])
+        # Touch every page so the footprint shows up in RSS like real weights
+        self.weights = np.ones(int(self.profile["memory_mb"] * 1024 * 1024), dtype=np.uint8)
+        # Operand of the CPU burn; numpy releases the GIL during a matmul like real inference kernels
+        self._burn_operand = np.ones((BURN_SIZE, BURN_SIZE), dtype=np.float32)
+    
+    def sample_latency(self, batch_size: int = 1) -> float:
+        """Draw the latency of one call, in seconds."""
+        with self._rng_lock:
+            noise = self._rng.lognormal(0.0, self.profile["latency_sigma"])
+        base = self.profile["latency_ms"] / 1000 * batch_size ** self.profile["batch_exponent"]
+        return base * noise
+    
+    def predict(self, image_array: np.ndarray, verbose=0, strict: bool = False) -> np.ndarray:
+        """Spend a sampled amount of time (CPU burn then sleep) before returning dummy predictions."""
+        latency = self.sample_latency(image_array.shape[0])
+        cpu_time = latency * self.profile["cpu_fraction"]
+        
+        start = time.perf_counter()
+        self._burn(cpu_time)
+        
+        remaining = latency - (time.perf_counter() - start)
+        if remaining > 0:
+            time.sleep(remaining)
+        
+        return super().predict(image_array, verbose, strict)
+    
+    def _burn(self, seconds: float) -> None:
+        """
+        Keep a core busy for about `seconds` with matmuls sized from the duration.
+        
+        The work is a few large BLAS calls, not a Python loop of small ones, so
+        the GIL is released for nearly all of it.
+        """
+        full_seconds = _full_burn_seconds(self._burn_operand)
+        full_count, rest = divmod(seconds, full_seconds)
+        for _ in range(int(full_count)):
+            np.dot(self._burn_operand, self._burn_operand)
+        
+        # Matmul time grows with the cube of the side
+        side = int(BURN_SIZE * (rest / full_seconds) ** (1 / 3))
+        if side > 0:
+            operand = self._burn_operand[:side, :side]
+            np.dot(operand, operand)
+
 class ModelLoader:
     """Handles loading and management of models (demo version)."""
     
     def __init__(self):
         self.models: Dict[str, DummyModel] = {}
         self.models_dir = settings.MODELS_DIR
-        self.model_names = settings.MODEL_NAMES
+        self.simulate = settings.SIMULATOR_ENABLED
+        if self.simulate and settings.SIMULATOR_PROFILES:
+            self.model_names = [name for name in settings.SIMULATOR_PROFILES if name != "default"]
+        else:
+            self.model_names = settings.MODEL_NAMES
         
     def load_models(self) -> bool:
         """
@@ -64,10 +163,26 @@ class ModelLoader:
             bool: True if model was loaded successfully
         """
         # Create dummy model for demonstration
-        logger.info(f"Creating demo model: {model_name}")
-        self.models[model_name] = DummyModel(model_name)
+        logger.info(f"Creating {'simulated' if self.simulate else 'demo'} model: {model_name}")
+        self.models[model_name] = self.build_model(model_name)
         return True
     
+    def build_model(self, model_name: str, source: Optional[str] = None) -> DummyModel:
+        """Build a fresh instance of a model without registering it."""
+        if not self.simulate:
+            return DummyModel(model_name)
+        
+        profiles = settings.SIMULATOR_PROFILES
+        profile = {**profiles.get("default", {}), **profiles.get(model_name, {})}
+        seed = None
+        if settings.SIMULATOR_SEED is not None:
+            seed = settings.SIMULATOR_SEED + zlib.crc32(model_name.encode())
+        return SimulatedModel(model_name, profile, seed)
+    
+    def get_model_sources(self) -> Dict[str, str]:
+        """Demo models are not backed by files."""
+        return {}
+    
     def get_model(self, model_name: str) -> Optional[DummyModel]:
         """Get a specific model by name."""
         return self.models.get(model_name)
@@ -0,0 +1,7 @@
+# Names the models are registered under, shared by the loaders, the predictor and the training scripts
+
+# MobileNetV3 student distilled from the ensemble (see app.training.distill)
+STUDENT_MODEL_NAME = "Distilled_Student"
+
+# Remote model: needs the encoded image and every call is billed
+AZURE_MODEL_NAME = "Azure_Custom_Vision"
@@ -0,0 +1,315 @@
+import gc
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+import numpy as np
+from app.models.model_names import AZURE_MODEL_NAME
+from app.models.dog_gate import dog_gate
+from app.config import settings
+from app.utils.prediction_cache import prediction_cache
+
+logger = logging.getLogger(__name__)
+
+class ModelVersion:
+    """A loaded model instance tagged with a version number."""
+
+    def __init__(self, name: str, version: int, model: object, source: Optional[str] = None):
+        self.name = name
+        self.version = version
+        self.model = model
+        self.source = source
+        self.loaded_at = time.time()
+        self.active_requests = 0
+        self.retired = False
+
+    @property
+    def key(self) -> str:
+        """Identifier of this version, used to key caches."""
+        return f"{self.name}@v{self.version}"
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "version": self.version,
+            "key": self.key,
+            "source": self.source,
+            "loaded_at": self.loaded_at,
+            "active_requests": self.active_requests,
+        }
+
+class ModelRegistry:
+    """
+    Versioned view over a model loader with zero-downtime hot reload.
+
+    New versions are built and warmed up in a background thread, then swapped in
+    atomically. Requests hold a reference to the versions they started with, and a
+    retired version is released once its last in-flight request has finished.
+    """
+
+    def __init__(self):
+        self.loader = None
+        self._entries: Dict[str, ModelVersion] = {}
+        # Retired versions still pinned by in-flight requests
+        self._retired: set = set()
+        self._lock = threading.Lock()
+        self._reloading: set = set()
+        self._watch_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def attach(self, loader) -> None:
+        """Register the models already loaded by a loader as version 1."""
+        with self._lock:
+            self.loader = loader
+            self._entries = {
+                name: ModelVersion(name, 1, model)
+                for name, model in loader.get_all_models().items()
+            }
+        logger.info(f"Model registry attached with models: {list(self._entries.keys())}")
+
+    # Loader-compatible interface
+
+    def get_model(self, model_name: str) -> Optional[object]:
+        """Get the current version of a model."""
+        entry = self._entries.get(model_name)
+        return entry.model if entry else None
+
+    def get_all_models(self) -> Dict[str, object]:
+        """Get the current version of all models."""
+        return {name: entry.model for name, entry in self._entries.items()}
+
+    def get_loaded_model_names(self) -> List[str]:
+        """Get names of all loaded models."""
+        return list(self._entries.keys())
+
+    def is_model_loaded(self, model_name: str) -> bool:
+        """Check if a specific model is loaded."""
+        return model_name in self._entries
+
+    # Versioning
+
+    def get_version_key(self, model_name: str) -> Optional[str]:
+        """Get the version key of the current version of a model."""
+        entry = self._entries.get(model_name)
+        return entry.key if entry else None
+
+    def get_versions_info(self) -> Dict[str, Dict]:
+        """Describe the current version of every model."""
+        with self._lock:
+            info = {name: entry.to_dict() for name, entry in self._entries.items()}
+        for name in info:
+            info[name]["reloading"] = name in self._reloading
+        return info
+
+    @contextmanager
+    def acquire_all(self) -> Iterator[Dict[str, ModelVersion]]:
+        """
+        Pin the current version of every model for the duration of a request.
+
+        Yields:
+            Dictionary of model name to pinned ModelVersion
+        """
+        with self._lock:
+            snapshot = dict(self._entries)
+            for entry in snapshot.values():
+                entry.active_requests += 1
+        try:
+            yield snapshot
+        finally:
+            for entry in snapshot.values():
+                self._release(entry)
+
+    def _release(self, entry: ModelVersion) -> None:
+        with self._lock:
+            entry.active_requests -= 1
+            drained = entry.retired and entry.active_requests == 0
+        if drained:
+            self._free(entry)
+
+    # Hot reload
+
+    def reload_async(self, model_name: str, source: Optional[str] = None) -> bool:
+        """
+        Start loading a new version of a model in the background.
+
+        Returns:
+            bool: False if a reload of this model is already in progress
+        """
+        with self._lock:
+            if model_name in self._reloading:
+                return False
+            self._reloading.add(model_name)
+
+        thread = threading.Thread(
+            target=self._reload,
+            args=(model_name, source),
+            name=f"model-reload-{model_name}",
+            daemon=True
+        )
+        thread.start()
+        return True
+
+    def reload(self, model_name: str, source: Optional[str] = None) -> bool:
+        """Load, warm up and swap in a new version of a model, blocking until done."""
+        with self._lock:
+            if model_name in self._reloading:
+                return False
+            self._reloading.add(model_name)
+        return self._reload(model_name, source)
+
+    def _reload(self, model_name: str, source: Optional[str]) -> bool:
+        try:
+            logger.info(f"Loading new version of {model_name}...")
+            new_model = self.loader.build_model(model_name, source)
+            self._warm_up(new_model)
+            self._swap(model_name, new_model, source)
+            return True
+        except Exception as e:
+            logger.error(f"Hot reload of {model_name} failed, keeping current version: {e}")
+            return False
+        finally:
+            with self._lock:
+                self._reloading.discard(model_name)
+
+    def _warm_up(self, model: object) -> None:
+        """
+        Run one prediction so the first real request does not pay for lazy initialization.
+
+        The prediction runs in strict mode, so a model that fails raises instead of
+        returning the wrappers' dummy output, and its output must be a probability
+        vector over the model's classes. Any failure aborts the swap.
+
+        Raises:
+            ValueError: If the model output is not a valid probability distribution
+        """
+        # Remote models (Azure) are not warmed up: every call is billed
+        if getattr(model, "name", None) == AZURE_MODEL_NAME:
+            return
+        height, width = getattr(model, "input_size", settings.IMAGE_SIZE)
+        output = np.asarray(model.predict(np.zeros((1, height, width, 3), dtype=np.float32), verbose=0, strict=True))
+
+        num_classes = len(getattr(model, "class_names", None) or settings.DOG_BREEDS)
+        if output.shape != (1, num_classes):
+            raise ValueError(f"Warm-up output has shape {output.shape}, expected (1, {num_classes})")
+        if not np.all(np.isfinite(output)):
+            raise ValueError("Warm-up output contains non-finite values")
+        if not np.isclose(output.sum(), 1.0, atol=1e-3):
+            raise ValueError(f"Warm-up output sums to {output.sum():.4f}, expected 1")
+
+    def _swap(self, model_name: str, new_model: object, source: Optional[str]) -> None:
+        with self._lock:
+            old_entry = self._entries.get(model_name)
+            version = old_entry.version + 1 if old_entry else 1
+            new_entry = ModelVersion(model_name, version, new_model, source)
+            self._entries[model_name] = new_entry
+            self.loader.models[model_name] = new_model
+
+            drained = False
+            if old_entry is not None:
+                old_entry.retired = True
+                drained = old_entry.active_requests == 0
+                if not drained:
+                    self._retired.add(old_entry)
+
+        logger.info(f"Swapped in {new_entry.key}")
+        if drained:
+            self._free(old_entry)
+
+    def _free(self, entry: ModelVersion) -> None:
+        """
+        Release the memory held by a retired version.
+
+        The wrapper's framework model is dropped along with the version so no
+        leftover reference to the wrapper keeps its weights alive. Keras' global
+        state (graphs, layer name counters) is only cleared when no TensorFlow
+        model is in use anymore, since clear_session() would affect them too.
+        """
+        prediction_cache.invalidate_version(entry.key)
+        with self._lock:
+            self._retired.discard(entry)
+        model, entry.model = entry.model, None
+        runtime = getattr(model, "runtime", None)
+        if hasattr(model, "model"):
+            model.model = None
+        del model
+        gc.collect()
+
+        if runtime == "tensorflow" and not self._runtime_in_use("tensorflow"):
+            try:
+                import tensorflow as tf
+                tf.keras.backend.clear_session()
+            except ImportError:
+                pass
+        elif runtime == "torch":
+            try:
+                import torch
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+            except ImportError:
+                pass
+        logger.info(f"Released retired model version {entry.key}")
+
+    def _runtime_in_use(self, runtime: str) -> bool:
+        """Whether a current or still pinned version, or the dog gate (TensorFlow), uses a runtime."""
+        with self._lock:
+            entries = list(self._entries.values()) + list(self._retired)
+        if any(getattr(entry.model, "runtime", None) == runtime for entry in entries):
+            return True
+        return runtime == "tensorflow" and dog_gate.is_loaded
+
+    # File watcher
+
+    def start_watcher(self, interval: float = settings.MODEL_WATCH_INTERVAL) -> None:
+        """Poll the files backing each model and hot reload them when they change."""
+        if self._watch_thread is not None or self.loader is None:
+            return
+        self._stop_event.clear()
+        self._watch_thread = threading.Thread(
+            target=self._watch,
+            args=(interval,),
+            name="model-watcher",
+            daemon=True
+        )
+        self._watch_thread.start()
+        logger.info(f"Watching model files every {interval}s")
+
+    def stop_watcher(self) -> None:
+        if self._watch_thread is None:
+            return
+        self._stop_event.set()
+        self._watch_thread.join(timeout=5)
+        self._watch_thread = None
+
+    def _watch(self, interval: float) -> None:
+        last_seen = self._stat_sources()
+        pending: Dict[str, float] = {}
+
+        while not self._stop_event.wait(interval):
+            current = self._stat_sources()
+            for model_name, mtime in current.items():
+                if mtime is None or mtime == last_seen.get(model_name):
+                    pending.pop(model_name, None)
+                    continue
+                # Wait for the mtime to be stable over one interval so a file
+                # that is still being copied is not loaded half-written
+                if pending.get(model_name) == mtime:
+                    logger.info(f"Detected new file for {model_name}, reloading")
+                    if self.reload_async(model_name):
+                        last_seen[model_name] = mtime
+                    pending.pop(model_name, None)
+                else:
+                    pending[model_name] = mtime
+
+    def _stat_sources(self) -> Dict[str, Optional[float]]:
+        mtimes = {}
+        for model_name, path in self.loader.get_model_sources().items():
+            try:
+                mtimes[model_name] = os.stat(path).st_mtime
+            except OSError:
+                mtimes[model_name] = None
+        return mtimes
+
+# Global instance
+model_registry = ModelRegistry()
@@ -1,14 +1,15 @@
+import io
+import hashlib
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional, Union
+import time
 import logging
-
-try:
-    from app.models.real_model_loader import real_model_loader
-    USE_REAL_MODELS = True
-except ImportError:
-    from app.models.model_loader import model_loader
-    USE_REAL_MODELS = False
-
+from PIL import Image
+from app.models.model_names import STUDENT_MODEL_NAME, AZURE_MODEL_NAME
+from app.models.model_registry import model_registry
+from app.models.dog_gate import dog_gate
+from app.utils.prediction_cache import prediction_cache
+from app.utils.metrics import metrics
 from app.config import settings
 
 logger = logging.getLogger(__name__)
@@ -16,31 +17,31 @@ logger = logging.getLogger(__name__)
 class DogBreedPredictor:
     
     def __init__(self):
-        self.use_real_models = USE_REAL_MODELS
-        if self.use_real_models:
-            self.model_loader = real_model_loader
-        else:
-            self.model_loader = model_loader
+        # Versioned view over whichever loader was loaded at startup
+        self.model_loader = model_registry
             
-    def predict_single_model(self, image_array: np.ndarray, model_name: str, original_image_bytes: bytes = None) -> List[Dict]:
+    def predict_single_model(self, image_array: np.ndarray, model_name: str, original_image_bytes: bytes = None,
+                             model: Optional[object] = None) -> List[Dict]:
         """
         Predict dog breed using a single model.
         
         Args:
             image_array: Preprocessed image array
             model_name: Name of the model to use
+            model: Pinned model instance (defaults to the current version)
             
         Returns:
             List of top 3 predictions with breed names and confidence scores
         """
-        model = self.model_loader.get_model(model_name)
+        if model is None:
+            model = self.model_loader.get_model(model_name)
         if model is None:
             logger.error(f"Model {model_name} not found")
             return []
         
         try:
             # Handle Azure Custom Vision model differently
-            if model_name == "Azure_Custom_Vision":
+            if model_name == AZURE_MODEL_NAME:
                 logger.info(f"Entering Azure Custom Vision prediction section")
                 # Azure model needs original image bytes, not numpy array
                 if original_image_bytes is None:
@@ -68,121 +69,398 @@ class DogBreedPredictor:
                 predictions = model.predict(image_array, verbose=0)
                 
                 # Get class names from the model if available
-                if hasattr(model, 'class_names'):
-                    class_names = model.class_names
-                else:
-                    class_names = settings.DOG_BREEDS
+                class_names = getattr(model, "class_names", settings.DOG_BREEDS)
                 
                 # Get top 3 predictions
-                top_indices = np.argsort(predictions[0])[-3:][::-1]
-                
-                results = []
-                for idx in top_indices:
-                    if idx < len(class_names):
-                        breed_name = class_names[idx]
-                    else:
-                        breed_name = f"Unknown_Class_{idx}"
-                        
-                    confidence = float(predictions[0][idx])
-                    
-                    results.append({
-                        "breed": breed_name,
-                        "confidence": confidence,
-                        "percentage": round(confidence * 100, 2)
-                    })
-                
-                return results
+                return self._top_predictions(predictions[0], class_names)
             
         except Exception as e:
             logger.error(f"Error predicting with model {model_name}: {e}")
             return []
     
-    def predict_all_models(self, file_content: bytes) -> Dict:
+    def predict_all_models(self, file_content: bytes,
+                           client_predictions: Optional[Dict[str, Dict]] = None,
+                           degradation_level: int = 0) -> Dict:
         """
         Predict dog breed using all available models.
         
         Args:
             file_content: Raw image bytes
+            client_predictions: Results computed by the browser, by model name
+                ({"version": ..., "predictions": [{"breed", "confidence"}, ...]}),
+                used instead of running those models on the server
+            degradation_level: Load-driven level (0-3) limiting the models run, see _select_models
             
         Returns:
             Dictionary containing predictions from all models and aggregated results
         """
         # Preprocess image
         try:
-            from PIL import Image
-            import io
-            
-            # Open and preprocess image
-            image = Image.open(io.BytesIO(file_content))
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Resize to 224x224 (standard for most models)
-            image = image.resize((224, 224))
-            
-            # Convert to numpy array and normalize
-            image_array = np.array(image).astype(np.float32) / 255.0
-            image_array = np.expand_dims(image_array, axis=0)  # Add batch dimension
-            
-            # Get image info
-            image_info = {
-                "size": image.size,
-                "format": "RGB",
-                "dimensions": f"{image.size[0]}x{image.size[1]}"
-            }
-            
+            image = self._decode_image(file_content)
         except Exception as e:
             logger.error(f"Error preprocessing image: {e}")
             return {"error": "Failed to preprocess image"}
         
-        # Get predictions from all models
-        model_predictions = {}
-        all_predictions = []
+        return self._predict_image(
+            image, file_content, hashlib.sha256(file_content).hexdigest(), client_predictions, degradation_level
+        )
+    
+    def predict_from_array(self, image_array: np.ndarray, degradation_level: int = 0) -> Dict:
+        """
+        Predict dog breed from an already decoded image.
         
-        loaded_models = self.model_loader.get_loaded_model_names()
-        logger.info(f"Using models: {loaded_models}")
+        Models that need the encoded image (Azure Custom Vision) are skipped.
         
-        for model_name in loaded_models:
-            logger.info(f"Processing model: {model_name}")
-            # Handle different image preprocessing for different models
-            model_image_array = image_array
+        Args:
+            image_array: uint8 array of shape (height, width, 3)
+            degradation_level: Load-driven level (0-3) limiting the models run
             
-            # MPO_MODELE_SCRATCH expects 150x150 images
-            if model_name == "MPO_MODELE_SCRATCH":
-                try:
-                    from PIL import Image
-                    import io
-                    
-                    # Resize to 150x150 for MPO model
-                    original_image = Image.open(io.BytesIO(file_content))
-                    if original_image.mode != 'RGB':
-                        original_image = original_image.convert('RGB')
+        Returns:
+            Same dictionary as predict_all_models
+        """
+        try:
+            image = Image.fromarray(image_array, "RGB")
+        except Exception as e:
+            logger.error(f"Error preprocessing tensor: {e}")
+            return {"error": "Failed to preprocess image"}
+        
+        return self._predict_image(image, None, self._array_hash(image_array), degradation_level=degradation_level)
+    
+    def _array_hash(self, image_array: np.ndarray) -> str:
+        """Cache key of a decoded image, covering its shape and pixels."""
+        digest = hashlib.sha256(str(image_array.shape).encode())
+        digest.update(np.ascontiguousarray(image_array).data)
+        return digest.hexdigest()
+    
+    def _predict_image(self, image: Image.Image, file_content: Optional[bytes], image_hash: str,
+                       client_predictions: Optional[Dict[str, Dict]] = None,
+                       degradation_level: int = 0) -> Dict:
+        """Run the gate and the ensemble on a decoded RGB image."""
+        return self._predict_images(
+            [(image, file_content, image_hash, client_predictions or {})], degradation_level
+        )[0]
+    
+    def _predict_images(self, images: List[Tuple[Image.Image, Optional[bytes], str, Dict]],
+                        degradation_level: int = 0) -> List[Dict]:
+        """
+        Run the gate and the ensemble on decoded RGB images, one forward pass per model.
+        
+        Args:
+            images: (image, encoded bytes or None, image hash, client predictions) per image
+            degradation_level: Load-driven level (0-3) limiting the models run
+            
+        Returns:
+            One result dictionary per image, in the same order
+        """
+        results: List[Optional[Dict]] = [None] * len(images)
+        dog_scores: Dict[int, Optional[float]] = {}
+        
+        # Skip the ensemble (and the paid Azure call) when there is no dog in the image.
+        # At the last degradation level only the fastest model runs, without the gate.
+        if degradation_level >= 3:
+            decisions = [(True, None)] * len(images)
+        else:
+            decisions = dog_gate.check_batch([image for image, _, _, _ in images])
+        for index, ((_, _, image_hash, _), (dog_detected, dog_score)) in enumerate(zip(images, decisions)):
+            if dog_detected:
+                dog_scores[index] = dog_score
+            else:
+                logger.info(f"No dog detected (score={dog_score:.3f}), skipping ensemble")
+                results[index] = self._result(image_hash, degradation_level, dog_detected=False, dog_score=dog_score)
+        
+        pending = list(dog_scores)
+        if not pending:
+            return results
+        
+        # model_predictions / model_versions / prediction_sources of every image
+        collected = {index: ({}, {}, {}) for index in pending}
+        
+        def record(index: int, model_name: str, predictions: List[Dict], version: str, source: str) -> None:
+            model_predictions, model_versions, prediction_sources = collected[index]
+            model_predictions[model_name] = predictions
+            model_versions[model_name] = version
+            prediction_sources[model_name] = source
+        
+        # Resized arrays shared between models with the same input size
+        image_arrays: Dict[Tuple[int, Tuple[int, int]], np.ndarray] = {}
+        
+        # Pin the current model versions so a hot reload cannot swap them mid-request
+        with self.model_loader.acquire_all() as pinned_entries:
+            entries = self._select_models(pinned_entries, degradation_level)
+            # Models only merged from client predictions, never run on the server (see _select_models)
+            client_only = set()
+            if degradation_level > 0 and settings.SERVING_MODE != "student":
+                for _, _, _, client_predictions in images:
+                    for model_name in client_predictions:
+                        if model_name in pinned_entries and model_name not in entries:
+                            entries[model_name] = pinned_entries[model_name]
+                            client_only.add(model_name)
+            if not entries:
+                logger.error(f"No model can serve degradation level {degradation_level}")
+                for index in pending:
+                    results[index] = {"error": f"No model available at degradation level {degradation_level}"}
+                return results
+            logger.info(f"Using models: {[entry.key for entry in entries.values()]}")
+            
+            for model_name, entry in entries.items():
+                to_run = []
+                for index in pending:
+                    _, file_content, image_hash, client_predictions = images[index]
+                    if file_content is None and model_name == AZURE_MODEL_NAME:
+                        # Azure only accepts encoded images
+                        continue
                     
-                    resized_image = original_image.resize((150, 150))
-                    model_image_array = np.array(resized_image).astype(np.float32) / 255.0
-                    model_image_array = np.expand_dims(model_image_array, axis=0)
+                    if model_name in client_predictions:
+                        predictions = self._from_client(model_name, client_predictions[model_name], entry.model)
+                        if predictions:
+                            version = client_predictions[model_name].get("version")
+                            record(index, model_name, predictions,
+                                   f"{model_name}@client" + (f"-{version}" if version else ""), "client")
+                            continue
+                    if model_name in client_only:
+                        continue
                     
-                except Exception as e:
-                    logger.error(f"Error resizing image for MPO model: {e}")
+                    predictions = prediction_cache.get(image_hash, entry.key)
+                    if predictions is not None:
+                        record(index, model_name, predictions, entry.key, "server")
+                    else:
+                        to_run.append(index)
+                
+                if not to_run:
                     continue
-            
-            # Get predictions
-            predictions = self.predict_single_model(model_image_array, model_name, file_content)
-            if predictions:
-                model_predictions[model_name] = predictions
-                all_predictions.extend(predictions)
+                
+                model_start = time.perf_counter()
+                batch_predictions = self._run_model(model_name, entry.model, images, to_run, image_arrays)
+                # Per image latency, used to find the fastest models when degraded
+                metrics.observe(
+                    "model_inference_seconds", (time.perf_counter() - model_start) / len(to_run), model=model_name
+                )
+                
+                for index, predictions in zip(to_run, batch_predictions):
+                    if predictions:
+                        prediction_cache.put(images[index][2], entry.key, predictions)
+                        record(index, model_name, predictions, entry.key, "server")
+        
+        model_types = self._get_model_types()
+        for index in pending:
+            model_predictions, model_versions, prediction_sources = collected[index]
+            # Aggregate predictions (ensemble method)
+            all_predictions = [pred for predictions in model_predictions.values() for pred in predictions]
+            results[index] = self._result(
+                images[index][2], degradation_level,
+                dog_detected=True,
+                dog_score=dog_scores[index],
+                model_predictions=model_predictions,
+                aggregated_results=self._aggregate_predictions(all_predictions),
+                model_types=model_types,
+                model_versions=model_versions,
+                prediction_sources=prediction_sources
+            )
+        return results
+    
+    def _run_model(self, model_name: str, model: object, images: List[Tuple], indices: List[int],
+                   image_arrays: Dict) -> List[List[Dict]]:
+        """Top 3 predictions of one model for several images, stacked into a single batch."""
+        if model_name == AZURE_MODEL_NAME:
+            # Remote API, one call per image
+            return [self.predict_single_model(None, model_name, images[index][1], model=model) for index in indices]
         
-        # Aggregate predictions (ensemble method)
-        aggregated_results = self._aggregate_predictions(all_predictions)
+        # Handle different image preprocessing for different models
+        # (MPO_MODELE_SCRATCH expects 150x150 images)
+        input_size = tuple(getattr(model, "input_size", settings.IMAGE_SIZE))
+        for index in indices:
+            if (index, input_size) not in image_arrays:
+                image_arrays[(index, input_size)] = self._to_array(images[index][0], input_size)
+        batch = np.concatenate([image_arrays[(index, input_size)] for index in indices])
         
-        return {
+        try:
+            probabilities = model.predict(batch, verbose=0)
+        except Exception as e:
+            logger.error(f"Error predicting with model {model_name}: {e}")
+            return [[] for _ in indices]
+        
+        class_names = getattr(model, "class_names", settings.DOG_BREEDS)
+        return [self._top_predictions(row, class_names) for row in probabilities]
+    
+    def _top_predictions(self, probabilities: np.ndarray, class_names: List[str]) -> List[Dict]:
+        """Top 3 breeds of one probability vector."""
+        results = []
+        for idx in np.argsort(probabilities)[-3:][::-1]:
+            breed_name = class_names[idx] if idx < len(class_names) else f"Unknown_Class_{idx}"
+            confidence = float(probabilities[idx])
+            results.append({
+                "breed": breed_name,
+                "confidence": confidence,
+                "percentage": round(confidence * 100, 2)
+            })
+        return results
+    
+    def _result(self, image_hash: str, degradation_level: int, dog_detected: bool,
+                dog_score: Optional[float], model_predictions: Optional[Dict] = None,
+                aggregated_results: Optional[List[Dict]] = None, model_types: Optional[Dict] = None,
+                model_versions: Optional[Dict] = None, prediction_sources: Optional[Dict] = None) -> Dict:
+        """Result dictionary returned for one image."""
+        # Get image info
+        width, height = settings.IMAGE_SIZE[1], settings.IMAGE_SIZE[0]
+        result = {
             "success": True,
-            "image_info": image_info,
-            "model_predictions": model_predictions,
-            "aggregated_results": aggregated_results,
-            "models_used": list(model_predictions.keys()),
-            "model_types": self._get_model_types()
+            "dog_detected": dog_detected,
+            "dog_score": dog_score,
+            "image_hash": image_hash,
+            "image_info": {
+                "size": (width, height),
+                "format": "RGB",
+                "dimensions": f"{width}x{height}"
+            },
+            "model_predictions": model_predictions or {},
+            "aggregated_results": aggregated_results or [],
+            "models_used": list((model_predictions or {}).keys()),
+            "model_types": model_types or {},
+            "model_versions": model_versions or {},
+            "prediction_sources": prediction_sources or {},
+            "degradation_level": degradation_level
         }
+        if not dog_detected:
+            result["message"] = "Aucun chien détecté dans l'image"
+        return result
+    
+    def _from_client(self, model_name: str, client_result: Dict, model: object) -> List[Dict]:
+        """
+        Turn a browser-computed result into predict_single_model's format.
+        
+        The version must be the one exported from the served model file
+        (client_version, see app.utils.client_models) and the breeds must belong
+        to the served model's classes; otherwise the result is rejected and the
+        model runs on the server as usual. Client results are never cached since
+        they are not produced by the server.
+        """
+        expected_version = getattr(model, "client_version", None)
+        if expected_version is None or client_result.get("version") != expected_version:
+            logger.warning(
+                f"Rejecting client predictions for {model_name}: version {client_result.get('version')} "
+                f"does not match the served export ({expected_version})"
+            )
+            metrics.inc("client_predictions_total", model=model_name, status="stale")
+            return []
+        
+        class_names = set(getattr(model, "class_names", None) or settings.DOG_BREEDS)
+        predictions = client_result["predictions"]
+        unknown = [pred["breed"] for pred in predictions if pred["breed"] not in class_names]
+        if unknown:
+            logger.warning(f"Rejecting client predictions for {model_name}: unknown breeds {unknown}")
+            metrics.inc("client_predictions_total", model=model_name, status="rejected")
+            return []
+        
+        metrics.inc("client_predictions_total", model=model_name, status="accepted")
+        ranked = sorted(predictions, key=lambda pred: pred["confidence"], reverse=True)[:3]
+        return [
+            {
+                "breed": pred["breed"],
+                "confidence": float(pred["confidence"]),
+                "percentage": round(pred["confidence"] * 100, 2)
+            }
+            for pred in ranked
+        ]
+    
+    def _select_models(self, entries: Dict, degradation_level: int = 0) -> Dict:
+        """
+        Pick the models serving a request.
+        
+        The distilled student replaces the ensemble in "student" serving mode and
+        is left out of the ensemble otherwise, since it only imitates it.
+        
+        Under load (see app.utils.degradation) the ensemble sheds work:
+        level 1 drops Azure Custom Vision, level 2 serves the distilled student
+        (or the two fastest models without it) and level 3 the fastest local model
+        alone. Level 3 never falls back to the full ensemble: without a local model
+        nothing is selected and the request fails.
+        
+        Degradation only sheds server work, so accepted client predictions for a
+        model left out here are still merged at every level (_predict_images adds
+        those models back without running them). In "student" serving mode the
+        student alone answers and client predictions are ignored.
+        """
+        student = entries.get(STUDENT_MODEL_NAME)
+        if settings.SERVING_MODE == "student" and student is not None:
+            return {STUDENT_MODEL_NAME: student}
+        
+        if degradation_level >= 3:
+            local = {name: entry for name, entry in entries.items() if name != AZURE_MODEL_NAME}
+            return self._fastest(local, 1)
+        if degradation_level == 2 and student is not None:
+            return {STUDENT_MODEL_NAME: student}
+        
+        selected = {name: entry for name, entry in entries.items() if name != STUDENT_MODEL_NAME}
+        if degradation_level >= 1 and len(selected) > 1:
+            selected.pop(AZURE_MODEL_NAME, None)
+        if degradation_level == 2:
+            selected = self._fastest(selected, 2)
+        return selected
+    
+    def _fastest(self, entries: Dict, count: int) -> Dict:
+        """
+        The `count` models with the lowest recent mean latency.
+        
+        Models not measured yet are ranked by settings.DEGRADATION_LATENCY_HINTS,
+        models without a measurement or a hint come last, and ties go by name, so
+        the choice does not depend on load order after a restart.
+        """
+        def latency(name: str) -> Tuple[bool, float, str]:
+            mean = metrics.mean("model_inference_seconds", model=name)
+            if mean is None:
+                mean = settings.DEGRADATION_LATENCY_HINTS.get(name)
+            return (mean is None, mean or 0.0, name)
+        
+        names = sorted(entries, key=latency)[:count]
+        return {name: entries[name] for name in names}
+    
+    def predict_batch(self, files: List[Union[bytes, np.ndarray]], degradation_level: int = 0) -> List[Dict]:
+        """
+        Predict dog breeds for several images, running each model once on the stacked images.
+        
+        Args:
+            files: Raw bytes of each image, or uint8 (height, width, 3) arrays of decoded
+                images (skipped by Azure Custom Vision, as in predict_from_array)
+            degradation_level: Load-driven level (0-3) limiting the models run
+            
+        Returns:
+            One result dictionary per image, in the same order
+        """
+        results: List[Optional[Dict]] = [None] * len(files)
+        decoded, positions = [], []
+        for position, file_content in enumerate(files):
+            try:
+                if isinstance(file_content, np.ndarray):
+                    image = Image.fromarray(file_content, "RGB")
+                    item = (image, None, self._array_hash(file_content), {})
+                else:
+                    image = self._decode_image(file_content)
+                    item = (image, file_content, hashlib.sha256(file_content).hexdigest(), {})
+            except Exception as e:
+                logger.error(f"Error preprocessing image: {e}")
+                results[position] = {"error": "Failed to preprocess image"}
+                continue
+            decoded.append(item)
+            positions.append(position)
+        
+        for position, result in zip(positions, self._predict_images(decoded, degradation_level)):
+            results[position] = result
+        return results
+    
+    def _decode_image(self, file_content: bytes) -> Image.Image:
+        """Decode raw image bytes into an RGB PIL image."""
+        image = Image.open(io.BytesIO(file_content))
+        image.load()
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        return image
+    
+    def _to_array(self, image: Image.Image, input_size: Tuple[int, int]) -> np.ndarray:
+        """Resize an image to (height, width) and normalize it into a batch of one."""
+        height, width = input_size
+        resized_image = image.resize((width, height))
+        image_array = np.asarray(resized_image, dtype=np.float32) / 255.0
+        return np.expand_dims(image_array, axis=0)  # Add batch dimension
     
     def _get_model_types(self) -> Dict[str, str]:
         """Get information about model types."""
@@ -194,6 +472,8 @@ class DogBreedPredictor:
                     model_types[model_name] = "Modèle Pré-entraîné (HuggingFace ResNet50)"
                 elif 'MPO_MODELE_SCRATCH' in model.name:
                     model_types[model_name] = "Modèle From Scratch (MPO)"
+                elif STUDENT_MODEL_NAME in model.name:
+                    model_types[model_name] = "Modèle Distillé (MobileNetV3)"
                 else:
                     model_types[model_name] = "Modèle Personnalisé"
             else:
@@ -27,6 +27,8 @@ try:
 except ImportError:
     AZURE_AVAILABLE = False
 
+from app.models.model_names import STUDENT_MODEL_NAME, AZURE_MODEL_NAME
+from app.utils.client_models import read_client_version
 from app.config import settings
 
 logger = logging.getLogger(__name__)
@@ -37,6 +39,8 @@ class HuggingFaceModel:
     def __init__(self, model_name: str = "anonauthors/stanford_dogs-resnet50"):
         self.model_name = model_name
         self.name = "HuggingFace_ResNet50"
+        self.runtime = "torch"
+        self.input_size = (224, 224)
         
         if not TORCH_AVAILABLE:
             raise ImportError("PyTorch and transformers are required for HuggingFace models")
@@ -93,19 +97,14 @@ class HuggingFaceModel:
             "Standard_poodle", "Mexican_hairless", "Dingo", "Dhole", "African_hunting_dog"
         ]
     
-    def predict(self, image_array: np.ndarray, verbose=0) -> np.ndarray:
-        """Make prediction using HuggingFace model."""
+    def predict(self, image_array: np.ndarray, verbose=0, strict: bool = False) -> np.ndarray:
+        """Make prediction using HuggingFace model (strict: raise instead of returning dummy output)."""
         try:
-            # Convert numpy array back to PIL Image for the processor
-            if image_array.shape[0] == 1:  # Remove batch dimension
-                image_array = image_array[0]
+            # Convert the numpy batch back to PIL Images for the processor
+            images = [Image.fromarray((array * 255).astype(np.uint8)) for array in image_array]
             
-            # Convert to PIL Image
-            image_array = (image_array * 255).astype(np.uint8)
-            image = Image.fromarray(image_array)
-            
-            # Process image
-            inputs = self.processor(images=image, return_tensors="pt")
+            # Process images
+            inputs = self.processor(images=images, return_tensors="pt")
             
             # Make prediction
             with torch.no_grad():
@@ -116,10 +115,12 @@ class HuggingFaceModel:
             return probabilities.numpy()
             
         except Exception as e:
+            if strict:
+                raise
             logger.error(f"Error in HuggingFace prediction: {e}")
             # Return dummy probabilities
             num_classes = len(self.class_names)
-            return np.random.dirichlet(np.ones(num_classes), size=1)
+            return np.random.dirichlet(np.ones(num_classes), size=len(image_array))
 
 class TensorFlowModel:
     """Wrapper for TensorFlow/Keras model (MPO_MODELE_SCRATCH)."""
@@ -127,6 +128,7 @@ class TensorFlowModel:
     def __init__(self, model_path: str):
         self.model_path = model_path
         self.name = "MPO_MODELE_SCRATCH"
+        self.runtime = "tensorflow"
         
         if not TENSORFLOW_AVAILABLE:
             raise ImportError("TensorFlow is required for Keras models")
@@ -134,6 +136,9 @@ class TensorFlowModel:
         try:
             self.model = tf.keras.models.load_model(model_path)
             logger.info(f"Loaded TensorFlow model: {model_path}")
+            self.input_size = self._get_input_size()
+            # Web export the browser must run for its client_predictions to be accepted
+            self.client_version = read_client_version(model_path)
             
             # Use the same class names as the HuggingFace model for consistency
             self.class_names = self._get_class_names()
@@ -164,15 +169,34 @@ class TensorFlowModel:
         except:
             return settings.DOG_BREEDS
     
-    def predict(self, image_array: np.ndarray, verbose=0) -> np.ndarray:
-        """Make prediction using TensorFlow model."""
+    def _get_input_size(self) -> Tuple[int, int]:
+        """Get the (height, width) the model expects."""
+        try:
+            height, width = self.model.input_shape[1:3]
+            if height and width:
+                return (int(height), int(width))
+        except Exception:
+            pass
+        return (150, 150)
+    
+    def predict(self, image_array: np.ndarray, verbose=0, strict: bool = False) -> np.ndarray:
+        """Make prediction using TensorFlow model (strict: raise instead of returning dummy output)."""
         try:
             return self.model.predict(image_array, verbose=verbose)
         except Exception as e:
+            if strict:
+                raise
             logger.error(f"Error in TensorFlow prediction: {e}")
             # Return dummy probabilities
             num_classes = len(self.class_names)
-            return np.random.dirichlet(np.ones(num_classes), size=1)
+            return np.random.dirichlet(np.ones(num_classes), size=len(image_array))
+
+class StudentModel(TensorFlowModel):
+    """Wrapper for the MobileNet student distilled from the ensemble (see app.training.distill)."""
+    
+    def __init__(self, model_path: str):
+        super().__init__(model_path)
+        self.name = STUDENT_MODEL_NAME
 
 class RealModelLoader:
     """Loads and manages real user models."""
@@ -180,54 +204,92 @@ class RealModelLoader:
     def __init__(self):
         self.models: Dict[str, object] = {}
         self.app_dir = os.path.dirname(__file__)
+        self.model_names = ["HuggingFace_ResNet50", "MPO_MODELE_SCRATCH", AZURE_MODEL_NAME, STUDENT_MODEL_NAME]
         
     def load_models(self) -> bool:
         """Load all available real models."""
         loaded_count = 0
         
-        # Load HuggingFace model (test1)
-        try:
-            if TORCH_AVAILABLE:
-                hf_model = HuggingFaceModel()
-                self.models["HuggingFace_ResNet50"] = hf_model
+        for model_name in self.model_names:
+            if self._load_single_model(model_name):
                 loaded_count += 1
-                logger.info("Loaded HuggingFace ResNet50 model")
-            else:
-                logger.warning("PyTorch not available, skipping HuggingFace model")
-        except Exception as e:
-            logger.error(f"Failed to load HuggingFace model: {e}")
         
-        # Load TensorFlow model (MPO_MODELE_SCRATCH)
-        try:
-            if TENSORFLOW_AVAILABLE:
-                keras_model_path = os.path.join(self.app_dir, "..", "MPO_modele_scratch_apres_data_augmentation 1.keras")
-                if os.path.exists(keras_model_path):
-                    tf_model = TensorFlowModel(keras_model_path)
-                    self.models["MPO_MODELE_SCRATCH"] = tf_model
-                    loaded_count += 1
-                    logger.info("Loaded MPO_MODELE_SCRATCH model")
-                else:
-                    logger.warning(f"TensorFlow model not found at: {keras_model_path}")
-            else:
-                logger.warning("TensorFlow not available, skipping Keras model")
-        except Exception as e:
-            logger.error(f"Failed to load TensorFlow model: {e}")
+        logger.info(f"Loaded {loaded_count} real models successfully")
+        return loaded_count > 0
+    
+    def _load_single_model(self, model_name: str) -> bool:
+        """
+        Load a single model by name and register it.
         
-        # Load Azure Custom Vision model
+        Args:
+            model_name: Name of the model to load
+            
+        Returns:
+            bool: True if model was loaded successfully
+        """
         try:
-            if AZURE_AVAILABLE:
-                azure_model = AzureCustomVisionModel()
-                self.models["Azure_Custom_Vision"] = azure_model
-                loaded_count += 1
-                logger.info("Loaded Azure Custom Vision model")
-            else:
-                logger.warning("Azure Cognitive Services not available, skipping Azure model")
+            self.models[model_name] = self.build_model(model_name)
+            logger.info(f"Loaded {model_name} model")
+            return True
+        except (ImportError, FileNotFoundError) as e:
+            logger.warning(f"Skipping {model_name}: {e}")
         except Exception as e:
-            logger.warning(f"Azure Custom Vision model disabled due to API issues: {e}")
-            # Continue without Azure model for now
+            if model_name == AZURE_MODEL_NAME:
+                # Continue without Azure model for now
+                logger.warning(f"Azure Custom Vision model disabled due to API issues: {e}")
+            else:
+                logger.error(f"Failed to load {model_name} model: {e}")
+        return False
+    
+    def build_model(self, model_name: str, source: Optional[str] = None) -> object:
+        """
+        Build a fresh instance of a model without registering it.
         
-        logger.info(f"Loaded {loaded_count} real models successfully")
-        return loaded_count > 0
+        Args:
+            model_name: Name of the model to build
+            source: Optional checkpoint name or file path overriding the configured one
+            
+        Returns:
+            The model wrapper instance
+        """
+        if model_name == "HuggingFace_ResNet50":
+            if not TORCH_AVAILABLE:
+                raise ImportError("PyTorch not available")
+            return HuggingFaceModel(source or settings.HF_MODEL_NAME)
+        
+        if model_name == "MPO_MODELE_SCRATCH":
+            if not TENSORFLOW_AVAILABLE:
+                raise ImportError("TensorFlow not available")
+            keras_model_path = source or settings.MPO_MODEL_PATH
+            if not os.path.exists(keras_model_path):
+                raise FileNotFoundError(f"TensorFlow model not found at: {keras_model_path}")
+            return TensorFlowModel(keras_model_path)
+        
+        if model_name == STUDENT_MODEL_NAME:
+            if not TENSORFLOW_AVAILABLE:
+                raise ImportError("TensorFlow not available")
+            student_path = source or settings.STUDENT_MODEL_PATH
+            if not os.path.exists(student_path):
+                raise FileNotFoundError(f"Distilled student not found at: {student_path}")
+            return StudentModel(student_path)
+        
+        if model_name == AZURE_MODEL_NAME:
+            if not AZURE_AVAILABLE:
+                raise ImportError("Azure Cognitive Services not available")
+            return AzureCustomVisionModel()
+        
+        raise ValueError(f"Unknown model: {model_name}")
+    
+    def get_model_sources(self) -> Dict[str, str]:
+        """Get the local files backing each model, for change detection."""
+        sources = {
+            "MPO_MODELE_SCRATCH": settings.MPO_MODEL_PATH,
+            STUDENT_MODEL_NAME: settings.STUDENT_MODEL_PATH
+        }
+        # A HuggingFace checkpoint may also be a local directory
+        if os.path.isdir(settings.HF_MODEL_NAME):
+            sources["HuggingFace_ResNet50"] = os.path.join(settings.HF_MODEL_NAME, "config.json")
+        return sources
     
     def get_model(self, model_name: str) -> Optional[object]:
         """Get a specific model by name."""
@@ -0,0 +1,203 @@
+import time
+import logging
+from concurrent import futures
+from typing import Dict, Iterator, Union
+import numpy as np
+from fastapi import HTTPException
+from app.api.admission import admission_controller
+from app.models.predictor import dog_breed_predictor
+from app.history.recorder import history_recorder
+from app.utils.degradation import degradation_controller
+from app.utils.metrics import metrics
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import grpc
+    # Generated at image build time from dog_breed.proto
+    from app.rpc import dog_breed_pb2, dog_breed_pb2_grpc
+    GRPC_AVAILABLE = True
+except ImportError:
+    GRPC_AVAILABLE = False
+
+if GRPC_AVAILABLE:
+
+    class DogBreedPredictorServicer(dog_breed_pb2_grpc.DogBreedPredictorServicer):
+        """gRPC front for the predictor, returning the same result schema as /predict."""
+
+        def Predict(self, request, context):
+            return self._predict(request, context)
+
+        def PredictBatch(self, request, context):
+            """
+            Predict every image in one bulk admission slot, charged one token per image,
+            running each model once on the stacked images. Images that cannot be
+            predicted get an error response instead of failing the whole call.
+            """
+            if not request.images:
+                return dog_breed_pb2.BatchResponse()
+            payloads = [self._payload(image_request, context) for image_request in request.images]
+
+            client_id, quota, priority = self._identify(context, bulk=True)
+            try:
+                with admission_controller.admit_from_thread(client_id, quota, priority, cost=len(payloads)):
+                    degradation_level = degradation_controller.evaluate(admission_controller.queue_depth)
+                    inference_start = time.perf_counter()
+                    batch_results = dog_breed_predictor.predict_batch(payloads, degradation_level)
+                    inference_time = time.perf_counter() - inference_start
+            except HTTPException as e:
+                self._abort_rejected(context, e)
+
+            # Batch latency is per request, not per image: it is not fed to the degradation controller
+            metrics.inc("predictions_total", len(payloads), transport="grpc")
+            metrics.inc("predictions_by_degradation_level_total", len(payloads), level=degradation_level)
+            for results in batch_results:
+                if "error" not in results:
+                    history_recorder.record(results, "grpc", {"inference_ms": round(inference_time * 1000, 2)})
+            return dog_breed_pb2.BatchResponse(
+                results=[self._to_proto(results, inference_time) for results in batch_results]
+            )
+
+        def PredictStream(self, request_iterator, context) -> Iterator:
+            for image_request in request_iterator:
+                yield self._predict(image_request, context, bulk=True)
+
+        def _predict(self, request, context, bulk: bool = False):
+            payload = self._payload(request, context)
+
+            client_id, quota, priority = self._identify(context, bulk)
+            try:
+                with admission_controller.admit_from_thread(client_id, quota, priority):
+                    # Same load-driven level as the HTTP routes
+                    degradation_level = degradation_controller.evaluate(admission_controller.queue_depth)
+                    inference_start = time.perf_counter()
+                    if isinstance(payload, np.ndarray):
+                        results = dog_breed_predictor.predict_from_array(payload, degradation_level=degradation_level)
+                    else:
+                        results = dog_breed_predictor.predict_all_models(payload, degradation_level=degradation_level)
+                    inference_time = time.perf_counter() - inference_start
+            except HTTPException as e:
+                self._abort_rejected(context, e)
+
+            metrics.observe("prediction_inference_seconds", inference_time)
+            metrics.inc("predictions_total", transport="grpc")
+            metrics.inc("predictions_by_degradation_level_total", level=degradation_level)
+            degradation_controller.observe(inference_time)
+            if "error" not in results:
+                history_recorder.record(results, "grpc", {"inference_ms": round(inference_time * 1000, 2)})
+            return self._to_proto(results, inference_time)
+
+        def _payload(self, request, context) -> Union[bytes, np.ndarray]:
+            """Encoded image bytes, or the decoded array of a tensor request."""
+            payload = request.WhichOneof("payload")
+            if payload is None:
+                context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Request has no image or tensor")
+            if payload == "tensor":
+                return self._tensor_to_array(request.tensor, context)
+            if len(request.image) > settings.MAX_FILE_SIZE:
+                context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Image too large")
+            return request.image
+
+        def _abort_rejected(self, context, error: HTTPException) -> None:
+            """Fail the call on admission rejections (rate limit, full queue, queue timeout)."""
+            retry_after = (error.headers or {}).get("Retry-After")
+            if retry_after is not None:
+                context.set_trailing_metadata((("retry-after", retry_after),))
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, error.detail)
+
+        def _identify(self, context, bulk: bool):
+            """Client id, quota and priority from the x-api-key / x-priority metadata and the peer."""
+            metadata = dict(context.invocation_metadata())
+            # "ipv4:127.0.0.1:50000" -> "ipv4:127.0.0.1"
+            host = context.peer().rsplit(":", 1)[0]
+            client_id, quota = admission_controller.identify_client(metadata.get("x-api-key"), host)
+            requested = "bulk" if bulk else metadata.get("x-priority")
+            return client_id, quota, admission_controller.resolve_priority(requested, quota)
+
+        def _tensor_to_array(self, tensor, context) -> np.ndarray:
+            min_side, max_side = settings.TENSOR_MIN_SIDE, settings.TENSOR_MAX_SIDE
+            if not (min_side <= tensor.height <= max_side and min_side <= tensor.width <= max_side):
+                context.abort(
+                    grpc.StatusCode.INVALID_ARGUMENT,
+                    f"Tensor must have {min_side} to {max_side} pixels per side"
+                )
+            if len(tensor.data) != tensor.height * tensor.width * 3:
+                context.abort(
+                    grpc.StatusCode.INVALID_ARGUMENT,
+                    f"Expected {tensor.height * tensor.width * 3} bytes, got {len(tensor.data)}"
+                )
+            return np.frombuffer(tensor.data, dtype=np.uint8).reshape(tensor.height, tensor.width, 3)
+
+        def _to_proto(self, results: Dict, inference_time: float):
+            if "error" in results:
+                return dog_breed_pb2.PredictResponse(success=False, error=results["error"])
+
+            response = dog_breed_pb2.PredictResponse(
+                success=results["success"],
+                dog_detected=results["dog_detected"],
+                message=results.get("message", ""),
+                aggregated_results=[self._to_breed(pred) for pred in results["aggregated_results"]],
+                models_used=results["models_used"],
+                model_types=results["model_types"],
+                model_versions=results["model_versions"],
+                inference_ms=round(inference_time * 1000, 2),
+                degradation_level=results["degradation_level"]
+            )
+            if results["dog_score"] is not None:
+                response.dog_score = results["dog_score"]
+            for model_name, predictions in results["model_predictions"].items():
+                response.model_predictions[model_name].predictions.extend(
+                    self._to_breed(pred) for pred in predictions
+                )
+            return response
+
+        def _to_breed(self, prediction: Dict):
+            return dog_breed_pb2.BreedPrediction(
+                breed=prediction["breed"],
+                confidence=float(prediction["confidence"]),
+                percentage=float(prediction["percentage"]),
+                model_count=prediction.get("model_count", 0)
+            )
+
+class GrpcServer:
+    """Optional gRPC server running next to the HTTP API in the same process."""
+
+    def __init__(self):
+        self.server = None
+
+    def start(self) -> bool:
+        """
+        Start serving on settings.GRPC_PORT.
+
+        Returns:
+            bool: False if grpcio or the generated stubs are missing
+        """
+        if not GRPC_AVAILABLE:
+            logger.warning("grpcio or generated stubs not available, gRPC server disabled")
+            return False
+
+        options = [
+            ("grpc.max_receive_message_length", settings.GRPC_MAX_MESSAGE_SIZE),
+            ("grpc.max_send_message_length", settings.GRPC_MAX_MESSAGE_SIZE),
+        ]
+        self.server = grpc.server(
+            futures.ThreadPoolExecutor(max_workers=settings.GRPC_MAX_WORKERS, thread_name_prefix="grpc"),
+            options=options,
+            # Excess calls fail fast with RESOURCE_EXHAUSTED instead of queueing unbounded
+            maximum_concurrent_rpcs=settings.GRPC_MAX_WORKERS + settings.MAX_QUEUE_SIZE
+        )
+        dog_breed_pb2_grpc.add_DogBreedPredictorServicer_to_server(DogBreedPredictorServicer(), self.server)
+        self.server.add_insecure_port(f"[::]:{settings.GRPC_PORT}")
+        self.server.start()
+        logger.info(f"gRPC server listening on port {settings.GRPC_PORT}")
+        return True
+
+    def stop(self, grace: float = 5.0) -> None:
+        if self.server is not None:
+            self.server.stop(grace).wait()
+            self.server = None
+            logger.info("gRPC server stopped")
+
+# Global instance
+grpc_server = GrpcServer()
@@ -0,0 +1,374 @@
+"""
+Distillation of the model ensemble into a single MobileNetV3 student.
+
+The ensemble's averaged probabilities on a local image set are computed once
+and cached, then used as soft targets to train a compact student that runs on
+CPU. The student is saved where RealModelLoader looks for STUDENT_MODEL_NAME
+(settings.STUDENT_MODEL_PATH) together with an agreement / speed report.
+
+Usage:
+    python -m app.training.distill cache --images /path/to/images
+    python -m app.training.distill train --epochs 15
+"""
+
+import os
+import io
+import json
+import time
+import argparse
+import logging
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from PIL import Image
+from app.models.model_names import STUDENT_MODEL_NAME, AZURE_MODEL_NAME
+from app.utils.breeds import load_class_names, normalize_breed_name
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(settings.MODELS_DIR, "distillation_targets.npz")
+IMAGE_EXTENSIONS = tuple(f".{ext}" for ext in settings.ALLOWED_EXTENSIONS)
+
+class EnsembleTeacher:
+    """Computes the ensemble's averaged probability distribution over the class mapping."""
+
+    def __init__(self, models: Dict[str, object], class_names: List[str]):
+        self.models = models
+        self.class_names = class_names
+        self.class_index = {normalize_breed_name(name): i for i, name in enumerate(class_names)}
+
+    def soft_targets(self, file_content: bytes) -> Tuple[np.ndarray, float]:
+        """
+        Run every teacher model on an image.
+
+        Returns:
+            (averaged probability vector, wall time of the ensemble in seconds)
+        """
+        image = Image.open(io.BytesIO(file_content)).convert("RGB")
+        arrays = {}
+        distributions = []
+
+        start = time.perf_counter()
+        for model_name, model in self.models.items():
+            if model_name == AZURE_MODEL_NAME:
+                distributions.append(self._from_top_k(model.predict(file_content, verbose=0)))
+                continue
+
+            height, width = getattr(model, "input_size", settings.IMAGE_SIZE)
+            if (height, width) not in arrays:
+                resized = image.resize((width, height))
+                arrays[(height, width)] = np.expand_dims(np.asarray(resized, dtype=np.float32) / 255.0, axis=0)
+
+            probabilities = np.asarray(model.predict(arrays[(height, width)], verbose=0))[0]
+            distributions.append(self._align(probabilities, getattr(model, "class_names", self.class_names)))
+        elapsed = time.perf_counter() - start
+
+        target = np.mean(distributions, axis=0)
+        return (target / target.sum()).astype(np.float32), elapsed
+
+    def _align(self, probabilities: np.ndarray, model_classes: List[str]) -> np.ndarray:
+        """Reorder a model's probabilities into the class mapping's order."""
+        if list(model_classes) == list(self.class_names):
+            return probabilities
+        aligned = np.zeros(len(self.class_names), dtype=np.float32)
+        for i, name in enumerate(model_classes):
+            index = self.class_index.get(normalize_breed_name(name))
+            if index is not None and i < len(probabilities):
+                aligned[index] += probabilities[i]
+        total = aligned.sum()
+        return aligned / total if total > 0 else np.full(len(self.class_names), 1.0 / len(self.class_names))
+
+    def _from_top_k(self, predictions: List[Tuple[str, float]]) -> np.ndarray:
+        """Turn a top-k list into a distribution, spreading the remaining mass uniformly."""
+        num_classes = len(self.class_names)
+        distribution = np.zeros(num_classes, dtype=np.float32)
+        for breed, confidence in predictions:
+            index = self.class_index.get(normalize_breed_name(breed))
+            if index is not None:
+                distribution[index] += confidence
+        remaining = max(0.0, 1.0 - distribution.sum())
+        return distribution + remaining / num_classes
+
+def build_teacher_cache(image_dir: str, cache_path: str = DEFAULT_CACHE_PATH,
+                        include_remote: bool = False) -> Dict:
+    """
+    Compute and cache the ensemble's soft targets for every image under a directory.
+
+    Images already present in the cache are skipped, so the cache can be
+    extended without paying for the ensemble (or Azure calls) again.
+
+    Args:
+        image_dir: Directory searched recursively for images
+        cache_path: .npz file storing paths, targets and ensemble timings
+        include_remote: Also query the paid Azure Custom Vision model
+
+    Returns:
+        The cache contents
+    """
+    from app.models.real_model_loader import real_model_loader
+
+    if not real_model_loader.load_models():
+        raise RuntimeError("No teacher model could be loaded")
+
+    models = {
+        name: model for name, model in real_model_loader.get_all_models().items()
+        if name != STUDENT_MODEL_NAME and (include_remote or name != AZURE_MODEL_NAME)
+    }
+    class_names = load_class_names()
+    teacher = EnsembleTeacher(models, class_names)
+    logger.info(f"Teacher ensemble: {list(models.keys())}")
+
+    cache = load_teacher_cache(cache_path) if os.path.exists(cache_path) else {
+        "paths": [], "targets": [], "teacher_seconds": [], "class_names": class_names
+    }
+    known = set(cache["paths"])
+    paths, targets, timings = list(cache["paths"]), list(cache["targets"]), list(cache["teacher_seconds"])
+
+    image_paths = sorted(
+        os.path.join(root, filename)
+        for root, _, files in os.walk(image_dir)
+        for filename in files
+        if filename.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    new_paths = [path for path in image_paths if path not in known]
+    logger.info(f"{len(known)} images cached, {len(new_paths)} to compute")
+
+    for i, path in enumerate(new_paths):
+        try:
+            with open(path, "rb") as f:
+                target, elapsed = teacher.soft_targets(f.read())
+        except Exception as e:
+            logger.warning(f"Skipping {path}: {e}")
+            continue
+        paths.append(path)
+        targets.append(target)
+        timings.append(elapsed)
+
+        # Checkpoint regularly so an interrupted run keeps its progress
+        if (i + 1) % 200 == 0:
+            _save_teacher_cache(cache_path, paths, targets, timings, class_names)
+            logger.info(f"Cached {i + 1}/{len(new_paths)} images")
+
+    _save_teacher_cache(cache_path, paths, targets, timings, class_names)
+    return load_teacher_cache(cache_path)
+
+def _save_teacher_cache(cache_path: str, paths: List[str], targets: List[np.ndarray],
+                        timings: List[float], class_names: List[str]) -> None:
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = cache_path + ".tmp.npz"
+    np.savez_compressed(
+        tmp_path,
+        paths=np.array(paths),
+        targets=np.array(targets, dtype=np.float32).reshape(len(paths), len(class_names)),
+        teacher_seconds=np.array(timings, dtype=np.float64),
+        class_names=np.array(class_names)
+    )
+    os.replace(tmp_path, cache_path)
+
+def load_teacher_cache(cache_path: str = DEFAULT_CACHE_PATH) -> Dict:
+    with np.load(cache_path) as data:
+        return {
+            "paths": data["paths"].tolist(),
+            "targets": data["targets"],
+            "teacher_seconds": data["teacher_seconds"].tolist(),
+            "class_names": data["class_names"].tolist(),
+        }
+
+def build_student(num_classes: int, input_size: Tuple[int, int] = settings.IMAGE_SIZE,
+                  pretrained: bool = True):
+    """
+    MobileNetV3-Small student taking [0, 1] RGB input like the other served models.
+    """
+    import tensorflow as tf
+
+    height, width = input_size
+    inputs = tf.keras.layers.Input(shape=(height, width, 3))
+    # MobileNetV3's built-in preprocessing expects [0, 255]
+    x = tf.keras.layers.Rescaling(255.0)(inputs)
+    backbone = tf.keras.applications.MobileNetV3Small(
+        input_shape=(height, width, 3),
+        include_top=False,
+        weights="imagenet" if pretrained else None,
+        pooling="avg"
+    )
+    x = backbone(x)
+    x = tf.keras.layers.Dropout(0.2)(x)
+    outputs = tf.keras.layers.Dense(num_classes, activation="softmax", dtype="float32")(x)
+    return tf.keras.Model(inputs, outputs, name="DistilledStudent")
+
+def make_dataset(paths: List[str], targets: np.ndarray, input_size: Tuple[int, int],
+                 batch_size: int, training: bool):
+    """tf.data pipeline decoding images and pairing them with their soft targets."""
+    import tensorflow as tf
+
+    autotune = tf.data.AUTOTUNE
+
+    def load(path, target):
+        image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+        image = tf.image.resize(image, input_size) / 255.0
+        return image, target
+
+    def augment(image, target):
+        return tf.image.random_flip_left_right(image), target
+
+    dataset = tf.data.Dataset.from_tensor_slices((paths, targets))
+    if training:
+        dataset = dataset.shuffle(len(paths), reshuffle_each_iteration=True)
+    dataset = dataset.map(load, num_parallel_calls=autotune)
+    if training:
+        dataset = dataset.map(augment, num_parallel_calls=autotune)
+    return dataset.batch(batch_size).prefetch(autotune)
+
+def train_student(cache_path: str = DEFAULT_CACHE_PATH, output_path: str = settings.STUDENT_MODEL_PATH,
+                  epochs: int = 15, batch_size: int = 32, learning_rate: float = 1e-3,
+                  temperature: float = 1.0, val_fraction: float = 0.1, pretrained: bool = True) -> Dict:
+    """
+    Train the student on the cached soft targets and write the model and its report.
+
+    Args:
+        temperature: Softens (> 1) or sharpens (< 1) the teacher distribution
+
+    Returns:
+        The evaluation report
+    """
+    import tensorflow as tf
+
+    cache = load_teacher_cache(cache_path)
+    paths = np.array(cache["paths"])
+    targets = cache["targets"]
+    if temperature != 1.0:
+        targets = targets ** (1.0 / temperature)
+        targets = targets / targets.sum(axis=1, keepdims=True)
+
+    rng = np.random.default_rng(42)
+    order = rng.permutation(len(paths))
+    val_count = max(1, int(len(paths) * val_fraction))
+    val_idx, train_idx = order[:val_count], order[val_count:]
+
+    input_size = settings.IMAGE_SIZE
+    train_ds = make_dataset(paths[train_idx], targets[train_idx], input_size, batch_size, training=True)
+    val_ds = make_dataset(paths[val_idx], targets[val_idx], input_size, batch_size, training=False)
+
+    model = build_student(len(cache["class_names"]), input_size, pretrained)
+    model.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate),
+        loss=tf.keras.losses.KLDivergence(),
+        # Top-1 accuracy against the argmax of the soft target = agreement with the ensemble
+        metrics=[tf.keras.metrics.TopKCategoricalAccuracy(k=1, name="agreement")]
+    )
+    model.fit(
+        train_ds,
+        validation_data=val_ds,
+        epochs=epochs,
+        callbacks=[
+            tf.keras.callbacks.EarlyStopping(monitor="val_agreement", mode="max", patience=4,
+                                             restore_best_weights=True),
+            tf.keras.callbacks.ReduceLROnPlateau(monitor="val_loss", factor=0.3, patience=2),
+        ]
+    )
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    model.save(output_path)
+    logger.info(f"Saved student to {output_path}")
+
+    # Timed through the wrapper the server loads, as the teacher models were
+    from app.models.real_model_loader import StudentModel
+    served_model = StudentModel(output_path)
+
+    val_teacher_seconds = np.array(cache["teacher_seconds"])[val_idx]
+    report = evaluate_student(model, served_model, paths[val_idx], targets[val_idx], val_teacher_seconds)
+    report["train_images"] = int(len(train_idx))
+    report_path = os.path.splitext(output_path)[0] + ".report.json"
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Distillation report: {json.dumps(report)}")
+    return report
+
+def evaluate_student(model, served_model, paths: np.ndarray, targets: np.ndarray, teacher_seconds: np.ndarray,
+                     latency_samples: int = 50) -> Dict:
+    """
+    Agreement with the ensemble and single-image latency compared to it.
+
+    Args:
+        model: The trained Keras student
+        served_model: The saved student loaded as the server loads it (StudentModel)
+        teacher_seconds: Ensemble time per image from EnsembleTeacher.soft_targets
+    """
+    input_size = tuple(served_model.input_size)
+    dataset = make_dataset(paths, targets, input_size, batch_size=32, training=False)
+    student_probs = model.predict(dataset, verbose=0)
+
+    teacher_top1 = targets.argmax(axis=1)
+    student_top1 = student_probs.argmax(axis=1)
+    teacher_top3 = np.argsort(targets, axis=1)[:, -3:]
+    student_top3 = np.argsort(student_probs, axis=1)[:, -3:]
+    top3_overlap = np.mean([
+        len(set(t) & set(s)) / 3 for t, s in zip(teacher_top3, student_top3)
+    ])
+    eps = 1e-7
+    kl = np.mean(np.sum(targets * np.log((targets + eps) / (student_probs + eps)), axis=1))
+
+    # Batch-of-one latency measured like the teacher timings: decoding excluded,
+    # resizing included, prediction through the served wrapper's predict()
+    height, width = input_size
+    latencies = []
+    for path in paths[:latency_samples]:
+        image = Image.open(path).convert("RGB")
+        start = time.perf_counter()
+        resized = image.resize((width, height))
+        image_array = np.expand_dims(np.asarray(resized, dtype=np.float32) / 255.0, axis=0)
+        served_model.predict(image_array, verbose=0, strict=True)
+        latencies.append(time.perf_counter() - start)
+    # The first call includes graph tracing
+    student_ms = float(np.median(latencies[1:] or latencies) * 1000)
+    ensemble_ms = float(np.median(teacher_seconds) * 1000)
+
+    return {
+        "val_images": int(len(paths)),
+        "top1_agreement": float(np.mean(teacher_top1 == student_top1)),
+        "top3_overlap": float(top3_overlap),
+        "mean_kl_divergence": float(kl),
+        "student_latency_ms": round(student_ms, 2),
+        "ensemble_latency_ms": round(ensemble_ms, 2),
+        "speedup": round(ensemble_ms / student_ms, 2) if student_ms > 0 else None,
+    }
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Distill the model ensemble into a MobileNetV3 student")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    cache_parser = subparsers.add_parser("cache", help="Compute and cache the ensemble's soft targets")
+    cache_parser.add_argument("--images", required=True, help="Directory of training images")
+    cache_parser.add_argument("--cache", default=DEFAULT_CACHE_PATH)
+    cache_parser.add_argument("--include-azure", action="store_true",
+                              help="Also query Azure Custom Vision (billed per image)")
+
+    train_parser = subparsers.add_parser("train", help="Train the student on the cached targets")
+    train_parser.add_argument("--cache", default=DEFAULT_CACHE_PATH)
+    train_parser.add_argument("--output", default=settings.STUDENT_MODEL_PATH)
+    train_parser.add_argument("--epochs", type=int, default=15)
+    train_parser.add_argument("--batch-size", type=int, default=32)
+    train_parser.add_argument("--learning-rate", type=float, default=1e-3)
+    train_parser.add_argument("--temperature", type=float, default=1.0)
+    train_parser.add_argument("--no-pretrained", action="store_true")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    if args.command == "cache":
+        cache = build_teacher_cache(args.images, args.cache, include_remote=args.include_azure)
+        logger.info(f"Cache holds {len(cache['paths'])} images")
+    else:
+        report = train_student(
+            cache_path=args.cache,
+            output_path=args.output,
+            epochs=args.epochs,
+            batch_size=args.batch_size,
+            learning_rate=args.learning_rate,
+            temperature=args.temperature,
+            pretrained=not args.no_pretrained
+        )
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Export of the MPO from-scratch CNN to the TensorFlow.js layers format, for
+in-browser inference by the frontend's local mode.
+
+The tensorflowjs converter needs tf_keras, which cannot read the Keras 3
+.keras files the backend loads, so the model.json and weight shards are
+written directly. Only linear stacks of the layers the MPO model uses are
+supported (Conv2D, pooling, Flatten, Dense, Dropout).
+
+Weight shards carry a content hash in their name so nginx can cache them
+forever, and the class names, input size and version travel in the model's
+userDefinedMetadata so the browser needs no other file. The version is also
+recorded next to the Keras file (see app.utils.client_models) so the server
+only accepts predictions from this export.
+
+Usage:
+    python -m app.training.export_web --output ../frontend/public/models/mpo
+    python -m app.training.export_web --model other.keras --quantize uint8 --output /tmp/mpo
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import argparse
+import logging
+from typing import Dict, List, Tuple
+import numpy as np
+from app.utils.breeds import load_class_names
+from app.utils.client_models import write_web_export_info
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "MPO_MODELE_SCRATCH"
+
+# TF.js loads weights in shards of at most this size
+SHARD_SIZE = 4 * 1024 * 1024
+
+QUANTIZATIONS = ("none", "float16", "uint8")
+
+def _layer_config(layer) -> Dict:
+    """Keras 2 style (class_name, config) of a supported layer, as read by tf.loadLayersModel."""
+    kind = type(layer).__name__
+    config = layer.get_config()
+    common = {"name": layer.name, "trainable": False, "dtype": "float32"}
+
+    if kind == "Conv2D":
+        if config.get("groups", 1) != 1:
+            raise ValueError(f"Grouped convolution {layer.name} is not supported")
+        common.update({
+            "filters": config["filters"],
+            "kernel_size": list(config["kernel_size"]),
+            "strides": list(config["strides"]),
+            "padding": config["padding"],
+            "data_format": config["data_format"],
+            "dilation_rate": list(config["dilation_rate"]),
+            "activation": config["activation"],
+            "use_bias": config["use_bias"],
+        })
+    elif kind in ("MaxPooling2D", "AveragePooling2D"):
+        common.update({
+            "pool_size": list(config["pool_size"]),
+            "strides": list(config["strides"] or config["pool_size"]),
+            "padding": config["padding"],
+            "data_format": config["data_format"],
+        })
+    elif kind == "Flatten":
+        common["data_format"] = config.get("data_format") or "channels_last"
+    elif kind == "Dense":
+        common.update({
+            "units": config["units"],
+            "activation": config["activation"],
+            "use_bias": config["use_bias"],
+        })
+    elif kind == "Dropout":
+        common["rate"] = config["rate"]
+    else:
+        raise ValueError(f"Layer {layer.name} ({kind}) is not supported by the web export")
+
+    if not isinstance(common.get("activation", "linear"), str):
+        raise ValueError(f"Layer {layer.name} uses a custom activation")
+    return {"class_name": kind, "config": common}
+
+def build_topology(model) -> Dict:
+    """Sequential modelTopology of a linear Keras model."""
+    layers = [layer for layer in model.layers if type(layer).__name__ != "InputLayer"]
+    previous = model.inputs[0]
+    for layer in layers:
+        if layer.input is not previous:
+            raise ValueError(f"Layer {layer.name} does not follow the previous layer: model is not a linear stack")
+        previous = layer.output
+    if len(model.outputs) != 1 or model.outputs[0] is not previous:
+        raise ValueError("Model must have a single output at the end of the stack")
+
+    input_layer = {
+        "class_name": "InputLayer",
+        "config": {
+            "batch_input_shape": [None, *model.input_shape[1:]],
+            "dtype": "float32",
+            "sparse": False,
+            "name": "input",
+        },
+    }
+    return {
+        "class_name": "Sequential",
+        "config": {"name": model.name, "layers": [input_layer] + [_layer_config(layer) for layer in layers]},
+        "keras_version": "2.15.0",
+        "backend": "tensorflow",
+    }
+
+def _encode_weight(name: str, value: np.ndarray, quantize: str) -> Tuple[Dict, bytes]:
+    """Manifest entry and little-endian bytes of one weight."""
+    value = np.asarray(value, dtype=np.float32)
+    entry = {"name": name, "shape": list(value.shape), "dtype": "float32"}
+
+    if quantize == "float16":
+        entry["quantization"] = {"dtype": "float16", "original_dtype": "float32"}
+        return entry, value.astype("<f2").tobytes()
+    if quantize == "uint8":
+        low, high = float(value.min()), float(value.max())
+        scale = (high - low) / 255 if high > low else 1.0
+        quantized = np.round((value - low) / scale).clip(0, 255).astype(np.uint8)
+        entry["quantization"] = {"dtype": "uint8", "scale": scale, "min": low, "original_dtype": "float32"}
+        return entry, quantized.tobytes()
+    return entry, value.astype("<f4").tobytes()
+
+def _write_shards(data: bytes, output_dir: str) -> List[str]:
+    """Split the weight bytes into content-addressed shard files."""
+    count = max(1, -(-len(data) // SHARD_SIZE))
+    paths = []
+    for i in range(count):
+        chunk = data[i * SHARD_SIZE:(i + 1) * SHARD_SIZE]
+        digest = hashlib.sha256(chunk).hexdigest()[:12]
+        filename = f"group1-shard{i + 1}of{count}.{digest}.bin"
+        with open(os.path.join(output_dir, filename), "wb") as f:
+            f.write(chunk)
+        paths.append(filename)
+    return paths
+
+def export_model(model_path: str, output_dir: str, quantize: str = "float16") -> Dict:
+    """
+    Write model.json and its weight shards to output_dir, replacing a previous export.
+
+    Args:
+        model_path: Keras model served as MPO_MODELE_SCRATCH
+        output_dir: Directory served to the browser
+        quantize: Weight storage (none, float16 or uint8); weights are dequantized to float32 on load
+
+    Returns:
+        Dict: Summary of the export (version, sizes)
+    """
+    import tensorflow as tf
+
+    if quantize not in QUANTIZATIONS:
+        raise ValueError(f"quantize must be one of {QUANTIZATIONS}")
+
+    model = tf.keras.models.load_model(model_path, compile=False)
+    topology = build_topology(model)
+    class_names = load_class_names()
+    num_classes = model.output_shape[-1]
+    if num_classes != len(class_names):
+        raise ValueError(f"Model has {num_classes} outputs but class_mapping.csv has {len(class_names)} classes")
+
+    manifest, data = [], bytearray()
+    for layer in model.layers:
+        for variable in layer.weights:
+            # Keras 3 paths are already "<layer>/<weight>", the names TF.js expects
+            entry, encoded = _encode_weight(f"{layer.name}/{variable.name}", variable.numpy(), quantize)
+            manifest.append(entry)
+            data.extend(encoded)
+
+    version = hashlib.sha256(bytes(data)).hexdigest()[:12]
+    tmp_dir = f"{output_dir.rstrip(os.sep)}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    shard_paths = _write_shards(bytes(data), tmp_dir)
+
+    height, width = model.input_shape[1:3]
+    model_json = {
+        "format": "layers-model",
+        "generatedBy": f"keras {tf.keras.__version__}",
+        "convertedBy": "app.training.export_web",
+        "modelTopology": topology,
+        "weightsManifest": [{"paths": shard_paths, "weights": manifest}],
+        "userDefinedMetadata": {
+            "model_name": MODEL_NAME,
+            "version": version,
+            "input_size": [height, width],
+            # Inputs are RGB pixels divided by 255, as in DogBreedPredictor._to_array
+            "scale": 1 / 255,
+            "class_names": class_names,
+        },
+    }
+    with open(os.path.join(tmp_dir, "model.json"), "w") as f:
+        json.dump(model_json, f)
+
+    # Swap the whole directory so a served model.json never points at missing shards
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(tmp_dir, output_dir)
+    # Read by the server when it loads model_path, to check client_predictions versions
+    write_web_export_info(model_path, version)
+
+    summary = {
+        "version": version,
+        "quantize": quantize,
+        "parameters": int(model.count_params()),
+        "weights_bytes": len(data),
+        "shards": len(shard_paths),
+        "output_dir": output_dir,
+    }
+    logger.info(f"Exported {MODEL_NAME} for the web: {summary}")
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the MPO model to TensorFlow.js")
+    parser.add_argument("--model", default=settings.MPO_MODEL_PATH)
+    parser.add_argument("--output", required=True, help="e.g. ../frontend/public/models/mpo")
+    parser.add_argument("--quantize", choices=QUANTIZATIONS, default="float16")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    summary = export_model(args.model, args.output, args.quantize)
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
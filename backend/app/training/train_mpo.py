@@ -0,0 +1,432 @@
+"""
+Training of the MPO from-scratch CNN with a tf.data input pipeline.
+
+Replaces the notebook's ImageDataGenerator.flow_from_dataframe loop, which
+decodes and augments images one by one in a single Python thread, with a
+pipeline that decodes in parallel, caches the decoded images after the first
+epoch, augments whole batches with one affine transform op and prefetches
+while the model trains. Mixed precision can be enabled on GPUs.
+
+The model is written where RealModelLoader loads "MPO_MODELE_SCRATCH"
+(settings.MPO_MODEL_PATH) with the same input contract: 150x150 RGB in [0, 1],
+outputs in class_mapping.csv order.
+
+Usage (Kaggle dog-breed-identification layout, labels.csv with id,breed):
+    python -m app.training.train_mpo train --images train/ --labels labels.csv --epochs 15
+    python -m app.training.train_mpo benchmark --images train/ --labels labels.csv
+
+The benchmark's ImageDataGenerator baseline needs scipy, like the notebook.
+"""
+
+import os
+import json
+import math
+import time
+import argparse
+import logging
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from app.utils.breeds import load_class_names, normalize_breed_name
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+INPUT_SIZE = (150, 150)
+
+# Augmentation of the served model ("apres data augmentation" in MPO_Dog_breed.ipynb)
+AUGMENTATION = {
+    "rotation_range": 20,
+    "width_shift_range": 0.1,
+    "height_shift_range": 0.1,
+    "shear_range": 0.15,
+    "zoom_range": 0.2,
+    "horizontal_flip": True,
+}
+
+def load_labels(image_dir: str, labels_csv: str) -> Tuple[List[str], np.ndarray]:
+    """
+    Image paths and class indices (class_mapping.csv order) for the images present in image_dir.
+
+    Breeds of labels.csv missing from the class mapping are skipped with a warning.
+    """
+    class_index = {normalize_breed_name(name): i for i, name in enumerate(load_class_names())}
+
+    df = pd.read_csv(labels_csv)
+    df["filename"] = df["id"] + ".jpg"
+    df = df[df["filename"].isin(set(os.listdir(image_dir)))]
+    df["label"] = df["breed"].map(lambda breed: class_index.get(normalize_breed_name(breed), -1))
+
+    unknown = sorted(df.loc[df["label"] < 0, "breed"].unique())
+    if unknown:
+        logger.warning(f"Skipping {len(unknown)} breeds missing from class_mapping.csv: {unknown}")
+    df = df[df["label"] >= 0]
+
+    paths = [os.path.join(image_dir, filename) for filename in df["filename"]]
+    return paths, df["label"].to_numpy(dtype=np.int32)
+
+def split(paths: List[str], labels: np.ndarray, val_fraction: float,
+          seed: int = 42) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Shuffled train / validation split."""
+    paths = np.array(paths)
+    order = np.random.default_rng(seed).permutation(len(paths))
+    val_count = max(1, int(len(paths) * val_fraction))
+    val_idx, train_idx = order[:val_count], order[val_count:]
+    return paths[train_idx], labels[train_idx], paths[val_idx], labels[val_idx]
+
+def build_mpo_model(num_classes: int, input_size: Tuple[int, int] = INPUT_SIZE):
+    """The MPO CNN from MPO_Dog_breed.ipynb: 3 conv / max pooling blocks and a 512 unit dense layer."""
+    import tensorflow as tf
+
+    height, width = input_size
+    inputs = tf.keras.layers.Input(shape=(height, width, 3))
+
+    x = tf.keras.layers.Conv2D(16, (3, 3), activation="relu")(inputs)
+    x = tf.keras.layers.MaxPooling2D(2)(x)
+
+    x = tf.keras.layers.Conv2D(32, 3, activation="relu")(x)
+    x = tf.keras.layers.MaxPooling2D(2)(x)
+
+    x = tf.keras.layers.Conv2D(64, 3, activation="relu")(x)
+    x = tf.keras.layers.MaxPooling2D(2)(x)
+
+    x = tf.keras.layers.Flatten()(x)
+    x = tf.keras.layers.Dense(512, activation="relu")(x)
+
+    # Softmax kept in float32 under mixed precision
+    outputs = tf.keras.layers.Dense(num_classes, activation="softmax", dtype="float32")(x)
+    return tf.keras.Model(inputs, outputs, name="MPO_MODELE_SCRATCH")
+
+def _random_affine(images, rotation_range: float, width_shift_range: float, height_shift_range: float,
+                   shear_range: float, zoom_range: float):
+    """
+    ImageDataGenerator-style random rotation / shift / shear / zoom, applied to a whole
+    batch with a single projective transform op (nearest fill, like the notebook).
+    """
+    import tensorflow as tf
+
+    batch_size = tf.shape(images)[0]
+    height = tf.cast(tf.shape(images)[1], tf.float32)
+    width = tf.cast(tf.shape(images)[2], tf.float32)
+
+    def uniform(limit):
+        return tf.random.uniform([batch_size], -limit, limit)
+
+    theta = uniform(rotation_range) * math.pi / 180
+    shear = uniform(shear_range) * math.pi / 180
+    zoom_x = 1 + uniform(zoom_range)
+    zoom_y = 1 + uniform(zoom_range)
+    shift_x = uniform(width_shift_range) * width
+    shift_y = uniform(height_shift_range) * height
+
+    zeros = tf.zeros([batch_size])
+    ones = tf.ones([batch_size])
+
+    def matrices(*rows):
+        return tf.reshape(tf.stack(rows, axis=1), [batch_size, 3, 3])
+
+    rotation = matrices(tf.cos(theta), -tf.sin(theta), zeros, tf.sin(theta), tf.cos(theta), zeros, zeros, zeros, ones)
+    shift = matrices(ones, zeros, shift_x, zeros, ones, shift_y, zeros, zeros, ones)
+    shear_matrix = matrices(ones, -tf.sin(shear), zeros, zeros, tf.cos(shear), zeros, zeros, zeros, ones)
+    zoom = matrices(zoom_x, zeros, zeros, zeros, zoom_y, zeros, zeros, zeros, ones)
+
+    # Output -> input pixel mapping around the image center, composed in ImageDataGenerator's order
+    center_x, center_y = (width - 1) / 2, (height - 1) / 2
+    to_center = matrices(ones, zeros, center_x * ones, zeros, ones, center_y * ones, zeros, zeros, ones)
+    from_center = matrices(ones, zeros, -center_x * ones, zeros, ones, -center_y * ones, zeros, zeros, ones)
+    transform = to_center @ rotation @ shift @ shear_matrix @ zoom @ from_center
+
+    transform = tf.reshape(transform, [batch_size, 9])[:, :8]
+    return tf.raw_ops.ImageProjectiveTransformV3(
+        images=images,
+        transforms=transform,
+        output_shape=tf.shape(images)[1:3],
+        fill_value=0.0,
+        interpolation="BILINEAR",
+        fill_mode="NEAREST"
+    )
+
+def make_dataset(paths: np.ndarray, labels: np.ndarray, input_size: Tuple[int, int] = INPUT_SIZE,
+                 batch_size: int = 32, training: bool = True, cache: Optional[str] = "",
+                 augmentation: Optional[Dict] = None):
+    """
+    tf.data pipeline: parallel decode and resize -> cache -> shuffle -> batch -> batched augmentation -> prefetch.
+
+    Args:
+        cache: "" caches decoded images in memory, a path caches them on disk, None disables caching
+        augmentation: ImageDataGenerator-style parameters, AUGMENTATION by default for training
+
+    Returns:
+        Dataset of (float32 images in [0, 1], int32 labels) batches
+    """
+    import tensorflow as tf
+
+    autotune = tf.data.AUTOTUNE
+    augmentation = AUGMENTATION if augmentation is None else augmentation
+
+    def decode(path, label):
+        image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+        image = tf.image.resize(image, input_size)
+        # uint8 keeps the cache at a quarter of the float32 size
+        return tf.cast(tf.round(image), tf.uint8), label
+
+    def augment(images, labels):
+        if augmentation.get("horizontal_flip"):
+            flip = tf.random.uniform([tf.shape(images)[0], 1, 1, 1]) < 0.5
+            images = tf.where(flip, tf.reverse(images, axis=[2]), images)
+        images = _random_affine(
+            images,
+            augmentation.get("rotation_range", 0),
+            augmentation.get("width_shift_range", 0),
+            augmentation.get("height_shift_range", 0),
+            augmentation.get("shear_range", 0),
+            augmentation.get("zoom_range", 0)
+        )
+        return images, labels
+
+    def rescale(images, labels):
+        return tf.cast(images, tf.float32) / 255.0, labels
+
+    dataset = tf.data.Dataset.from_tensor_slices((paths, labels))
+    dataset = dataset.map(decode, num_parallel_calls=autotune, deterministic=not training)
+    if cache is not None:
+        dataset = dataset.cache(cache)
+    if training:
+        dataset = dataset.shuffle(min(len(paths), 2048), reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size, num_parallel_calls=autotune)
+    dataset = dataset.map(rescale, num_parallel_calls=autotune)
+    if training:
+        dataset = dataset.map(augment, num_parallel_calls=autotune)
+    return dataset.prefetch(autotune)
+
+def make_generator(paths: np.ndarray, labels: np.ndarray, input_size: Tuple[int, int] = INPUT_SIZE,
+                   batch_size: int = 32, augmentation: Optional[Dict] = None):
+    """The notebook's ImageDataGenerator.flow_from_dataframe path, used as the benchmark baseline."""
+    import tensorflow as tf
+
+    augmentation = AUGMENTATION if augmentation is None else augmentation
+    datagen = tf.keras.preprocessing.image.ImageDataGenerator(rescale=1. / 255, fill_mode="nearest", **augmentation)
+    df = pd.DataFrame({"filename": paths, "label": labels})
+    return datagen.flow_from_dataframe(
+        dataframe=df,
+        x_col="filename",
+        y_col="label",
+        target_size=input_size,
+        batch_size=batch_size,
+        class_mode="raw",
+        shuffle=True,
+        seed=42
+    )
+
+def _use_mixed_precision(enabled: bool) -> bool:
+    import tensorflow as tf
+
+    if enabled and not tf.config.list_physical_devices("GPU"):
+        logger.warning("Mixed precision requested without a GPU, training in float32")
+        enabled = False
+    tf.keras.mixed_precision.set_global_policy("mixed_float16" if enabled else "float32")
+    return enabled
+
+def _compile(model, learning_rate: float) -> None:
+    import tensorflow as tf
+
+    model.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate),
+        # Integer labels: same loss as the notebook's categorical one without one-hot tensors
+        loss=tf.keras.losses.SparseCategoricalCrossentropy(),
+        metrics=["accuracy", tf.keras.metrics.SparseTopKCategoricalAccuracy(k=5, name="top_5_accuracy")]
+    )
+
+def train_mpo(image_dir: str, labels_csv: str, output_path: str = settings.MPO_MODEL_PATH,
+              epochs: int = 15, batch_size: int = 32, learning_rate: float = 1e-3,
+              val_fraction: float = 0.1, cache: Optional[str] = "", mixed_precision: bool = False) -> Dict:
+    """
+    Train the MPO model and write it with a training report.
+
+    Returns:
+        The training report (validation accuracy, images per second, epoch times)
+    """
+    import tensorflow as tf
+
+    paths, labels = load_labels(image_dir, labels_csv)
+    train_paths, train_labels, val_paths, val_labels = split(paths, labels, val_fraction)
+    num_classes = len(load_class_names())
+    logger.info(f"Training on {len(train_paths)} images, validating on {len(val_paths)}")
+
+    train_ds = make_dataset(train_paths, train_labels, batch_size=batch_size, training=True, cache=cache)
+    val_cache = None if cache is None else (f"{cache}.val" if cache else "")
+    val_ds = make_dataset(val_paths, val_labels, batch_size=batch_size, training=False, cache=val_cache)
+
+    mixed_precision = _use_mixed_precision(mixed_precision)
+    model = build_mpo_model(num_classes)
+    _compile(model, learning_rate)
+
+    epoch_timer, epoch_seconds = _epoch_timer()
+    history = model.fit(
+        train_ds,
+        validation_data=val_ds,
+        epochs=epochs,
+        callbacks=[
+            epoch_timer,
+            tf.keras.callbacks.EarlyStopping(monitor="val_accuracy", mode="max", patience=4,
+                                             restore_best_weights=True),
+        ]
+    )
+
+    if mixed_precision:
+        # Serve a float32 copy: float16 kernels are slow or missing on CPU
+        tf.keras.mixed_precision.set_global_policy("float32")
+        served = build_mpo_model(num_classes)
+        served.set_weights(model.get_weights())
+        model = served
+
+    _save_atomically(model, output_path)
+
+    images_per_epoch = len(train_paths)
+    report = {
+        "train_images": int(len(train_paths)),
+        "val_images": int(len(val_paths)),
+        "epochs_run": len(epoch_seconds),
+        "best_val_accuracy": float(max(history.history["val_accuracy"])),
+        "best_val_top_5_accuracy": float(max(history.history["val_top_5_accuracy"])),
+        "epoch_seconds": [round(seconds, 2) for seconds in epoch_seconds],
+        # First epoch decodes every image, later ones read the cache
+        "first_epoch_images_per_sec": round(images_per_epoch / epoch_seconds[0], 1),
+        "later_epochs_images_per_sec": round(
+            images_per_epoch / float(np.median(epoch_seconds[1:])), 1
+        ) if len(epoch_seconds) > 1 else None,
+        "mixed_precision": mixed_precision,
+        "batch_size": batch_size,
+    }
+    _write_report(output_path, report)
+    return report
+
+def benchmark(image_dir: str, labels_csv: str, batch_size: int = 32, steps: int = 50,
+              max_images: int = 2000) -> Dict:
+    """
+    Images per second of the tf.data pipeline against the notebook's ImageDataGenerator path.
+
+    Both are measured on the input pipeline alone and while training the MPO model
+    for `steps` steps, so the report shows whether fit() is input bound.
+    """
+    import tensorflow as tf
+
+    paths, labels = load_labels(image_dir, labels_csv)
+    paths, labels = np.array(paths)[:max_images], labels[:max_images]
+    steps = min(steps, math.ceil(len(paths) / batch_size))
+    num_classes = len(load_class_names())
+
+    def pipeline_rate(batches) -> float:
+        iterator = iter(batches)
+        # Graph tracing and worker startup are not part of the steady-state rate
+        next(iterator)
+        seen = 0
+        start = time.perf_counter()
+        for step, (images, _) in enumerate(iterator):
+            if step >= steps:
+                break
+            seen += int(images.shape[0])
+        return seen / (time.perf_counter() - start)
+
+    def fit_rate(data) -> float:
+        model = build_mpo_model(num_classes)
+        _compile(model, 1e-3)
+        # Build the train function before timing
+        model.fit(data, epochs=1, steps_per_epoch=1, verbose=0)
+        start = time.perf_counter()
+        model.fit(data, epochs=1, steps_per_epoch=steps, verbose=0)
+        return steps * batch_size / (time.perf_counter() - start)
+
+    generator = make_generator(paths, labels, batch_size=batch_size)
+    dataset = make_dataset(paths, labels, batch_size=batch_size, training=True, cache="")
+
+    report = {"images": int(len(paths)), "batch_size": batch_size, "steps": steps}
+    report["generator_images_per_sec"] = round(pipeline_rate(generator), 1)
+    report["tf_data_cold_images_per_sec"] = round(pipeline_rate(dataset), 1)
+    # Finish the first pass so the cache is complete, then measure the cached epochs
+    for _ in dataset:
+        pass
+    report["tf_data_cached_images_per_sec"] = round(pipeline_rate(dataset), 1)
+    report["fit_generator_images_per_sec"] = round(fit_rate(generator.__iter__()), 1)
+    report["fit_tf_data_images_per_sec"] = round(fit_rate(dataset.repeat()), 1)
+
+    report["pipeline_speedup_cold"] = round(
+        report["tf_data_cold_images_per_sec"] / report["generator_images_per_sec"], 2)
+    report["pipeline_speedup_cached"] = round(
+        report["tf_data_cached_images_per_sec"] / report["generator_images_per_sec"], 2)
+    report["fit_speedup"] = round(
+        report["fit_tf_data_images_per_sec"] / report["fit_generator_images_per_sec"], 2)
+    return report
+
+def _epoch_timer() -> Tuple[object, List[float]]:
+    """Keras callback recording the wall time of each epoch into the returned list."""
+    import tensorflow as tf
+
+    seconds: List[float] = []
+    start = {}
+    callback = tf.keras.callbacks.LambdaCallback(
+        on_epoch_begin=lambda epoch, logs: start.update(time=time.perf_counter()),
+        on_epoch_end=lambda epoch, logs: seconds.append(time.perf_counter() - start["time"])
+    )
+    return callback, seconds
+
+def _save_atomically(model, output_path: str) -> None:
+    """Write next to the target then rename, so the model watcher never sees a partial file."""
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = os.path.splitext(output_path)[0] + ".tmp.keras"
+    model.save(tmp_path)
+    os.replace(tmp_path, output_path)
+    logger.info(f"Saved MPO model to {output_path}")
+
+def _write_report(output_path: str, report: Dict) -> None:
+    report_path = os.path.splitext(output_path)[0] + ".report.json"
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Training report: {json.dumps(report)}")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Train the MPO from-scratch CNN with a tf.data pipeline")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in (("train", "Train and save the model"),
+                            ("benchmark", "Compare the tf.data pipeline with ImageDataGenerator")):
+        command_parser = subparsers.add_parser(name, help=help_text)
+        command_parser.add_argument("--images", required=True, help="Directory of training images")
+        command_parser.add_argument("--labels", required=True, help="CSV with id,breed columns")
+        command_parser.add_argument("--batch-size", type=int, default=32)
+
+    train_parser = subparsers.choices["train"]
+    train_parser.add_argument("--output", default=settings.MPO_MODEL_PATH)
+    train_parser.add_argument("--epochs", type=int, default=15)
+    train_parser.add_argument("--learning-rate", type=float, default=1e-3)
+    train_parser.add_argument("--val-fraction", type=float, default=0.1)
+    train_parser.add_argument("--cache", default="",
+                              help="File to cache decoded images in (default: memory)")
+    train_parser.add_argument("--no-cache", action="store_true")
+    train_parser.add_argument("--mixed-precision", action="store_true")
+
+    benchmark_parser = subparsers.choices["benchmark"]
+    benchmark_parser.add_argument("--steps", type=int, default=50)
+    benchmark_parser.add_argument("--max-images", type=int, default=2000)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    if args.command == "train":
+        report = train_mpo(
+            image_dir=args.images,
+            labels_csv=args.labels,
+            output_path=args.output,
+            epochs=args.epochs,
+            batch_size=args.batch_size,
+            learning_rate=args.learning_rate,
+            val_fraction=args.val_fraction,
+            cache=None if args.no_cache else args.cache,
+            mixed_precision=args.mixed_precision
+        )
+    else:
+        report = benchmark(args.images, args.labels, args.batch_size, args.steps, args.max_images)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import os
+from typing import List
+import pandas as pd
+
+CLASS_MAPPING_PATH = os.path.join(os.path.dirname(__file__), "..", "class_mapping.csv")
+
+def load_class_names() -> List[str]:
+    """Class names in the order used by the local models."""
+    df_classes = pd.read_csv(CLASS_MAPPING_PATH)
+    return df_classes.sort_values("class_index")["class_name"].tolist()
+
+def normalize_breed_name(name: str) -> str:
+    """
+    Key for matching breed names across sources.
+
+    The class mapping, Azure tags and dataset folders spell breeds differently
+    ("Shih-Tzu", "shih tzu", "shih_tzu"); they all map to the same key.
+    """
+    return name.lower().replace("-", "_").replace(" ", "_")
@@ -0,0 +1,55 @@
+"""
+Versions of the models the browser runs itself (frontend local mode).
+
+app.training.export_web writes, next to the exported Keras file, the version of
+the web export (a hash of its weight shards) and the hash of the Keras file it
+was exported from. The server accepts client predictions made by that version
+only, and only while it serves that same file, so a stale cached browser model
+or a re-trained server model without a new export is never merged.
+"""
+
+import os
+import json
+import hashlib
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+def web_export_info_path(model_path: str) -> str:
+    """Sidecar describing the web export of a Keras file."""
+    return os.path.splitext(model_path)[0] + ".web.json"
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def write_web_export_info(model_path: str, version: str) -> None:
+    """Record that `version` of the web export was made from the current content of model_path."""
+    with open(web_export_info_path(model_path), "w") as f:
+        json.dump({"version": version, "model_sha256": file_sha256(model_path)}, f, indent=2)
+
+def read_client_version(model_path: str) -> Optional[str]:
+    """
+    Version the browser must report for a model file's predictions to be accepted.
+
+    Returns:
+        The web export's version, or None if the file has no export or was
+        replaced since it was exported
+    """
+    info_path = web_export_info_path(model_path)
+    if not os.path.exists(info_path):
+        return None
+    try:
+        with open(info_path) as f:
+            info = json.load(f)
+        if info.get("model_sha256") != file_sha256(model_path):
+            logger.warning(f"Web export of {model_path} is stale, client predictions will be ignored")
+            return None
+        return info.get("version")
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read {info_path}: {e}")
+        return None
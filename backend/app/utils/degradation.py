@@ -0,0 +1,139 @@
+import time
+import logging
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+import numpy as np
+from app.utils.metrics import metrics
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# What the predictor sheds at each level (see DogBreedPredictor._select_models)
+LEVELS = {
+    0: "full",
+    1: "no_azure",
+    2: "reduced",
+    3: "fastest_only",
+}
+MAX_LEVEL = max(LEVELS)
+
+class DegradationController:
+    """
+    Load-driven degradation level for the predictor.
+
+    The level rises as soon as the admission queue depth or the recent p95
+    inference latency crosses the threshold of a higher level. It only steps
+    down one level at a time, once both signals are below RECOVERY_RATIO of
+    the current level's thresholds and the level has been held for MIN_HOLD
+    seconds, so the service does not flap between levels.
+    """
+
+    def __init__(self):
+        self.level = 0
+        self.forced_level: Optional[int] = None
+        self._changed_at = time.monotonic()
+        # (monotonic time, inference seconds) of recent predictions at the current level
+        self._latencies: Deque[Tuple[float, float]] = deque()
+        self._events: Deque[Dict] = deque(maxlen=50)
+        self._lock = threading.Lock()
+        metrics.set_gauge("degradation_level", 0)
+
+    def observe(self, inference_seconds: float) -> None:
+        """Record the inference time of a prediction."""
+        with self._lock:
+            self._latencies.append((time.monotonic(), inference_seconds))
+
+    def evaluate(self, queue_depth: int) -> int:
+        """
+        Update the level from the current load.
+
+        Args:
+            queue_depth: Requests waiting for an inference slot
+
+        Returns:
+            int: Level the next prediction should be served at
+        """
+        if not settings.DEGRADATION_ENABLED:
+            return 0
+
+        with self._lock:
+            if self.forced_level is not None:
+                return self.forced_level
+
+            now = time.monotonic()
+            p95 = self._p95(now)
+            target = self._target_level(queue_depth, p95)
+
+            if target > self.level:
+                self._change(target, now, f"queue_depth={queue_depth}, p95={self._format(p95)}")
+            elif (self.level > 0 and now - self._changed_at >= settings.DEGRADATION_MIN_HOLD
+                    and self._recovered(queue_depth, p95)):
+                self._change(self.level - 1, now, f"queue_depth={queue_depth}, p95={self._format(p95)}")
+            return self.level
+
+    def force(self, level: Optional[int]) -> None:
+        """Pin a level (None goes back to automatic)."""
+        with self._lock:
+            self.forced_level = level
+            if level is not None and level != self.level:
+                self._change(level, time.monotonic(), "forced by admin")
+
+    def status(self) -> Dict:
+        with self._lock:
+            p95 = self._p95(time.monotonic())
+            level = self.forced_level if self.forced_level is not None else self.level
+            return {
+                "enabled": settings.DEGRADATION_ENABLED,
+                "level": level,
+                "mode": LEVELS[level],
+                "forced": self.forced_level is not None,
+                "held_seconds": round(time.monotonic() - self._changed_at, 1),
+                "p95_inference_seconds": p95,
+                "samples": len(self._latencies),
+                "queue_thresholds": settings.DEGRADATION_QUEUE_THRESHOLDS,
+                "latency_thresholds": settings.DEGRADATION_LATENCY_THRESHOLDS,
+                "events": list(self._events),
+            }
+
+    def _p95(self, now: float) -> Optional[float]:
+        """p95 over the last DEGRADATION_WINDOW seconds, None without enough samples."""
+        while self._latencies and now - self._latencies[0][0] > settings.DEGRADATION_WINDOW:
+            self._latencies.popleft()
+        if len(self._latencies) < settings.DEGRADATION_MIN_SAMPLES:
+            return None
+        return float(np.percentile([seconds for _, seconds in self._latencies], 95))
+
+    def _target_level(self, queue_depth: int, p95: Optional[float]) -> int:
+        for level in range(MAX_LEVEL, 0, -1):
+            if queue_depth >= settings.DEGRADATION_QUEUE_THRESHOLDS[level - 1]:
+                return level
+            if p95 is not None and p95 >= settings.DEGRADATION_LATENCY_THRESHOLDS[level - 1]:
+                return level
+        return 0
+
+    def _recovered(self, queue_depth: int, p95: Optional[float]) -> bool:
+        ratio = settings.DEGRADATION_RECOVERY_RATIO
+        if queue_depth > settings.DEGRADATION_QUEUE_THRESHOLDS[self.level - 1] * ratio:
+            return False
+        return p95 is None or p95 <= settings.DEGRADATION_LATENCY_THRESHOLDS[self.level - 1] * ratio
+
+    def _change(self, level: int, now: float, reason: str) -> None:
+        previous = self.level
+        self.level = level
+        self._changed_at = now
+        # Latencies measured at the old level say little about the new one
+        self._latencies.clear()
+
+        event = {"time": time.time(), "from": previous, "to": level, "mode": LEVELS[level], "reason": reason}
+        self._events.append(event)
+        metrics.set_gauge("degradation_level", level)
+        metrics.inc("degradation_level_changes_total", **{"from": previous, "to": level})
+        log = logger.warning if level > previous else logger.info
+        log(f"Degradation level {previous} -> {level} ({LEVELS[level]}): {reason}")
+
+    def _format(self, p95: Optional[float]) -> str:
+        return "n/a" if p95 is None else f"{p95:.2f}s"
+
+# Global instance
+degradation_controller = DegradationController()
@@ -0,0 +1,237 @@
+import os
+import sys
+import time
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class SamplingProfiler:
+    """
+    Statistical CPU profiler for live traffic.
+
+    A background thread samples the stacks of every thread at a fixed interval
+    and aggregates them in the folded format understood by flamegraph.pl and
+    speedscope. Nothing runs while the profiler is stopped.
+    """
+
+    def __init__(self):
+        self._samples: Counter = Counter()
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        # Guards the samples (taken by the sampler thread)
+        self._lock = threading.Lock()
+        # Serializes start / stop; held while joining, so never taken by the sampler thread
+        self._control_lock = threading.Lock()
+        self.started_at: Optional[float] = None
+        self.sample_count = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float = 0.01, duration: Optional[float] = None) -> bool:
+        """
+        Start sampling.
+
+        Args:
+            interval: Seconds between samples
+            duration: Stop sampling automatically after this many seconds
+
+        Returns:
+            bool: False if a profile is already running
+        """
+        with self._control_lock:
+            if self.running:
+                return False
+            with self._lock:
+                self._samples = Counter()
+                self.sample_count = 0
+            self.started_at = time.time()
+            self._stop_event.clear()
+            self._thread = threading.Thread(
+                target=self._sample,
+                args=(interval, duration),
+                name="cpu-profiler",
+                daemon=True
+            )
+            self._thread.start()
+        logger.info(f"CPU profiler started (interval={interval}s, duration={duration}s)")
+        return True
+
+    def stop(self) -> str:
+        """Stop sampling and return the collected stacks in folded format. Blocks until the sampler exits."""
+        with self._control_lock:
+            self._stop_event.set()
+            if self._thread is not None:
+                self._thread.join(timeout=5)
+                self._thread = None
+        logger.info(f"CPU profiler stopped after {self.sample_count} samples")
+        return self.folded()
+
+    def folded(self) -> str:
+        """Collected stacks, one `frame;frame;frame count` line per distinct stack."""
+        with self._lock:
+            samples = self._samples.most_common()
+        return "\n".join(f"{stack} {count}" for stack, count in samples) + "\n"
+
+    def _sample(self, interval: float, duration: Optional[float]) -> None:
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + duration if duration else None
+        thread_names = {}
+
+        while not self._stop_event.wait(interval):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+
+            frames = sys._current_frames()
+            if len(thread_names) != len(frames):
+                thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+            stacks = []
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(thread_names.get(thread_id, str(thread_id)))
+                stacks.append(";".join(reversed(stack)))
+            del frames
+
+            with self._lock:
+                self._samples.update(stacks)
+                self.sample_count += 1
+
+class MemoryTracker:
+    """tracemalloc snapshots and diffs, enabled only on demand."""
+
+    def __init__(self):
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        # Snapshots run in worker threads; serializes them with start / stop
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 25) -> None:
+        with self._lock:
+            tracemalloc.start(frames)
+            self._previous = None
+        logger.info(f"tracemalloc started ({frames} frames)")
+
+    def stop(self) -> None:
+        with self._lock:
+            tracemalloc.stop()
+            self._previous = None
+        logger.info("tracemalloc stopped")
+
+    def snapshot(self, limit: int = 20, key_type: str = "lineno",
+                 path_filter: Optional[str] = None) -> Dict:
+        """
+        Take a snapshot and diff it against the previous one.
+
+        Args:
+            limit: Number of entries to return
+            key_type: Grouping, "lineno", "filename" or "traceback"
+            path_filter: Only keep allocations from files whose path contains this string
+
+        Returns:
+            Dictionary with current/peak traced memory, top allocations and top growth
+
+        Raises:
+            RuntimeError: If tracemalloc is not running
+        """
+        with self._lock:
+            if not self.running:
+                raise RuntimeError("tracemalloc is not running")
+            return self._snapshot(limit, key_type, path_filter)
+
+    def _snapshot(self, limit: int, key_type: str, path_filter: Optional[str]) -> Dict:
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+        previous = self._previous
+        self._previous = snapshot
+
+        if path_filter:
+            path_filters = (tracemalloc.Filter(True, f"*{path_filter}*"),)
+            snapshot = snapshot.filter_traces(path_filters)
+            if previous is not None:
+                previous = previous.filter_traces(path_filters)
+
+        current, peak = tracemalloc.get_traced_memory()
+        result = {
+            "traced_current_bytes": current,
+            "traced_peak_bytes": peak,
+            "top_allocations": [self._format_stat(stat) for stat in snapshot.statistics(key_type)[:limit]],
+            "top_growth": None,
+        }
+
+        if previous is not None:
+            diff = snapshot.compare_to(previous, key_type)
+            result["top_growth"] = [self._format_stat(stat) for stat in diff[:limit]]
+
+        return result
+
+    def _format_stat(self, stat) -> Dict:
+        entry = {
+            "location": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+            "size_bytes": stat.size,
+            "count": stat.count,
+        }
+        if hasattr(stat, "size_diff"):
+            entry["size_diff_bytes"] = stat.size_diff
+            entry["count_diff"] = stat.count_diff
+        return entry
+
+def get_rss_bytes() -> Optional[int]:
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        # Peak rather than current RSS, in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        return None
+
+def get_model_parameter_bytes(model: object) -> Optional[int]:
+    """Memory held by a model wrapper's parameters, or None for remote / unknown models."""
+    inner = getattr(model, "model", None)
+    if inner is None:
+        return None
+
+    if hasattr(inner, "parameters") and hasattr(inner, "buffers"):
+        # torch.nn.Module
+        tensors = list(inner.parameters()) + list(inner.buffers())
+        return int(sum(t.numel() * t.element_size() for t in tensors))
+
+    if hasattr(inner, "weights"):
+        # Keras model
+        total = 0
+        for weight in inner.weights:
+            itemsize = getattr(weight.dtype, "size", None) or np.dtype(str(weight.dtype)).itemsize
+            total += int(np.prod(weight.shape)) * itemsize
+        return total
+
+    return None
+
+# Global instances
+cpu_profiler = SamplingProfiler()
+memory_tracker = MemoryTracker()
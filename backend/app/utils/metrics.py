@@ -0,0 +1,104 @@
+import threading
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+import numpy as np
+
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+class Metrics:
+    """In-process counters, gauges and summaries exposed in Prometheus text format."""
+
+    def __init__(self, window_size: int = 1000):
+        self.window_size = window_size
+        self._counters: Dict[MetricKey, float] = defaultdict(float)
+        self._gauges: Dict[MetricKey, float] = {}
+        # Summaries keep a sliding window of recent samples for percentiles
+        self._samples: Dict[MetricKey, Deque[float]] = {}
+        self._sample_totals: Dict[MetricKey, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, name: str, labels: Dict[str, str]) -> MetricKey:
+        return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        """Increment a counter."""
+        with self._lock:
+            self._counters[self._key(name, labels)] += value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        """Set a gauge to a value."""
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Record a sample for a summary."""
+        key = self._key(name, labels)
+        with self._lock:
+            if key not in self._samples:
+                self._samples[key] = deque(maxlen=self.window_size)
+                self._sample_totals[key] = [0, 0.0]
+            self._samples[key].append(value)
+            self._sample_totals[key][0] += 1
+            self._sample_totals[key][1] += value
+
+    def get_counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(self._key(name, labels), 0.0)
+
+    def percentile(self, name: str, q: float, **labels) -> Optional[float]:
+        """Get a percentile (0-100) over the recent samples of a summary."""
+        with self._lock:
+            samples = self._samples.get(self._key(name, labels))
+            if not samples:
+                return None
+            values = list(samples)
+        return float(np.percentile(values, q))
+
+    def mean(self, name: str, **labels) -> Optional[float]:
+        """Get the mean over the recent samples of a summary."""
+        with self._lock:
+            samples = self._samples.get(self._key(name, labels))
+            if not samples:
+                return None
+            return sum(samples) / len(samples)
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            samples = {key: list(values) for key, values in self._samples.items()}
+            totals = {key: list(values) for key, values in self._sample_totals.items()}
+
+        lines = []
+        # One "# TYPE" line before the first sample of each metric family
+        typed = set()
+
+        def declare(name: str, metric_type: str) -> None:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {metric_type}")
+
+        for (name, labels), value in sorted(counters.items()):
+            declare(name, "counter")
+            lines.append(f"{name}{self._format_labels(labels)} {value}")
+        for (name, labels), value in sorted(gauges.items()):
+            declare(name, "gauge")
+            lines.append(f"{name}{self._format_labels(labels)} {value}")
+        for (name, labels), values in sorted(samples.items()):
+            declare(name, "summary")
+            for q in (0.5, 0.95, 0.99):
+                quantile = float(np.percentile(values, q * 100))
+                lines.append(f"{name}{self._format_labels(labels + (('quantile', str(q)),))} {quantile}")
+            count, total = totals[(name, labels)]
+            lines.append(f"{name}_count{self._format_labels(labels)} {count}")
+            lines.append(f"{name}_sum{self._format_labels(labels)} {total}")
+        return "\n".join(lines) + "\n"
+
+    def _format_labels(self, labels: Tuple[Tuple[str, str], ...]) -> str:
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+# Global instance
+metrics = Metrics()
@@ -0,0 +1,41 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+
+class PredictionCache:
+    """LRU cache of per-model predictions keyed by image hash and model version."""
+
+    def __init__(self, max_size: int = settings.PREDICTION_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[str, str], List[Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, image_hash: str, version_key: str) -> Optional[List[Dict]]:
+        """Get cached predictions for an image from a specific model version."""
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            predictions = self._entries.get((image_hash, version_key))
+            if predictions is not None:
+                self._entries.move_to_end((image_hash, version_key))
+            return predictions
+
+    def put(self, image_hash: str, version_key: str, predictions: List[Dict]) -> None:
+        """Store predictions, evicting the least recently used entries."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[(image_hash, version_key)] = predictions
+            self._entries.move_to_end((image_hash, version_key))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_version(self, version_key: str) -> None:
+        """Drop every entry produced by a retired model version."""
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == version_key]:
+                del self._entries[key]
+
+# Global instance
+prediction_cache = PredictionCache()
@@ -0,0 +1,316 @@
+import os
+import json
+import math
+import time
+import logging
+import platform
+import importlib.util
+from typing import Dict, List, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Environment variables read by OpenMP / MKL / BLAS / TensorFlow when their
+# thread pools are created. They must be set before torch or tensorflow is imported.
+THREAD_ENV_VARS = {
+    "OMP_NUM_THREADS": "omp_threads",
+    "MKL_NUM_THREADS": "omp_threads",
+    "OPENBLAS_NUM_THREADS": "omp_threads",
+    "TF_NUM_INTRAOP_THREADS": "tf_intra_op",
+    "TF_NUM_INTEROP_THREADS": "tf_inter_op",
+}
+
+class RuntimeConfigurator:
+    """Splits the available cores between uvicorn workers and the PyTorch / TensorFlow runtimes."""
+
+    def __init__(self):
+        self.workers = max(1, settings.RUNTIME_WORKERS)
+        self.config_path = settings.RUNTIME_CONFIG_PATH
+        self.plan: Optional[Dict] = None
+
+    def detect_available_cores(self) -> int:
+        """
+        Detect the number of cores this process may use.
+
+        Takes the CPU affinity mask and the cgroup CPU quota (Docker --cpus)
+        into account, since os.cpu_count() reports every core of the host.
+
+        Returns:
+            int: Number of usable cores (at least 1)
+        """
+        if settings.RUNTIME_CPU_LIMIT > 0:
+            return settings.RUNTIME_CPU_LIMIT
+
+        try:
+            cores = len(os.sched_getaffinity(0))
+        except AttributeError:
+            cores = os.cpu_count() or 1
+
+        quota_cores = self._read_cgroup_quota()
+        if quota_cores is not None:
+            cores = min(cores, quota_cores)
+
+        return max(1, cores)
+
+    def _read_cgroup_quota(self) -> Optional[int]:
+        """Read the CPU quota from cgroup v2 or v1, rounded up to whole cores."""
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        try:
+            with open("/sys/fs/cgroup/cpu.max") as f:
+                quota, period = f.read().split()[:2]
+            if quota != "max":
+                return max(1, math.ceil(int(quota) / int(period)))
+            return None
+        except (OSError, ValueError):
+            pass
+
+        # cgroup v1: quota of -1 means unlimited
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                quota = int(f.read().strip())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read().strip())
+            if quota > 0 and period > 0:
+                return max(1, math.ceil(quota / period))
+        except (OSError, ValueError):
+            pass
+
+        return None
+
+    def _cpu_model(self) -> str:
+        """CPU model name from /proc/cpuinfo, falling back to the platform's processor string."""
+        try:
+            with open("/proc/cpuinfo") as f:
+                for line in f:
+                    if line.startswith("model name"):
+                        return line.split(":", 1)[1].strip()
+        except OSError:
+            pass
+        return platform.processor()
+
+    def hardware_fingerprint(self) -> Dict:
+        """What a tuned plan depends on: the core budget, the worker count and the CPU."""
+        return {
+            "cpu_count": self.detect_available_cores(),
+            "workers": self.workers,
+            "machine": platform.machine(),
+            "cpu_model": self._cpu_model(),
+        }
+
+    def compute_plan(self, torch_share: Optional[int] = None) -> Dict:
+        """
+        Compute thread counts for one worker process.
+
+        Args:
+            torch_share: Intra-op threads to give PyTorch; the rest of the worker's
+                cores go to TensorFlow. Defaults to an even split.
+
+        Returns:
+            Dictionary describing the thread allocation
+        """
+        cpu_count = self.detect_available_cores()
+        cores_per_worker = max(1, cpu_count // self.workers)
+
+        has_torch = importlib.util.find_spec("torch") is not None
+        has_tf = importlib.util.find_spec("tensorflow") is not None
+
+        if has_torch and has_tf:
+            # Both runtimes live in the same process: split the budget so their
+            # pools do not compete for the same cores.
+            if torch_share is None:
+                torch_share = math.ceil(cores_per_worker / 2)
+            torch_intra = min(max(1, torch_share), cores_per_worker)
+            tf_intra = max(1, cores_per_worker - torch_intra)
+        else:
+            torch_intra = cores_per_worker
+            tf_intra = cores_per_worker
+
+        return {
+            "cpu_count": cpu_count,
+            "workers": self.workers,
+            "cores_per_worker": cores_per_worker,
+            "torch_intra_op": torch_intra,
+            "torch_inter_op": 1,
+            "tf_intra_op": tf_intra,
+            "tf_inter_op": 1,
+            # torch's intra-op pool is the OpenMP pool, so OMP/MKL follow it
+            "omp_threads": torch_intra,
+            "source": "computed",
+        }
+
+    def _load_saved_plan(self) -> Optional[Dict]:
+        """Load an autotuned plan if it was measured on the same hardware fingerprint."""
+        try:
+            if not os.path.exists(self.config_path):
+                return None
+            with open(self.config_path) as f:
+                saved = json.load(f)
+        except Exception as e:
+            logger.warning(f"Could not read runtime config {self.config_path}: {e}")
+            return None
+
+        if saved.get("fingerprint") != self.hardware_fingerprint():
+            logger.info("Saved runtime config was tuned on different hardware, ignoring it")
+            return None
+
+        return saved
+
+    def apply_environment(self) -> Dict:
+        """
+        Export thread-count environment variables.
+
+        Must run before torch / tensorflow are imported. Variables already set
+        by the operator are left untouched.
+
+        Returns:
+            The thread plan in effect
+        """
+        self.plan = self._load_saved_plan() or self.compute_plan()
+
+        for env_var, key in THREAD_ENV_VARS.items():
+            os.environ.setdefault(env_var, str(self.plan[key]))
+
+        logger.info(
+            f"Runtime threads ({self.plan['source']}): {self.plan['cpu_count']} cores, "
+            f"{self.plan['workers']} worker(s), torch={self.plan['torch_intra_op']}, "
+            f"tensorflow={self.plan['tf_intra_op']}"
+        )
+        return self.plan
+
+    def apply_framework_threads(self) -> None:
+        """Configure the torch and TensorFlow thread pools. Call before loading models."""
+        if self.plan is None:
+            self.apply_environment()
+
+        try:
+            import torch
+            torch.set_num_threads(self.plan["torch_intra_op"])
+            try:
+                torch.set_num_interop_threads(self.plan["torch_inter_op"])
+            except RuntimeError:
+                # Can only be set once, before any inter-op parallel work
+                logger.debug("torch inter-op threads already initialized")
+        except ImportError:
+            pass
+
+        try:
+            import tensorflow as tf
+            tf.config.threading.set_intra_op_parallelism_threads(self.plan["tf_intra_op"])
+            tf.config.threading.set_inter_op_parallelism_threads(self.plan["tf_inter_op"])
+        except ImportError:
+            pass
+        except RuntimeError as e:
+            # TensorFlow refuses changes once its runtime is initialized
+            logger.warning(f"Could not set TensorFlow threads: {e}")
+
+    def autotune(self, model_loader, force: Optional[bool] = None) -> Dict:
+        """
+        Measure local ensemble throughput across torch thread counts and save the best.
+
+        TensorFlow's pools cannot be resized after initialization, so only the
+        torch pool is tuned: the saved plan keeps the TensorFlow threads of the
+        computed plan, which is the only split that was actually measured.
+
+        A plan saved for the same hardware fingerprint is already in effect
+        (see apply_environment) and is kept without measuring again.
+
+        Args:
+            model_loader: Loader holding the models to benchmark
+            force: Re-tune even if a saved plan applies (default: RUNTIME_AUTOTUNE_FORCE)
+
+        Returns:
+            The best thread plan found
+        """
+        if force is None:
+            force = settings.RUNTIME_AUTOTUNE_FORCE
+        if not force and self.plan is not None and self.plan.get("source") == "autotuned":
+            logger.info(f"Using the autotuned runtime config from {self.config_path}")
+            return self.plan
+
+        models = [
+            model for model in model_loader.get_all_models().values()
+            if getattr(model, "runtime", None) in ("torch", "tensorflow")
+        ]
+        if not models:
+            logger.info("No local models to autotune")
+            return self.plan
+
+        try:
+            import torch
+        except ImportError:
+            logger.info("PyTorch not available, nothing to autotune")
+            return self.plan
+
+        cores_per_worker = max(1, self.detect_available_cores() // self.workers)
+        # TensorFlow keeps the threads it was started with during every measurement
+        tf_threads = (self.plan or self.compute_plan())["tf_intra_op"]
+        best_plan, best_throughput = None, 0.0
+
+        for torch_threads in self._candidate_thread_counts(cores_per_worker):
+            torch.set_num_threads(torch_threads)
+            throughput = self._measure_throughput(models)
+            logger.info(f"Autotune torch_threads={torch_threads}: {throughput:.2f} images/s")
+
+            if throughput > best_throughput:
+                best_throughput = throughput
+                best_plan = self.compute_plan()
+                best_plan.update({
+                    "torch_intra_op": torch_threads,
+                    "omp_threads": torch_threads,
+                    "tf_intra_op": tf_threads,
+                })
+
+        if best_plan is None:
+            return self.plan
+
+        best_plan["source"] = "autotuned"
+        best_plan["throughput"] = round(best_throughput, 3)
+        best_plan["fingerprint"] = self.hardware_fingerprint()
+        torch.set_num_threads(best_plan["torch_intra_op"])
+        self.plan = best_plan
+
+        try:
+            os.makedirs(os.path.dirname(self.config_path), exist_ok=True)
+            with open(self.config_path, "w") as f:
+                json.dump(best_plan, f, indent=2)
+            logger.info(f"Saved autotuned runtime config to {self.config_path}")
+        except OSError as e:
+            logger.warning(f"Could not save runtime config: {e}")
+
+        return best_plan
+
+    def _candidate_thread_counts(self, cores: int) -> List[int]:
+        """Powers of two up to the core budget, plus the budget itself."""
+        candidates = []
+        n = 1
+        while n < cores:
+            candidates.append(n)
+            n *= 2
+        candidates.append(cores)
+        return candidates
+
+    def _measure_throughput(self, models: List[object]) -> float:
+        """Run every model on random input and return ensemble images per second."""
+        # Imported here: numpy sizes its BLAS pool from the environment set by apply_environment
+        import numpy as np
+
+        iterations = max(1, settings.RUNTIME_AUTOTUNE_ITERATIONS)
+        inputs = []
+        for model in models:
+            height, width = getattr(model, "input_size", settings.IMAGE_SIZE)
+            inputs.append(np.random.rand(1, height, width, 3).astype(np.float32))
+
+        # Warm-up pass, not timed
+        for model, image_array in zip(models, inputs):
+            model.predict(image_array, verbose=0)
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for model, image_array in zip(models, inputs):
+                model.predict(image_array, verbose=0)
+        elapsed = time.perf_counter() - start
+
+        return iterations / elapsed if elapsed > 0 else 0.0
+
+# Global instance
+runtime_configurator = RuntimeConfigurator()
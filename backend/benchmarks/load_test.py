@@ -0,0 +1,145 @@
+"""
+Open-loop load test of POST /predict for capacity planning.
+
+Requests arrive as a Poisson process at each target rate, independently of how
+fast the server answers, so queueing and admission rejections show up the way
+they would with real users. For every rate step the script reports achieved
+throughput, latency percentiles, the queue wait / inference split returned by
+the API and the number of rejected requests.
+
+Meant to be run against the simulator, which reproduces the latency, CPU and
+memory profile of the real models without their weights:
+
+    SIMULATOR_ENABLED=true DOG_GATE_ENABLED=false PREDICTION_CACHE_SIZE=0 \\
+    SIMULATOR_PROFILES='{"HuggingFace_ResNet50": {"latency_ms": 120, "memory_mb": 100},
+                         "MPO_MODELE_SCRATCH": {"latency_ms": 15, "input_size": [150, 150]}}' \\
+    RATE_LIMIT_RATE=1000 RATE_LIMIT_BURST=1000 \\
+    uvicorn app.main:app --port 8000
+
+    python benchmarks/load_test.py path/to/dog.jpg --rates 2 4 8 16 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from typing import Dict, List, Optional
+import numpy as np
+
+try:
+    import httpx
+except ImportError:
+    sys.exit("httpx is required: pip install httpx")
+
+class StepResult:
+    """Outcome of the requests sent during one rate step."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.latencies: List[float] = []
+        self.queue_waits: List[float] = []
+        self.inference_times: List[float] = []
+        self.status_counts: Dict[str, int] = {}
+        self.elapsed = 0.0
+
+    def record(self, status: str, latency: float, timings: Optional[Dict] = None) -> None:
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        if status == "200":
+            self.latencies.append(latency)
+            if timings:
+                self.queue_waits.append(timings["queue_wait_ms"])
+                self.inference_times.append(timings["inference_ms"])
+
+    def summary(self) -> Dict:
+        latencies = np.array(self.latencies) * 1000 if self.latencies else np.array([np.nan])
+        sent = sum(self.status_counts.values())
+        return {
+            "target_rps": self.rate,
+            "sent": sent,
+            "ok_rps": round(len(self.latencies) / self.elapsed, 2) if self.elapsed else 0.0,
+            "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 1),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 1),
+            "queue_wait_mean_ms": round(float(np.mean(self.queue_waits)), 1) if self.queue_waits else None,
+            "inference_mean_ms": round(float(np.mean(self.inference_times)), 1) if self.inference_times else None,
+            "rejected_429": self.status_counts.get("429", 0),
+            "errors": sent - len(self.latencies) - self.status_counts.get("429", 0),
+            "status_counts": self.status_counts,
+        }
+
+async def send(client: "httpx.AsyncClient", image_bytes: bytes, content_type: str, result: StepResult) -> None:
+    start = time.perf_counter()
+    try:
+        response = await client.post("/predict", files={"file": ("image", image_bytes, content_type)})
+    except httpx.HTTPError as e:
+        result.record(type(e).__name__, time.perf_counter() - start)
+        return
+
+    latency = time.perf_counter() - start
+    timings = response.json().get("timings") if response.status_code == 200 else None
+    result.record(str(response.status_code), latency, timings)
+
+async def run_step(client: "httpx.AsyncClient", image_bytes: bytes, content_type: str,
+                   rate: float, duration: float, rng: random.Random) -> StepResult:
+    """Send requests at `rate` per second on average for `duration` seconds, then wait for all of them."""
+    result = StepResult(rate)
+    tasks = []
+    start = time.perf_counter()
+    next_arrival = start
+
+    while next_arrival - start < duration:
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(client, image_bytes, content_type, result)))
+        next_arrival += rng.expovariate(rate)
+
+    await asyncio.gather(*tasks)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+async def main_async(args) -> List[Dict]:
+    with open(args.image, "rb") as f:
+        image_bytes = f.read()
+    content_type = "image/png" if args.image.lower().endswith(".png") else "image/jpeg"
+    rng = random.Random(args.seed)
+
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        summaries = []
+        for rate in args.rates:
+            result = await run_step(client, image_bytes, content_type, rate, args.duration, rng)
+            summary = result.summary()
+            summaries.append(summary)
+            print(f"{summary['target_rps']:>8} {summary['ok_rps']:>8} {summary['p50_ms']:>8} "
+                  f"{summary['p95_ms']:>8} {summary['p99_ms']:>8} {str(summary['queue_wait_mean_ms']):>10} "
+                  f"{str(summary['inference_mean_ms']):>10} {summary['rejected_429']:>6} {summary['errors']:>6}",
+                  flush=True)
+            if args.pause:
+                await asyncio.sleep(args.pause)
+        return summaries
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop load test of the prediction API")
+    parser.add_argument("image", help="JPEG / PNG image to send")
+    parser.add_argument("--url", default="http://localhost:8000/api/v1")
+    parser.add_argument("--rates", type=float, nargs="+", default=[1, 2, 4, 8], help="Requests per second, one step each")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per step")
+    parser.add_argument("--pause", type=float, default=5, help="Seconds between steps to let queues drain")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the step summaries to this JSON file")
+    args = parser.parse_args()
+
+    print(f"{'target':>8} {'ok rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'queue':>10} {'inference':>10} "
+          f"{'429':>6} {'errors':>6}  (ms)")
+    summaries = asyncio.run(main_async(args))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summaries, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Per-request transport overhead of the prediction endpoints.
+
+Sends the same image through each transport against a running API and reports
+client latency minus the inference time measured by the server, i.e. the cost
+of framing, upload parsing, copies and decoding:
+
+    multipart  POST /predict (multipart/form-data, the frontend route)
+    raw        POST /predict/raw (image bytes as the body)
+    tensor     POST /predict/tensor (decoded uint8 pixels)
+    grpc       DogBreedPredictor/Predict (if grpcio and the stubs are available)
+
+The prediction cache makes repeated images cheap, so run the server with
+PREDICTION_CACHE_SIZE=0 to keep inference in the loop, and raise
+RATE_LIMIT_RATE / RATE_LIMIT_BURST so admission control does not throttle.
+
+Usage (from backend/):
+    python benchmarks/transport_overhead.py path/to/dog.jpg --url http://localhost:8000/api/v1 \\
+        --requests 200 --grpc localhost:50051
+"""
+import argparse
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+from PIL import Image
+
+try:
+    import httpx
+except ImportError:
+    sys.exit("httpx is required: pip install httpx")
+
+def run(name: str, send: Callable[[], float], n_requests: int, warmup: int) -> Dict[str, float]:
+    """Call send() repeatedly; it returns the server-side inference time in ms."""
+    for _ in range(warmup):
+        send()
+
+    totals: List[float] = []
+    overheads: List[float] = []
+    for _ in range(n_requests):
+        start = time.perf_counter()
+        inference_ms = send()
+        total_ms = (time.perf_counter() - start) * 1000
+        totals.append(total_ms)
+        overheads.append(total_ms - inference_ms)
+
+    overheads.sort()
+    return {
+        "transport": name,
+        "total_p50_ms": statistics.median(totals),
+        "overhead_p50_ms": statistics.median(overheads),
+        "overhead_p95_ms": overheads[int(0.95 * (len(overheads) - 1))],
+    }
+
+def http_senders(client: "httpx.Client", image_bytes: bytes, content_type: str,
+                 pixels: np.ndarray) -> List[Tuple[str, Callable[[], float]]]:
+    tensor_body = pixels.tobytes()
+    tensor_shape = ",".join(str(dim) for dim in pixels.shape)
+
+    def multipart() -> float:
+        response = client.post("/predict", files={"file": ("image", image_bytes, content_type)})
+        response.raise_for_status()
+        return response.json()["timings"]["inference_ms"]
+
+    def raw() -> float:
+        response = client.post("/predict/raw", content=image_bytes, headers={"Content-Type": content_type})
+        response.raise_for_status()
+        return response.json()["timings"]["inference_ms"]
+
+    def tensor() -> float:
+        response = client.post(
+            "/predict/tensor",
+            content=tensor_body,
+            headers={"Content-Type": "application/octet-stream", "X-Tensor-Shape": tensor_shape}
+        )
+        response.raise_for_status()
+        return response.json()["timings"]["inference_ms"]
+
+    return [("multipart", multipart), ("raw", raw), ("tensor", tensor)]
+
+def grpc_sender(target: str, image_bytes: bytes) -> Tuple[str, Callable[[], float]]:
+    import grpc
+    from app.rpc import dog_breed_pb2, dog_breed_pb2_grpc
+
+    stub = dog_breed_pb2_grpc.DogBreedPredictorStub(grpc.insecure_channel(target))
+    request = dog_breed_pb2.ImageRequest(image=image_bytes)
+
+    def predict() -> float:
+        return stub.Predict(request).inference_ms
+
+    return "grpc", predict
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-request overhead of the prediction transports")
+    parser.add_argument("image", help="JPEG / PNG image to send")
+    parser.add_argument("--url", default="http://localhost:8000/api/v1")
+    parser.add_argument("--grpc", help="gRPC target, e.g. localhost:50051")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=10)
+    args = parser.parse_args()
+
+    with open(args.image, "rb") as f:
+        image_bytes = f.read()
+    image = Image.open(args.image)
+    content_type = Image.MIME.get(image.format, "image/jpeg")
+    pixels = np.asarray(image.convert("RGB"), dtype=np.uint8)
+
+    with httpx.Client(base_url=args.url, timeout=60) as client:
+        senders = http_senders(client, image_bytes, content_type, pixels)
+        if args.grpc:
+            senders.append(grpc_sender(args.grpc, image_bytes))
+
+        rows = [run(name, send, args.requests, args.warmup) for name, send in senders]
+
+    print(f"{'transport':<10} {'total p50':>10} {'overhead p50':>13} {'overhead p95':>13}  (ms)")
+    for row in rows:
+        print(f"{row['transport']:<10} {row['total_p50_ms']:>10.2f} "
+              f"{row['overhead_p50_ms']:>13.2f} {row['overhead_p95_ms']:>13.2f}")
+
+if __name__ == "__main__":
+    main()
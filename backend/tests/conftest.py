@@ -0,0 +1,40 @@
+"""
+Shared test setup.
+
+Settings are read from the environment when app.config is first imported, so
+the environment is prepared here, before any test module imports the app:
+data files go to a scratch directory and the models are fast simulated ones.
+"""
+import io
+import os
+import json
+import tempfile
+import pytest
+from PIL import Image
+
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="dog-breed-tests-")
+os.environ["SIMULATOR_ENABLED"] = "true"
+os.environ["SIMULATOR_PROFILES"] = json.dumps({
+    "default": {"latency_ms": 1, "latency_sigma": 0.01, "memory_mb": 1, "input_size": [32, 32]},
+    "model_a": {},
+    "model_b": {},
+})
+os.environ["DOG_GATE_ENABLED"] = "false"
+os.environ["MODEL_WATCH_ENABLED"] = "false"
+os.environ["GRPC_ENABLED"] = "false"
+
+@pytest.fixture
+def image_bytes() -> bytes:
+    """A small PNG image."""
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), (120, 80, 40)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+@pytest.fixture(scope="module")
+def client():
+    """Test client running the app's lifespan (model loading, history writer, job workers)."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
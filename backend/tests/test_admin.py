@@ -0,0 +1,72 @@
+import time
+import pytest
+from app.config import settings
+from app.utils.diagnostics import cpu_profiler, memory_tracker
+
+ADMIN_KEY = "test-admin-key"
+
+@pytest.fixture
+def admin(monkeypatch):
+    """Headers of an authorized admin request."""
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", ADMIN_KEY)
+    yield {"X-Admin-Key": ADMIN_KEY}
+    # Never leave tracing or sampling on for the following tests
+    if memory_tracker.running:
+        memory_tracker.stop()
+    if cpu_profiler.running:
+        cpu_profiler.stop()
+
+def test_admin_routes_are_disabled_without_a_configured_key(client, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", "")
+
+    response = client.get("/api/v1/admin/memory", headers={"X-Admin-Key": ""})
+
+    assert response.status_code == 403
+    assert "disabled" in response.json()["detail"]
+
+@pytest.mark.parametrize("headers", [{}, {"X-Admin-Key": "wrong"}])
+def test_admin_routes_need_the_key(client, admin, headers):
+    response = client.post("/api/v1/admin/memory/tracemalloc/start", headers=headers)
+
+    assert response.status_code == 403
+    assert not memory_tracker.running
+
+def test_tracemalloc_start_snapshot_and_stop(client, admin):
+    assert client.post("/api/v1/admin/memory/tracemalloc/start?frames=5", headers=admin).json() == {
+        "status": "tracing", "frames": 5
+    }
+
+    first = client.post("/api/v1/admin/memory/tracemalloc/snapshot?limit=5", headers=admin).json()
+    retained = [bytearray(1024) for _ in range(1000)]
+    second = client.post("/api/v1/admin/memory/tracemalloc/snapshot?limit=5", headers=admin).json()
+
+    assert first["top_growth"] is None
+    assert 0 < len(first["top_allocations"]) <= 5
+    # The second snapshot is diffed against the first
+    assert second["top_growth"] and "size_diff_bytes" in second["top_growth"][0]
+    assert second["traced_current_bytes"] > 0
+    del retained
+
+    assert client.post("/api/v1/admin/memory/tracemalloc/stop", headers=admin).json() == {"status": "stopped"}
+    response = client.post("/api/v1/admin/memory/tracemalloc/snapshot", headers=admin)
+    assert response.status_code == 409
+
+def test_cpu_profile_start_and_stop(client, admin):
+    assert client.post("/api/v1/admin/profile/cpu/start?interval_ms=1", headers=admin).status_code == 200
+    assert client.post("/api/v1/admin/profile/cpu/start", headers=admin).status_code == 409
+    time.sleep(0.1)
+
+    response = client.post("/api/v1/admin/profile/cpu/stop", headers=admin)
+
+    assert response.status_code == 200
+    assert not cpu_profiler.running
+    # Folded stacks: "thread;frame;frame count"
+    lines = response.text.strip().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+def test_memory_report(client, admin):
+    report = client.get("/api/v1/admin/memory", headers=admin).json()
+
+    assert report["rss_bytes"] > 0
+    assert set(report["model_parameter_bytes"]) == {"model_a", "model_b"}
+    assert report["tracemalloc_running"] is False
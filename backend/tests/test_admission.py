@@ -0,0 +1,140 @@
+import asyncio
+from typing import List, Tuple
+import pytest
+from fastapi import HTTPException
+from app.api.admission import AdmissionController, admission_controller, MAX_RETRY_AFTER
+from app.config import settings
+
+@pytest.fixture
+def controller(monkeypatch):
+    """Controller with a single inference slot and a generous rate limit."""
+    monkeypatch.setattr(settings, "MAX_CONCURRENT_PREDICTIONS", 1)
+    monkeypatch.setattr(settings, "RATE_LIMIT_RATE", 100.0)
+    monkeypatch.setattr(settings, "RATE_LIMIT_BURST", 100)
+    return AdmissionController()
+
+async def _service_order(controller: AdmissionController, requests: List[Tuple[str, str, str]]) -> List[str]:
+    """
+    Queue (label, client id, priority) requests behind a held slot, in order,
+    and return the labels in the order they were granted the slot.
+    """
+    holder = await controller.acquire_for("holder", {}, "interactive")
+    order = []
+
+    async def request(label: str, client_id: str, priority: str) -> None:
+        ticket = await controller.acquire_for(client_id, {}, priority)
+        order.append(label)
+        controller.release(ticket)
+
+    tasks = []
+    for label, client_id, priority in requests:
+        tasks.append(asyncio.create_task(request(label, client_id, priority)))
+        # Let the request reach the queue before submitting the next one
+        await asyncio.sleep(0)
+    assert controller.queue_depth == len(requests)
+
+    controller.release(holder)
+    await asyncio.gather(*tasks)
+    return order
+
+def test_interactive_requests_are_served_before_bulk(controller):
+    order = asyncio.run(_service_order(controller, [
+        ("bulk-1", "ip:a", "bulk"),
+        ("interactive-1", "ip:b", "interactive"),
+        ("bulk-2", "ip:a", "bulk"),
+        ("interactive-2", "ip:c", "interactive"),
+    ]))
+    assert order == ["interactive-1", "interactive-2", "bulk-1", "bulk-2"]
+
+def test_clients_share_the_queue_fairly(controller):
+    # A client that queued first cannot make a later client wait for all its requests
+    order = asyncio.run(_service_order(controller, [
+        ("a-1", "ip:a", "interactive"),
+        ("a-2", "ip:a", "interactive"),
+        ("a-3", "ip:a", "interactive"),
+        ("b-1", "ip:b", "interactive"),
+    ]))
+    assert order == ["a-1", "b-1", "a-2", "a-3"]
+
+def test_rate_limited_client_gets_429_with_retry_after(controller):
+    async def scenario():
+        ticket = await controller.acquire_for("ip:a", {"rate": 0.5, "burst": 1}, "interactive")
+        controller.release(ticket)
+        with pytest.raises(HTTPException) as excinfo:
+            await controller.acquire_for("ip:a", {"rate": 0.5, "burst": 1}, "interactive")
+        return excinfo.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 429
+    assert error.headers["Retry-After"] == "2"
+
+def test_retry_after_is_capped_when_the_quota_never_refills(controller):
+    async def scenario():
+        quota = {"rate": 0, "burst": 1}
+        controller.release(await controller.acquire_for("ip:a", quota, "interactive"))
+        with pytest.raises(HTTPException) as excinfo:
+            await controller.acquire_for("ip:a", quota, "interactive")
+        return excinfo.value
+
+    assert asyncio.run(scenario()).headers["Retry-After"] == str(MAX_RETRY_AFTER)
+
+def test_full_queue_is_rejected(controller, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_QUEUE_SIZE", 1)
+
+    async def scenario():
+        holder = await controller.acquire_for("ip:a", {}, "interactive")
+        waiting = asyncio.create_task(controller.acquire_for("ip:b", {}, "interactive"))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as excinfo:
+            await controller.acquire_for("ip:c", {}, "interactive")
+        controller.release(holder)
+        controller.release(await waiting)
+        return excinfo.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 429
+    assert "Retry-After" in error.headers
+
+def test_queue_timeout_gives_up_its_place(controller, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_QUEUE_WAIT", 0.05)
+
+    async def scenario():
+        holder = await controller.acquire_for("ip:a", {}, "interactive")
+        with pytest.raises(HTTPException) as excinfo:
+            await controller.acquire_for("ip:b", {}, "interactive")
+        depth = controller.queue_depth
+        controller.release(holder)
+        return excinfo.value, depth
+
+    error, depth = asyncio.run(scenario())
+    assert error.status_code == 429
+    assert depth == 0
+    assert controller.active == 0
+
+def test_clients_can_lower_but_not_raise_their_priority(controller):
+    assert controller.resolve_priority("bulk", {}) == "bulk"
+    assert controller.resolve_priority("interactive", {"priority": "bulk"}) == "bulk"
+    assert controller.resolve_priority("urgent", {}) == "interactive"
+
+def test_predict_route_returns_429_with_retry_after(client, image_bytes, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_RATE", 0.01)
+    monkeypatch.setattr(settings, "RATE_LIMIT_BURST", 1)
+    monkeypatch.setattr(admission_controller, "_buckets", {})
+    files = {"file": ("dog.png", image_bytes, "image/png")}
+
+    assert client.post("/api/v1/predict", files=files).status_code == 200
+    response = client.post("/api/v1/predict", files=files)
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+def test_batch_cost_is_charged_to_the_bucket_and_can_exceed_the_burst(controller):
+    async def scenario():
+        quota = {"rate": 1, "burst": 4}
+        controller.release(await controller.acquire_for("ip:a", quota, "bulk", cost=10))
+        with pytest.raises(HTTPException) as excinfo:
+            await controller.acquire_for("ip:a", quota, "bulk")
+        return excinfo.value
+
+    # 6 tokens of debt plus the one needed
+    assert asyncio.run(scenario()).headers["Retry-After"] == "7"
@@ -0,0 +1,13 @@
+import pytest
+from app.utils.breeds import load_class_names, normalize_breed_name
+
+@pytest.mark.parametrize("name", ["Shih-Tzu", "shih tzu", "shih_tzu", "SHIH-TZU"])
+def test_breed_spellings_share_one_key(name):
+    assert normalize_breed_name(name) == "shih_tzu"
+
+def test_class_names_follow_the_class_index():
+    class_names = load_class_names()
+
+    assert len(class_names) == 120
+    assert class_names[:3] == ["Chihuahua", "Japanese_spaniel", "Maltese_dog"]
+    assert len(set(class_names)) == len(class_names)
@@ -0,0 +1,129 @@
+import json
+import pytest
+from app.api.admission import admission_controller
+from app.config import settings
+from app.models.model_registry import model_registry
+from app.models.predictor import dog_breed_predictor
+from app.utils.client_models import read_client_version, write_web_export_info
+
+CLIENT_MODEL = "model_a"
+CLIENT_VERSION = "abc123"
+
+@pytest.fixture(autouse=True)
+def client_model(client, monkeypatch):
+    """Let the browser compute model_a (web export abc123), and lift the rate limit for these requests."""
+    monkeypatch.setattr(settings, "CLIENT_PREDICTION_MODELS", [CLIENT_MODEL])
+    monkeypatch.setattr(settings, "RATE_LIMIT_BURST", 1000)
+    monkeypatch.setattr(admission_controller, "_buckets", {})
+    monkeypatch.setattr(model_registry.get_model(CLIENT_MODEL), "client_version", CLIENT_VERSION, raising=False)
+
+def _predict(client, image_bytes, client_predictions):
+    if not isinstance(client_predictions, str):
+        client_predictions = json.dumps(client_predictions)
+    return client.post(
+        "/api/v1/predict",
+        files={"file": ("dog.png", image_bytes, "image/png")},
+        data={"client_predictions": client_predictions},
+    )
+
+def _valid(**overrides):
+    result = {"version": CLIENT_VERSION, "predictions": [{"breed": settings.DOG_BREEDS[0], "confidence": 0.9}]}
+    result.update(overrides)
+    return {CLIENT_MODEL: result}
+
+@pytest.mark.parametrize("client_predictions, reason", [
+    ("{not json", "not valid JSON"),
+    ([], "expected an object"),
+    ({"model_b": _valid()[CLIENT_MODEL]}, "cannot be computed by the client"),
+    ({CLIENT_MODEL: "Beagle"}, "must have a predictions list"),
+    ({CLIENT_MODEL: {"version": "1"}}, "must have a predictions list"),
+    (_valid(version=1), "version must be a short string"),
+    (_valid(version="v" * 65), "version must be a short string"),
+    (_valid(predictions=[]), "1 to 5 predictions"),
+    (_valid(predictions=[{"breed": "Beagle", "confidence": 0.1}] * 6), "1 to 5 predictions"),
+    (_valid(predictions=["Beagle"]), "need a breed"),
+    (_valid(predictions=[{"breed": 3, "confidence": 0.5}]), "need a breed"),
+    (_valid(predictions=[{"breed": "Beagle"}]), "between 0 and 1"),
+    (_valid(predictions=[{"breed": "Beagle", "confidence": "0.5"}]), "between 0 and 1"),
+    (_valid(predictions=[{"breed": "Beagle", "confidence": True}]), "between 0 and 1"),
+    (_valid(predictions=[{"breed": "Beagle", "confidence": 1.5}]), "between 0 and 1"),
+    (_valid(predictions=[{"breed": "Beagle", "confidence": -0.1}]), "between 0 and 1"),
+    ('{"model_a": {"predictions": [{"breed": "Beagle", "confidence": NaN}]}}', "between 0 and 1"),
+])
+def test_invalid_client_predictions_are_rejected(client, image_bytes, client_predictions, reason):
+    response = _predict(client, image_bytes, client_predictions)
+
+    assert response.status_code == 400
+    detail = response.json()["detail"]
+    assert detail.startswith("Invalid client_predictions")
+    assert reason in detail
+
+def test_valid_client_predictions_replace_the_server_model(client, image_bytes):
+    response = _predict(client, image_bytes, _valid())
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["prediction_sources"] == {CLIENT_MODEL: "client", "model_b": "server"}
+    assert body["model_versions"][CLIENT_MODEL] == f"{CLIENT_MODEL}@client-abc123"
+    assert body["model_predictions"][CLIENT_MODEL][0] == {
+        "breed": settings.DOG_BREEDS[0], "confidence": 0.9, "percentage": 90.0
+    }
+
+def test_unknown_breeds_fall_back_to_the_server_model(client, image_bytes):
+    response = _predict(client, image_bytes, _valid(predictions=[{"breed": "Not_A_Breed", "confidence": 0.9}]))
+
+    assert response.status_code == 200
+    assert response.json()["prediction_sources"][CLIENT_MODEL] == "server"
+
+@pytest.mark.parametrize("version", ["older1", None])
+def test_other_versions_fall_back_to_the_server_model(client, image_bytes, version):
+    result = _valid()
+    if version is None:
+        del result[CLIENT_MODEL]["version"]
+    else:
+        result[CLIENT_MODEL]["version"] = version
+
+    response = _predict(client, image_bytes, result)
+
+    assert response.status_code == 200
+    assert response.json()["prediction_sources"][CLIENT_MODEL] == "server"
+
+def test_client_predictions_are_ignored_without_a_web_export(client, image_bytes, monkeypatch):
+    monkeypatch.setattr(model_registry.get_model(CLIENT_MODEL), "client_version", None)
+
+    assert _predict(client, image_bytes, _valid()).json()["prediction_sources"][CLIENT_MODEL] == "server"
+
+def test_client_predictions_are_kept_when_degradation_drops_the_model(client, image_bytes, monkeypatch):
+    # Level 2 with a student: only the student (model_b here) is selected to run
+    monkeypatch.setattr(settings, "SERVING_MODE", "ensemble")
+    monkeypatch.setattr(
+        dog_breed_predictor, "_select_models",
+        lambda entries, level: {name: entry for name, entry in entries.items() if name == "model_b"}
+    )
+    # Errors of a model are logged and swallowed, so count its runs instead
+    runs = []
+    monkeypatch.setattr(model_registry.get_model(CLIENT_MODEL), "predict",
+                        lambda *args, **kwargs: runs.append(args), raising=False)
+
+    result = dog_breed_predictor.predict_all_models(image_bytes, _valid(), degradation_level=2)
+    assert result["prediction_sources"] == {CLIENT_MODEL: "client", "model_b": "server"}
+
+    # A rejected client result does not bring the dropped model back
+    result = dog_breed_predictor.predict_all_models(image_bytes, _valid(version="older1"), degradation_level=2)
+    assert result["prediction_sources"] == {"model_b": "server"}
+    assert runs == []
+
+def test_models_lists_the_accepted_client_versions(client):
+    assert client.get("/api/v1/models").json()["client_model_versions"] == {CLIENT_MODEL: CLIENT_VERSION}
+
+def test_web_export_version_follows_the_model_file(tmp_path):
+    model_path = tmp_path / "model.keras"
+    model_path.write_bytes(b"weights v1")
+    assert read_client_version(str(model_path)) is None
+
+    write_web_export_info(str(model_path), "v1hash")
+    assert read_client_version(str(model_path)) == "v1hash"
+
+    # Re-trained without a new export: the browser's model is stale
+    model_path.write_bytes(b"weights v2")
+    assert read_client_version(str(model_path)) is None
@@ -0,0 +1,137 @@
+import pytest
+from app.models.model_names import AZURE_MODEL_NAME, STUDENT_MODEL_NAME
+from app.models.predictor import dog_breed_predictor
+from app.utils import degradation
+from app.utils.degradation import DegradationController
+from app.utils.metrics import metrics
+from app.config import settings
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(degradation, "time", clock)
+    return clock
+
+@pytest.fixture
+def controller(clock, monkeypatch):
+    monkeypatch.setattr(settings, "DEGRADATION_ENABLED", True)
+    monkeypatch.setattr(settings, "DEGRADATION_QUEUE_THRESHOLDS", [2, 4, 6])
+    monkeypatch.setattr(settings, "DEGRADATION_LATENCY_THRESHOLDS", [1.0, 2.0, 3.0])
+    monkeypatch.setattr(settings, "DEGRADATION_RECOVERY_RATIO", 0.5)
+    monkeypatch.setattr(settings, "DEGRADATION_MIN_HOLD", 60)
+    monkeypatch.setattr(settings, "DEGRADATION_WINDOW", 30)
+    monkeypatch.setattr(settings, "DEGRADATION_MIN_SAMPLES", 3)
+    return DegradationController()
+
+def test_queue_depth_escalates_straight_to_the_matching_level(controller):
+    assert controller.evaluate(1) == 0
+    assert controller.evaluate(4) == 2
+    assert controller.evaluate(10) == 3
+
+def test_p95_latency_escalates(controller):
+    for _ in range(3):
+        controller.observe(2.5)
+    assert controller.evaluate(0) == 2
+
+def test_too_few_latency_samples_are_ignored(controller):
+    controller.observe(10.0)
+    assert controller.evaluate(0) == 0
+
+def test_level_is_held_before_stepping_down(controller, clock):
+    assert controller.evaluate(6) == 3
+
+    clock.now += 59
+    assert controller.evaluate(0) == 3
+
+def test_recovery_steps_down_one_level_per_hold(controller, clock):
+    assert controller.evaluate(6) == 3
+
+    levels = []
+    for _ in range(4):
+        clock.now += 61
+        levels.append(controller.evaluate(0))
+        # Not again until the new level has been held
+        assert controller.evaluate(0) == levels[-1]
+
+    assert levels == [2, 1, 0, 0]
+    assert [(event["from"], event["to"]) for event in controller.status()["events"]] == [
+        (0, 3), (3, 2), (2, 1), (1, 0)
+    ]
+
+def test_recovery_needs_load_well_below_the_threshold(controller, clock):
+    assert controller.evaluate(4) == 2
+
+    clock.now += 61
+    # Below level 2's threshold (4) but above half of it
+    assert controller.evaluate(3) == 2
+    assert controller.evaluate(2) == 1
+
+def test_old_latencies_leave_the_window(controller, clock):
+    for _ in range(3):
+        controller.observe(2.5)
+    clock.now += 31
+    assert controller.evaluate(0) == 0
+
+def test_forced_level_overrides_the_load(controller):
+    controller.force(3)
+    assert controller.evaluate(0) == 3
+    assert controller.status()["forced"]
+
+    controller.force(None)
+    assert controller.evaluate(0) == 3
+    assert not controller.status()["forced"]
+
+def test_disabled_controller_stays_at_level_0(controller, monkeypatch):
+    monkeypatch.setattr(settings, "DEGRADATION_ENABLED", False)
+    assert controller.evaluate(100) == 0
+
+# Model selection per level (names unique to these tests so other tests' latencies do not count)
+
+FAST, MEDIUM, SLOW = "deg_fast", "deg_medium", "deg_slow"
+
+@pytest.fixture
+def entries(monkeypatch):
+    monkeypatch.setattr(settings, "SERVING_MODE", "ensemble")
+    monkeypatch.setattr(settings, "DEGRADATION_LATENCY_HINTS", {FAST: 0.01, MEDIUM: 0.1, SLOW: 1.0})
+    return {name: object() for name in (SLOW, MEDIUM, FAST, AZURE_MODEL_NAME)}
+
+def test_level_0_runs_every_model_but_the_student(entries):
+    selected = dog_breed_predictor._select_models({**entries, STUDENT_MODEL_NAME: object()}, 0)
+    assert set(selected) == set(entries)
+
+def test_level_1_drops_azure(entries):
+    assert set(dog_breed_predictor._select_models(entries, 1)) == {SLOW, MEDIUM, FAST}
+
+def test_level_2_prefers_the_student(entries):
+    assert list(dog_breed_predictor._select_models({**entries, STUDENT_MODEL_NAME: object()}, 2)) == [STUDENT_MODEL_NAME]
+
+def test_level_2_without_student_keeps_the_two_fastest(entries):
+    assert set(dog_breed_predictor._select_models(entries, 2)) == {FAST, MEDIUM}
+
+def test_level_3_keeps_the_fastest_local_model(entries):
+    assert list(dog_breed_predictor._select_models(entries, 3)) == [FAST]
+
+def test_level_3_never_falls_back_to_remote_models():
+    assert dog_breed_predictor._select_models({AZURE_MODEL_NAME: object()}, 3) == {}
+
+def test_measured_latency_outranks_hints(entries):
+    # Hinted as the slowest, measured as the fastest
+    metrics.observe("model_inference_seconds", 0.001, model="deg_measured")
+    entries["deg_measured"] = object()
+    settings.DEGRADATION_LATENCY_HINTS["deg_measured"] = 10.0
+    assert list(dog_breed_predictor._select_models(entries, 3)) == ["deg_measured"]
+
+def test_unmeasured_models_without_hints_rank_by_name(monkeypatch):
+    monkeypatch.setattr(settings, "DEGRADATION_LATENCY_HINTS", {})
+    entries = {"deg_zeta": object(), "deg_alpha": object()}
+    assert list(dog_breed_predictor._select_models(entries, 3)) == ["deg_alpha"]
@@ -0,0 +1,84 @@
+import io
+from typing import List
+import numpy as np
+import pytest
+from PIL import Image
+from app.config import settings
+from app.models.dog_gate import DogGate, dog_gate, GATE_BATCH_SIZE, IMAGENET_DOG_CLASSES
+from app.models.predictor import dog_breed_predictor
+from app.utils.metrics import metrics
+
+class FakeGateModel:
+    """ImageNet classifier putting an image's mean brightness (0-1) on the dog classes."""
+
+    def __init__(self):
+        self.batch_sizes: List[int] = []
+
+    def __call__(self, batch: np.ndarray, training: bool = False) -> np.ndarray:
+        self.batch_sizes.append(len(batch))
+        probabilities = np.zeros((len(batch), 1000), dtype=np.float32)
+        dog_mass = batch.mean(axis=(1, 2, 3)) / 255.0
+        dog_classes = probabilities[:, IMAGENET_DOG_CLASSES]
+        probabilities[:, IMAGENET_DOG_CLASSES] = (dog_mass / dog_classes.shape[1])[:, None]
+        probabilities[:, 0] = 1.0 - dog_mass
+        return probabilities
+
+@pytest.fixture
+def gate_model(monkeypatch):
+    model = FakeGateModel()
+    monkeypatch.setattr(dog_gate, "model", model)
+    monkeypatch.setattr(dog_gate, "threshold", 0.5)
+    return model
+
+def _png(brightness: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (40, 40), (brightness,) * 3).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def test_gate_defaults_to_off_without_real_models(monkeypatch):
+    monkeypatch.setattr(settings, "DOG_GATE_ENABLED", None)
+    gate = DogGate()
+
+    # Nothing is loaded, TensorFlow is not even imported
+    assert gate.load(default_enabled=False) is False
+    assert gate.status() == {"enabled": False, "loaded": False, "threshold": gate.threshold, "error": None}
+
+def test_explicit_setting_overrides_the_default(monkeypatch):
+    monkeypatch.setattr(settings, "DOG_GATE_ENABLED", False)
+
+    assert DogGate().load(default_enabled=True) is False
+
+def test_batch_rejects_images_without_a_dog_and_counts_them(client, gate_model):
+    checks = metrics.get_counter("dog_gate_checks_total")
+    rejections = metrics.get_counter("dog_gate_rejections_total")
+
+    results = dog_breed_predictor.predict_batch([_png(230), _png(10), _png(200)])
+
+    assert [result["dog_detected"] for result in results] == [True, False, True]
+    assert results[1]["models_used"] == [] and "message" in results[1]
+    assert results[0]["models_used"] and results[0]["dog_score"] == pytest.approx(230 / 255, rel=1e-3)
+    # One forward pass of the gate for the whole batch
+    assert gate_model.batch_sizes == [3]
+    assert metrics.get_counter("dog_gate_checks_total") - checks == 3
+    assert metrics.get_counter("dog_gate_rejections_total") - rejections == 1
+
+def test_gate_splits_large_batches(gate_model):
+    images = [Image.new("RGB", (8, 8), (200, 200, 200))] * (GATE_BATCH_SIZE + 3)
+
+    decisions = dog_gate.check_batch(images)
+
+    assert len(decisions) == GATE_BATCH_SIZE + 3 and all(is_dog for is_dog, _ in decisions)
+    assert gate_model.batch_sizes == [GATE_BATCH_SIZE, 3]
+
+def test_gate_failure_lets_every_image_through(monkeypatch):
+    def broken(batch, training=False):
+        raise RuntimeError("gate exploded")
+    monkeypatch.setattr(dog_gate, "model", broken)
+
+    assert dog_gate.check_batch([Image.new("RGB", (8, 8))] * 2) == [(True, None), (True, None)]
+
+def test_gate_is_skipped_at_the_last_degradation_level(client, gate_model):
+    result = dog_breed_predictor.predict_batch([_png(10)], degradation_level=3)[0]
+
+    assert result["dog_detected"] is True and result["dog_score"] is None
+    assert gate_model.batch_sizes == []
@@ -0,0 +1,60 @@
+import io
+from concurrent import futures
+import numpy as np
+import pytest
+from PIL import Image
+from app.config import settings
+
+grpc = pytest.importorskip("grpc")
+# Stubs are generated from dog_breed.proto at image build time
+dog_breed_pb2 = pytest.importorskip("app.rpc.dog_breed_pb2")
+dog_breed_pb2_grpc = pytest.importorskip("app.rpc.dog_breed_pb2_grpc")
+
+from app.rpc.server import DogBreedPredictorServicer
+
+@pytest.fixture(scope="module")
+def stub(client):
+    """Stub of a gRPC server sharing the HTTP app's admission controller."""
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+    dog_breed_pb2_grpc.add_DogBreedPredictorServicer_to_server(DogBreedPredictorServicer(), server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    with grpc.insecure_channel(f"127.0.0.1:{port}") as channel:
+        yield dog_breed_pb2_grpc.DogBreedPredictorStub(channel)
+    server.stop(None)
+
+def _png(color) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (48, 48), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def test_batch_larger_than_the_burst_is_admitted_once(stub, monkeypatch):
+    monkeypatch.setattr(settings, "CLIENT_QUOTAS", {"batch-key": {"rate": 0.01, "burst": 4}})
+    tensor = dog_breed_pb2.Tensor(height=32, width=32, data=np.full((32, 32, 3), 90, np.uint8).tobytes())
+    images = [dog_breed_pb2.ImageRequest(image=_png((index, 80, 40))) for index in range(9)]
+    images.append(dog_breed_pb2.ImageRequest(tensor=tensor))
+    metadata = (("x-api-key", "batch-key"),)
+
+    response = stub.PredictBatch(dog_breed_pb2.BatchRequest(images=images), metadata=metadata)
+
+    assert len(response.results) == 10
+    assert all(result.success and result.aggregated_results for result in response.results)
+
+    # The batch cost more than the burst: the bucket is in debt
+    with pytest.raises(grpc.RpcError) as excinfo:
+        stub.Predict(images[0], metadata=metadata)
+    assert excinfo.value.code() == grpc.StatusCode.RESOURCE_EXHAUSTED
+    assert dict(excinfo.value.trailing_metadata())["retry-after"]
+
+def test_undecodable_image_fails_alone_in_a_batch(stub, monkeypatch):
+    monkeypatch.setattr(settings, "CLIENT_QUOTAS", {"partial-key": {"rate": 10, "burst": 10}})
+    images = [
+        dog_breed_pb2.ImageRequest(image=_png((10, 20, 30))),
+        dog_breed_pb2.ImageRequest(image=b"not an image"),
+    ]
+
+    response = stub.PredictBatch(dog_breed_pb2.BatchRequest(images=images), metadata=(("x-api-key", "partial-key"),))
+
+    assert response.results[0].success
+    assert not response.results[1].success
+    assert response.results[1].error == "Failed to preprocess image"
@@ -0,0 +1,140 @@
+import time
+import pytest
+from app.history.recorder import HistoryRecorder
+from app.history.store import HistoryStore, to_row
+from app.utils.metrics import metrics
+from app.config import settings
+
+def _result(breed, confidence=0.8, dog_detected=True, image_hash="hash"):
+    predictions = [{"breed": breed, "confidence": confidence, "percentage": confidence * 100}] if breed else []
+    return {
+        "image_hash": image_hash,
+        "dog_detected": dog_detected,
+        "dog_score": 0.9,
+        "model_versions": {"model_a": "model_a@v1"},
+        "model_predictions": {"model_a": predictions},
+        "aggregated_results": [dict(prediction, model_count=1) for prediction in predictions],
+    }
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(str(tmp_path / "history.sqlite3"))
+
+def test_aggregates_follow_inserts(store):
+    now = time.time()
+    store.insert_many([
+        to_row(now, "multipart", _result("Beagle", 0.8), {"inference_ms": 100.0}),
+        to_row(now, "raw", _result("Beagle", 0.6), {"inference_ms": 300.0}),
+        to_row(now, "grpc", _result("Pug", 0.9), None),
+    ])
+    # A second batch updates the same aggregate rows
+    store.insert_many([to_row(now, "job", _result(None, dog_detected=False), {"inference_ms": 20.0})])
+
+    stats = store.get_stats(days=1, top=10)
+
+    assert stats["total_predictions"] == 4
+    assert stats["no_dog_detected"] == 1
+    top_breeds = {row["breed"]: row for row in stats["top_breeds"]}
+    assert list(top_breeds) == ["Beagle", "Pug"]
+    assert top_breeds["Beagle"]["count"] == 2
+    assert top_breeds["Beagle"]["mean_confidence"] == pytest.approx(0.7)
+    [today] = stats["daily"]
+    assert today["predictions"] == 4
+    assert today["mean_inference_ms"] == pytest.approx(140.0)
+
+def test_stats_limit_breeds_and_days(store):
+    now = time.time()
+    store.insert_many([to_row(now - 10 * 86400, "raw", _result("Pug"), None)])
+    store.insert_many([to_row(now, "raw", _result("Beagle"), None), to_row(now, "raw", _result("Beagle"), None)])
+
+    stats = store.get_stats(days=1, top=1)
+
+    assert [row["breed"] for row in stats["top_breeds"]] == ["Beagle"]
+    assert len(stats["daily"]) == 1
+    # Totals cover every day
+    assert stats["total_predictions"] == 3
+
+def test_keyset_pagination_walks_every_entry_once(store):
+    now = time.time()
+    store.insert_many([to_row(now + index, "raw", _result("Beagle", image_hash=f"h{index}"), None) for index in range(7)])
+
+    pages, before_id = [], None
+    while True:
+        page = store.list_entries(limit=3, before_id=before_id)
+        if not page:
+            break
+        pages.append([entry["image_hash"] for entry in page])
+        before_id = page[-1]["id"]
+
+    assert pages == [["h6", "h5", "h4"], ["h3", "h2", "h1"], ["h0"]]
+
+def test_pagination_is_stable_while_entries_are_added(store):
+    now = time.time()
+    store.insert_many([to_row(now, "raw", _result("Beagle", image_hash=f"h{index}"), None) for index in range(4)])
+    first_page = store.list_entries(limit=2)
+
+    store.insert_many([to_row(now, "raw", _result("Beagle", image_hash="new"), None)])
+    second_page = store.list_entries(limit=2, before_id=first_page[-1]["id"])
+
+    assert [entry["image_hash"] for entry in first_page + second_page] == ["h3", "h2", "h1", "h0"]
+
+def test_filters_combine_with_pagination(store):
+    now = time.time()
+    store.insert_many([
+        to_row(now, "raw", _result("Beagle" if index % 2 else "Pug", image_hash=f"h{index}"), None)
+        for index in range(6)
+    ])
+
+    page = store.list_entries(limit=2, breed="Beagle")
+    assert [entry["image_hash"] for entry in page] == ["h5", "h3"]
+    page = store.list_entries(limit=2, breed="Beagle", before_id=page[-1]["id"])
+    assert [entry["image_hash"] for entry in page] == ["h1"]
+    assert [entry["image_hash"] for entry in store.list_entries(limit=10, image_hash="h4")] == ["h4"]
+
+def test_entry_details_round_trip(store):
+    result = _result("Beagle")
+    store.insert_many([to_row(time.time(), "raw", result, {"queue_wait_ms": 1.5, "inference_ms": 10.0})])
+    [summary] = store.list_entries(limit=1)
+
+    entry = store.get(summary["id"])
+
+    assert entry["model_predictions"] == result["model_predictions"]
+    assert entry["model_versions"] == result["model_versions"]
+    assert entry["queue_wait_ms"] == 1.5
+    assert store.get(summary["id"] + 1) is None
+
+def test_recorder_snapshots_shared_results():
+    recorder = HistoryRecorder()
+    result = _result("Beagle", 0.8)
+
+    assert recorder.record(result, "raw")
+    # The prediction lists are shared with the prediction cache and the response
+    result["model_predictions"]["model_a"][0]["confidence"] = 0.1
+    result["aggregated_results"].clear()
+
+    _, _, queued, _ = recorder._queue.get_nowait()
+    row = to_row(0.0, "raw", queued, None)
+    assert row["top_confidence"] == 0.8
+    assert '"confidence": 0.8' in row["model_predictions"]
+
+def test_recorder_drops_and_counts_overflow(monkeypatch):
+    monkeypatch.setattr(settings, "HISTORY_QUEUE_SIZE", 1)
+    monkeypatch.setattr(settings, "HISTORY_OVERFLOW", "drop")
+    recorder = HistoryRecorder()
+    dropped = metrics.get_counter("history_entries_dropped_total")
+
+    assert recorder.record(_result("Beagle"), "raw")
+    assert not recorder.record(_result("Beagle"), "raw")
+
+    assert metrics.get_counter("history_entries_dropped_total") == dropped + 1
+
+def test_recorder_hands_overflow_to_the_spill_thread(monkeypatch):
+    monkeypatch.setattr(settings, "HISTORY_QUEUE_SIZE", 1)
+    monkeypatch.setattr(settings, "HISTORY_OVERFLOW", "spill")
+    recorder = HistoryRecorder()
+
+    assert recorder.record(_result("Beagle"), "raw")
+    assert recorder.record(_result("Pug"), "raw")
+    assert not recorder.record(_result("Pug"), "raw")
+
+    assert recorder._spill_queue.qsize() == 1
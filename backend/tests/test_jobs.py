@@ -0,0 +1,178 @@
+import os
+import time
+import uuid
+import pytest
+from app.config import settings
+from app.jobs.manager import job_manager, STAGING_GRACE_SECONDS
+from app.jobs.store import JobStore, job_store
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+def _items(count: int):
+    return [(f"dog{index}.png", f"/tmp/dog{index}.png") for index in range(count)]
+
+def _wait_for_status(client, job_id: str, statuses, timeout: float = 15.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/v1/jobs/{job_id}").json()
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} still {job['status']} after {timeout}s")
+
+def test_jobs_are_claimed_oldest_first_and_only_once(store):
+    store.create_job("first", _items(1))
+    store.create_job("second", _items(1))
+
+    assert store.claim_next_job() == "first"
+    assert store.claim_next_job() == "second"
+    assert store.claim_next_job() is None
+
+def test_interrupted_job_resumes_with_its_pending_items(store):
+    store.create_job("job", _items(3))
+    assert store.claim_next_job() == "job"
+    store.save_results("job", [(0, {"breed": "Beagle"}, None)])
+
+    # Process restart: the job was left running
+    assert store.requeue_interrupted() == 1
+    assert store.get_job("job")["status"] == "queued"
+    assert store.claim_next_job() == "job"
+
+    assert [item["item_index"] for item in store.get_pending_items("job", 10)] == [1, 2]
+    job = store.get_job("job")
+    assert job["processed_items"] == 1
+    assert store.get_results("job", 0, 10)[0]["result"] == {"breed": "Beagle"}
+
+def test_cancel_queued_job_is_immediate(store):
+    store.create_job("job", _items(2))
+
+    assert store.request_cancel("job") == "cancelled"
+    assert store.get_job("job")["status"] == "cancelled"
+    assert store.claim_next_job() is None
+
+def test_cancel_running_job_is_flagged_for_the_worker(store):
+    store.create_job("job", _items(2))
+    store.claim_next_job()
+
+    assert store.request_cancel("job") == "running"
+    assert store.is_cancel_requested("job")
+    assert store.get_job("job")["status"] == "running"
+
+def test_cancel_finished_or_unknown_job(store):
+    store.create_job("job", _items(1))
+    store.claim_next_job()
+    store.finish_job("job", "completed")
+
+    assert store.request_cancel("job") == "completed"
+    assert not store.is_cancel_requested("job")
+    assert store.request_cancel("missing") is None
+
+def test_failed_items_are_counted(store):
+    store.create_job("job", _items(2))
+    store.save_results("job", [(0, {"breed": "Beagle"}, None), (1, None, "Failed to preprocess image")])
+
+    job = store.get_job("job")
+    assert (job["processed_items"], job["failed_items"]) == (2, 1)
+    assert [item["status"] for item in store.get_results("job", 0, 10)] == ["done", "failed"]
+
+def _stage(job_id: str, image_bytes: bytes, count: int):
+    job_dir = os.path.join(job_manager.files_dir, job_id)
+    os.makedirs(job_dir, exist_ok=True)
+    items = []
+    for index in range(count):
+        path = os.path.join(job_dir, f"{index}.png")
+        with open(path, "wb") as f:
+            f.write(image_bytes)
+        items.append((f"dog{index}.png", path))
+    return items
+
+def test_manager_resumes_interrupted_job_on_start(client, image_bytes):
+    job_id = uuid.uuid4().hex
+    job_manager.stop()
+    try:
+        # State left by a process that stopped after the first item
+        job_store.create_job(job_id, _stage(job_id, image_bytes, 3))
+        assert job_store.claim_next_job() == job_id
+        job_store.save_results(job_id, [(0, {"resumed": False}, None)])
+    finally:
+        job_manager.start()
+
+    job = _wait_for_status(client, job_id, ("completed", "failed"))
+
+    assert job["status"] == "completed"
+    assert job["processed_items"] == 3
+    results = {item["item_index"]: item["result"] for item in job["results"]}
+    # Finished items are not predicted again
+    assert results[0] == {"resumed": False}
+    assert all(results[index]["aggregated_results"] for index in (1, 2))
+    assert not os.path.exists(os.path.join(job_manager.files_dir, job_id))
+
+def test_cancel_route(client, image_bytes):
+    job_id = uuid.uuid4().hex
+    job_manager.stop()
+    try:
+        job_store.create_job(job_id, _stage(job_id, image_bytes, 2))
+        response = client.post(f"/api/v1/jobs/{job_id}/cancel")
+        # Never claimed by a worker, the staged files go with the cancellation
+        staged_left = os.path.exists(os.path.join(job_manager.files_dir, job_id))
+    finally:
+        job_manager.start()
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "cancelled"
+    assert not staged_left
+    assert client.get(f"/api/v1/jobs/{job_id}").json()["status"] == "cancelled"
+    assert client.post("/api/v1/jobs/missing/cancel").status_code == 404
+
+def test_submitted_job_completes(client, image_bytes):
+    files = [("files", (f"dog{index}.png", image_bytes, "image/png")) for index in range(3)]
+    response = client.post("/api/v1/jobs", files=files)
+    assert response.status_code == 202
+
+    job = _wait_for_status(client, response.json()["job_id"], ("completed", "failed"))
+
+    assert job["status"] == "completed"
+    assert job["progress"] == 1.0
+    assert [item["item_index"] for item in job["results"]] == [0, 1, 2]
+
+def test_start_sweeps_staged_files_of_finished_jobs(client, image_bytes):
+    finished, orphaned, staging = (uuid.uuid4().hex for _ in range(3))
+    job_manager.stop()
+    try:
+        job_store.create_job(finished, _stage(finished, image_bytes, 1))
+        job_store.finish_job(finished, "cancelled")
+        # Left by a crash during staging, and being staged by another worker process
+        _stage(orphaned, image_bytes, 1)
+        old = time.time() - STAGING_GRACE_SECONDS - 1
+        os.utime(os.path.join(job_manager.files_dir, orphaned), (old, old))
+        _stage(staging, image_bytes, 1)
+    finally:
+        job_manager.start()
+
+    assert not os.path.exists(os.path.join(job_manager.files_dir, finished))
+    assert not os.path.exists(os.path.join(job_manager.files_dir, orphaned))
+    assert os.path.exists(os.path.join(job_manager.files_dir, staging))
+
+def test_non_image_upload_is_rejected(client, image_bytes):
+    files = [
+        ("files", ("dog.png", image_bytes, "image/png")),
+        ("files", ("notes.txt", b"hello", "text/plain")),
+    ]
+    response = client.post("/api/v1/jobs", files=files)
+
+    assert response.status_code == 400
+    assert "Unsupported file notes.txt" in response.json()["detail"]
+
+def test_upload_over_the_total_size_is_rejected(client, image_bytes, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_MAX_TOTAL_SIZE", len(image_bytes) * 2)
+    files = [("files", (f"dog{index}.png", image_bytes, "image/png")) for index in range(3)]
+    os.makedirs(job_manager.files_dir, exist_ok=True)
+    staged_before = set(os.listdir(job_manager.files_dir))
+
+    response = client.post("/api/v1/jobs", files=files)
+
+    assert response.status_code == 400
+    assert "Upload too large" in response.json()["detail"]
+    assert set(os.listdir(job_manager.files_dir)) == staged_before
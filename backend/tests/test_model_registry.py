@@ -0,0 +1,132 @@
+import sys
+import types
+import weakref
+import numpy as np
+import pytest
+from app.models.model_loader import ModelLoader
+from app.models.model_registry import ModelRegistry
+from app.utils.prediction_cache import prediction_cache
+
+@pytest.fixture
+def registry():
+    loader = ModelLoader()
+    assert loader.load_models()
+    registry = ModelRegistry()
+    registry.attach(loader)
+    return registry
+
+def _image() -> np.ndarray:
+    return np.zeros((1, 32, 32, 3), dtype=np.float32)
+
+def test_attach_registers_version_1(registry):
+    assert registry.get_loaded_model_names() == ["model_a", "model_b"]
+    assert registry.get_version_key("model_a") == "model_a@v1"
+
+def test_reload_swaps_in_a_new_version(registry):
+    old_model = registry.get_model("model_a")
+
+    assert registry.reload("model_a")
+
+    assert registry.get_version_key("model_a") == "model_a@v2"
+    assert registry.get_model("model_a") is not old_model
+    assert registry.loader.get_model("model_a") is registry.get_model("model_a")
+    # Other models are untouched
+    assert registry.get_version_key("model_b") == "model_b@v1"
+
+def test_in_flight_request_keeps_retired_version_until_it_finishes(registry):
+    with registry.acquire_all() as pinned:
+        entry = pinned["model_a"]
+        old_model = entry.model
+
+        assert registry.reload("model_a")
+
+        # The request still runs on the version it started with
+        assert entry.retired
+        assert entry.model is old_model
+        assert entry.model.predict(_image()).shape[0] == 1
+
+        # Requests starting now get the new version
+        with registry.acquire_all() as current:
+            assert current["model_a"].key == "model_a@v2"
+            assert current["model_a"].model is not old_model
+
+    # Released once its last request has finished
+    assert entry.active_requests == 0
+    assert entry.model is None
+
+def test_retired_version_without_requests_is_freed_at_swap(registry):
+    with registry.acquire_all() as pinned:
+        entry = pinned["model_a"]
+    prediction_cache.put("image", entry.key, [{"breed": "Beagle", "confidence": 0.9}])
+
+    assert registry.reload("model_a")
+
+    assert entry.model is None
+    assert prediction_cache.get("image", entry.key) is None
+
+def test_failed_warm_up_keeps_current_version(registry, monkeypatch):
+    broken = registry.loader.build_model("model_a")
+    # Three classes instead of the model's full breed list
+    broken.predict = lambda image_array, verbose=0, strict=False: np.full((1, 3), 1 / 3)
+    monkeypatch.setattr(registry.loader, "build_model", lambda model_name, source=None: broken)
+    current = registry.get_model("model_a")
+
+    assert not registry.reload("model_a")
+
+    assert registry.get_version_key("model_a") == "model_a@v1"
+    assert registry.get_model("model_a") is current
+
+def test_concurrent_reload_of_the_same_model_is_refused(registry):
+    registry._reloading.add("model_a")
+    assert not registry.reload("model_a")
+    assert not registry.reload_async("model_a")
+
+def test_retired_version_is_garbage_collected(registry):
+    old_model = weakref.ref(registry.get_model("model_a"))
+    with registry.acquire_all():
+        assert registry.reload("model_a")
+        assert old_model() is not None
+
+    # Nothing (registry, loader, entry, cache) keeps the retired model alive
+    assert old_model() is None
+
+class FakeKerasModel:
+    """Wrapper of a TensorFlow model, as seen by the registry."""
+
+    runtime = "tensorflow"
+
+    def __init__(self):
+        self.model = object()
+
+@pytest.fixture
+def clear_session_calls(monkeypatch):
+    """Record tf.keras.backend.clear_session() calls without TensorFlow installed."""
+    calls = []
+    backend = types.SimpleNamespace(clear_session=lambda: calls.append(True))
+    tensorflow = types.SimpleNamespace(keras=types.SimpleNamespace(backend=backend))
+    monkeypatch.setitem(sys.modules, "tensorflow", tensorflow)
+    return calls
+
+def test_keras_session_is_cleared_once_no_tensorflow_model_remains(registry, clear_session_calls):
+    tf_model = FakeKerasModel()
+    registry.loader.models["model_a"] = tf_model
+    registry.attach(registry.loader)
+
+    with registry.acquire_all() as pinned:
+        registry._swap("model_a", registry.loader.build_model("model_a"), None)
+        # The retired TensorFlow version is still pinned
+        assert not clear_session_calls
+        assert registry._runtime_in_use("tensorflow")
+
+    assert pinned["model_a"].model is None
+    assert tf_model.model is None
+    assert clear_session_calls == [True]
+
+def test_keras_session_is_kept_while_another_tensorflow_model_is_served(registry, clear_session_calls):
+    registry.loader.models["model_a"] = FakeKerasModel()
+    registry.loader.models["model_b"] = FakeKerasModel()
+    registry.attach(registry.loader)
+
+    registry._swap("model_a", registry.loader.build_model("model_a"), None)
+
+    assert clear_session_calls == []
@@ -0,0 +1,104 @@
+import os
+import sys
+import json
+import types
+from typing import List
+import pytest
+from app.config import settings
+from app.utils import runtime_config
+from app.utils.runtime_config import RuntimeConfigurator, THREAD_ENV_VARS
+
+class FakeLoader:
+    def __init__(self):
+        self.models = {"local": types.SimpleNamespace(runtime="torch", input_size=(8, 8))}
+
+    def get_all_models(self):
+        return self.models
+
+@pytest.fixture
+def configurator(tmp_path, monkeypatch):
+    """Configurator for 8 cores and 2 workers, saving its plan under tmp_path."""
+    monkeypatch.setattr(settings, "RUNTIME_CONFIG_PATH", str(tmp_path / "runtime_config.json"))
+    monkeypatch.setattr(settings, "RUNTIME_CPU_LIMIT", 8)
+    monkeypatch.setattr(settings, "RUNTIME_WORKERS", 2)
+    monkeypatch.setattr(settings, "RUNTIME_AUTOTUNE_FORCE", False)
+    for env_var in THREAD_ENV_VARS:
+        monkeypatch.delenv(env_var, raising=False)
+    return RuntimeConfigurator()
+
+@pytest.fixture
+def torch_threads(monkeypatch) -> List[int]:
+    """Thread counts set on a fake torch module; throughput peaks at 2 threads."""
+    calls = []
+    monkeypatch.setitem(sys.modules, "torch", types.SimpleNamespace(set_num_threads=calls.append))
+    monkeypatch.setattr(
+        RuntimeConfigurator, "_measure_throughput",
+        lambda self, models: {1: 10.0, 2: 30.0, 4: 20.0}[calls[-1]]
+    )
+    return calls
+
+def _with_runtimes(monkeypatch, *runtimes: str) -> None:
+    monkeypatch.setattr(
+        runtime_config.importlib.util, "find_spec",
+        lambda name: object() if name in runtimes else None
+    )
+
+def test_plan_splits_worker_cores_between_runtimes(configurator, monkeypatch):
+    _with_runtimes(monkeypatch, "torch", "tensorflow")
+    plan = configurator.compute_plan()
+
+    assert plan["cores_per_worker"] == 4
+    assert (plan["torch_intra_op"], plan["tf_intra_op"], plan["omp_threads"]) == (2, 2, 2)
+
+def test_single_runtime_gets_every_worker_core(configurator, monkeypatch):
+    _with_runtimes(monkeypatch, "torch")
+
+    assert configurator.compute_plan()["torch_intra_op"] == 4
+
+def test_apply_environment_exports_threads_without_overriding_the_operator(configurator, monkeypatch):
+    _with_runtimes(monkeypatch, "torch", "tensorflow")
+    monkeypatch.setenv("OMP_NUM_THREADS", "3")
+
+    plan = configurator.apply_environment()
+
+    assert plan["source"] == "computed"
+    assert os.environ["OMP_NUM_THREADS"] == "3"
+    assert os.environ["MKL_NUM_THREADS"] == "2"
+    assert os.environ["TF_NUM_INTRAOP_THREADS"] == "2"
+    assert os.environ["TF_NUM_INTEROP_THREADS"] == "1"
+
+def test_autotuned_plan_is_saved_and_reused_on_the_next_start(configurator, torch_threads, monkeypatch):
+    _with_runtimes(monkeypatch, "torch", "tensorflow")
+    configurator.apply_environment()
+
+    plan = configurator.autotune(FakeLoader())
+
+    assert (plan["source"], plan["torch_intra_op"], plan["tf_intra_op"]) == ("autotuned", 2, 2)
+    with open(configurator.config_path) as f:
+        assert json.load(f)["fingerprint"] == configurator.hardware_fingerprint()
+
+    # Next start: the saved plan is applied and not measured again
+    restarted = RuntimeConfigurator()
+    assert restarted.apply_environment()["source"] == "autotuned"
+    measured = len(torch_threads)
+    assert restarted.autotune(FakeLoader()) == restarted.plan
+    assert len(torch_threads) == measured
+
+    # Unless a re-tune is requested
+    restarted.autotune(FakeLoader(), force=True)
+    assert len(torch_threads) > measured
+
+def test_saved_plan_is_ignored_when_the_hardware_changes(configurator, torch_threads, monkeypatch):
+    _with_runtimes(monkeypatch, "torch", "tensorflow")
+    configurator.apply_environment()
+    configurator.autotune(FakeLoader())
+
+    monkeypatch.setattr(settings, "RUNTIME_CPU_LIMIT", 16)
+
+    assert RuntimeConfigurator().apply_environment()["source"] == "computed"
+
+def test_corrupt_saved_plan_falls_back_to_the_computed_plan(configurator):
+    with open(configurator.config_path, "w") as f:
+        f.write("{not json")
+
+    assert configurator.apply_environment()["source"] == "computed"
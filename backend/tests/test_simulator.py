@@ -0,0 +1,33 @@
+import time
+import numpy as np
+import pytest
+from app.models.model_loader import SimulatedModel
+
+def _model(**profile) -> SimulatedModel:
+    return SimulatedModel("sim", {"latency_sigma": 0.0, "memory_mb": 1, **profile}, seed=1)
+
+def test_latency_follows_the_profile_and_batch_exponent():
+    model = _model(latency_ms=40, batch_exponent=0.5)
+
+    assert model.sample_latency(1) == pytest.approx(0.04)
+    assert model.sample_latency(4) == pytest.approx(0.08)
+
+def test_seeded_models_are_reproducible():
+    first = SimulatedModel("sim", {"memory_mb": 1}, seed=7)
+    second = SimulatedModel("sim", {"memory_mb": 1}, seed=7)
+
+    assert [first.sample_latency() for _ in range(3)] == [second.sample_latency() for _ in range(3)]
+
+@pytest.mark.parametrize("cpu_fraction", [0.0, 1.0])
+def test_predict_takes_about_the_sampled_latency(cpu_fraction):
+    model = _model(latency_ms=100, cpu_fraction=cpu_fraction, input_size=[8, 8])
+    # Calibrate the burn outside the timed call
+    model.predict(np.zeros((1, 8, 8, 3), dtype=np.float32))
+
+    start = time.perf_counter()
+    output = model.predict(np.zeros((2, 8, 8, 3), dtype=np.float32))
+    elapsed = time.perf_counter() - start
+
+    assert output.shape[0] == 2 and np.allclose(output.sum(axis=1), 1.0)
+    expected = model.sample_latency(2)
+    assert 0.8 * expected <= elapsed <= 2.0 * expected
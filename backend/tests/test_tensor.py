@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from app.api.admission import admission_controller
+from app.config import settings
+
+@pytest.fixture(autouse=True)
+def limits(monkeypatch):
+    """A full tensor larger than MAX_FILE_SIZE, as with the default limits, and no rate limit."""
+    monkeypatch.setattr(settings, "TENSOR_MAX_SIDE", 640)
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", 1024 * 1024)
+    monkeypatch.setattr(settings, "RATE_LIMIT_BURST", 1000)
+    monkeypatch.setattr(admission_controller, "_buckets", {})
+
+def _predict_tensor(client, height: int, width: int, body: bytes = None):
+    if body is None:
+        body = np.full((height, width, 3), 128, dtype=np.uint8).tobytes()
+    return client.post(
+        "/api/v1/predict/tensor",
+        content=body,
+        headers={"X-Tensor-Shape": f"{height},{width},3", "Content-Type": "application/octet-stream"},
+    )
+
+def test_tensor_at_the_maximum_side_is_accepted(client):
+    response = _predict_tensor(client, 640, 640)
+
+    assert response.status_code == 200
+    assert response.json()["aggregated_results"]
+
+def test_tensor_over_the_maximum_side_is_rejected(client):
+    response = _predict_tensor(client, 641, 640)
+
+    assert response.status_code == 400
+    assert "16 to 640 pixels per side" in response.json()["detail"]
+
+def test_tensor_body_longer_than_its_shape_is_rejected(client):
+    response = _predict_tensor(client, 16, 16, body=bytes(16 * 16 * 3 + 1))
+
+    assert response.status_code == 413
@@ -0,0 +1,79 @@
+/**
+ * Bundle size report for the production build.
+ *
+ * Lists every JS / CSS file under build/static with its raw, gzip and brotli
+ * size, and the total loaded on first paint (files referenced by index.html)
+ * versus lazily loaded chunks. Use --json to save a report and --compare to
+ * diff against a saved one, e.g. before and after a change:
+ *
+ *   npm run build && node scripts/bundle-report.js --json before.json
+ *   ... change ...
+ *   npm run build && node scripts/bundle-report.js --compare before.json
+ */
+const fs = require('fs');
+const path = require('path');
+const zlib = require('zlib');
+
+const args = process.argv.slice(2);
+const option = (name) => {
+  const index = args.indexOf(name);
+  return index >= 0 ? args[index + 1] : undefined;
+};
+
+const buildDir = path.resolve(option('--build') || 'build');
+const staticDir = path.join(buildDir, 'static');
+const indexHtml = fs.readFileSync(path.join(buildDir, 'index.html'), 'utf8');
+
+const files = ['js', 'css']
+  .filter((type) => fs.existsSync(path.join(staticDir, type)))
+  .flatMap((type) =>
+    fs
+      .readdirSync(path.join(staticDir, type))
+      .filter((name) => name.endsWith(`.${type}`))
+      .map((name) => `static/${type}/${name}`)
+  )
+  .map((file) => {
+    const content = fs.readFileSync(path.join(buildDir, file));
+    return {
+      file,
+      initial: indexHtml.includes(file),
+      raw: content.length,
+      gzip: zlib.gzipSync(content, { level: 9 }).length,
+      brotli: zlib.brotliCompressSync(content).length,
+    };
+  })
+  .sort((a, b) => b.brotli - a.brotli);
+
+const sum = (entries, key) => entries.reduce((total, entry) => total + entry[key], 0);
+const totals = (entries) => ({ raw: sum(entries, 'raw'), gzip: sum(entries, 'gzip'), brotli: sum(entries, 'brotli') });
+const report = {
+  files,
+  initial: totals(files.filter((entry) => entry.initial)),
+  lazy: totals(files.filter((entry) => !entry.initial)),
+  total: totals(files),
+};
+
+const kb = (bytes) => `${(bytes / 1024).toFixed(1)} kB`.padStart(10);
+const row = (label, sizes) => console.log(`${label.padEnd(48)}${kb(sizes.raw)}${kb(sizes.gzip)}${kb(sizes.brotli)}`);
+
+console.log(`${'file'.padEnd(48)}${'raw'.padStart(10)}${'gzip'.padStart(10)}${'brotli'.padStart(10)}`);
+files.forEach((entry) => row(`${entry.file}${entry.initial ? '' : ' (lazy)'}`, entry));
+console.log();
+row('initial load', report.initial);
+row('lazy chunks', report.lazy);
+row('total', report.total);
+
+const comparePath = option('--compare');
+if (comparePath) {
+  const before = JSON.parse(fs.readFileSync(comparePath, 'utf8'));
+  const delta = (key) => {
+    const diff = report[key].brotli - before[key].brotli;
+    return `${diff >= 0 ? '+' : ''}${(diff / 1024).toFixed(1)} kB brotli`;
+  };
+  console.log(`\nvs ${comparePath}: initial ${delta('initial')}, total ${delta('total')}`);
+}
+
+const jsonPath = option('--json');
+if (jsonPath) {
+  fs.writeFileSync(jsonPath, JSON.stringify(report, null, 2));
+}
@@ -0,0 +1,54 @@
+/**
+ * Precompress the production build for nginx.
+ *
+ * Writes a .gz (served by gzip_static) and a .br (picked by nginx.conf from
+ * Accept-Encoding) next to every text asset in build/. JS and CSS always get
+ * both files since nginx serves them without falling back to on-the-fly
+ * compression; other assets are skipped when compression does not pay off.
+ *
+ * Usage: node scripts/compress.js [buildDir]
+ */
+const fs = require('fs');
+const path = require('path');
+const zlib = require('zlib');
+
+const buildDir = path.resolve(process.argv[2] || 'build');
+const COMPRESSIBLE = /\.(js|css|html|json|svg|txt|ico|map)$/;
+const ALWAYS = /\.(js|css)$/;
+const MIN_SIZE = 1024;
+
+const walk = (dir) =>
+  fs.readdirSync(dir, { withFileTypes: true }).flatMap((entry) => {
+    const fullPath = path.join(dir, entry.name);
+    return entry.isDirectory() ? walk(fullPath) : [fullPath];
+  });
+
+let rawTotal = 0;
+let gzipTotal = 0;
+let brotliTotal = 0;
+
+for (const file of walk(buildDir)) {
+  if (!COMPRESSIBLE.test(file)) continue;
+
+  const content = fs.readFileSync(file);
+  const always = ALWAYS.test(file);
+  if (!always && content.length < MIN_SIZE) continue;
+
+  const gzipped = zlib.gzipSync(content, { level: zlib.constants.Z_BEST_COMPRESSION });
+  const brotli = zlib.brotliCompressSync(content, {
+    params: {
+      [zlib.constants.BROTLI_PARAM_QUALITY]: zlib.constants.BROTLI_MAX_QUALITY,
+      [zlib.constants.BROTLI_PARAM_SIZE_HINT]: content.length,
+    },
+  });
+
+  if (always || gzipped.length < content.length) fs.writeFileSync(`${file}.gz`, gzipped);
+  if (always || brotli.length < content.length) fs.writeFileSync(`${file}.br`, brotli);
+
+  rawTotal += content.length;
+  gzipTotal += gzipped.length;
+  brotliTotal += brotli.length;
+}
+
+const kb = (bytes) => `${(bytes / 1024).toFixed(1)} kB`;
+console.log(`Precompressed ${buildDir}: ${kb(rawTotal)} raw, ${kb(gzipTotal)} gzip, ${kb(brotliTotal)} brotli`);
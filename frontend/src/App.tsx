@@ -1,18 +1,28 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, lazy, Suspense } from 'react';
 import { Heart, AlertCircle } from 'lucide-react';
 import ImageUploader from './components/ImageUploader';
-import ResultsDisplay from './components/ResultsDisplay';
-import ModelComparison from './components/ModelComparison';
 import { apiService } from './services/api';
-import { UploadedImage, PredictionResponse, ModelInfo } from './types';
+import { localInference, LOCAL_CONFIDENCE_THRESHOLD } from './services/localInference';
+import { UploadedImage, PredictionResponse, ModelInfo, LocalPrediction } from './types';
 import './styles/main.css';
 
+// Result views are split into their own chunks: they are only needed once a prediction comes back
+const loadResultsDisplay = () => import('./components/ResultsDisplay');
+const loadModelComparison = () => import('./components/ModelComparison');
+const ResultsDisplay = lazy(loadResultsDisplay);
+const ModelComparison = lazy(loadModelComparison);
+
+const LOCAL_MODE_KEY = 'localInference';
+
 const App: React.FC = () => {
   const [uploadedImage, setUploadedImage] = useState<UploadedImage | null>(null);
   const [isLoading, setIsLoading] = useState(false);
   const [results, setResults] = useState<PredictionResponse | null>(null);
   const [error, setError] = useState<string | null>(null);
   const [modelInfo, setModelInfo] = useState<ModelInfo | null>(null);
+  // Opt-in: run the MPO model in the browser for an instant first result
+  const [localMode, setLocalMode] = useState(() => localStorage.getItem(LOCAL_MODE_KEY) === 'true');
+  const [localResult, setLocalResult] = useState<LocalPrediction | null>(null);
 
   // Load model info on component mount
   useEffect(() => {
@@ -28,14 +38,49 @@ const App: React.FC = () => {
     loadModelInfo();
   }, []);
 
+  useEffect(() => {
+    localStorage.setItem(LOCAL_MODE_KEY, String(localMode));
+    if (localMode) {
+      localInference.preload();
+    }
+  }, [localMode]);
+
   const handleImageUpload = async (image: UploadedImage) => {
     setUploadedImage(image);
     setError(null);
     setResults(null);
+    setLocalResult(null);
     setIsLoading(true);
 
+    // Fetch the result chunks while the models are running
+    loadResultsDisplay();
+    loadModelComparison();
+
     try {
-      const predictionResults = await apiService.predictBreed(image.file);
+      let local: LocalPrediction | null = null;
+      if (localMode) {
+        try {
+          local = await localInference.predict(image.file);
+          // A cached model older than the one the server serves is not trusted
+          if (modelInfo?.client_model_versions?.[local.model_name] !== local.version) {
+            console.warn(`Local model ${local.model_name}@${local.version} is not the served version, ignored`);
+            local = null;
+          } else {
+            setLocalResult(local);
+          }
+        } catch (err) {
+          // Fall back to the server alone
+          console.warn('Local inference failed:', err);
+        }
+      }
+
+      if (local && local.predictions[0].confidence >= LOCAL_CONFIDENCE_THRESHOLD) {
+        // Confident enough: the server is not called (no dog check, no other models)
+        setResults(localInference.toResponse(local, image.file));
+        return;
+      }
+
+      const predictionResults = await apiService.predictBreed(image.file, local);
       setResults(predictionResults);
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Une erreur est survenue');
@@ -50,6 +95,7 @@ const App: React.FC = () => {
     }
     setUploadedImage(null);
     setResults(null);
+    setLocalResult(null);
     setError(null);
   };
 
@@ -71,6 +117,8 @@ const App: React.FC = () => {
         <ImageUploader 
           onImageUpload={handleImageUpload}
           isLoading={isLoading}
+          localMode={localMode}
+          onLocalModeChange={setLocalMode}
         />
 
         {/* Loading State */}
@@ -79,6 +127,12 @@ const App: React.FC = () => {
             <div className="spinner"></div>
             <h3>Analyse en cours...</h3>
             <p>Nos modèles d'IA analysent votre image</p>
+            {localResult && (
+              <p style={{ marginTop: '15px' }}>
+                <strong>Résultat local :</strong> {localResult.predictions[0].breed} ({localResult.predictions[0].percentage}%)
+                {' '}en {Math.round(localResult.inference_ms)} ms, confirmation par le serveur en cours
+              </p>
+            )}
           </div>
         )}
 
@@ -97,9 +151,24 @@ const App: React.FC = () => {
           </div>
         )}
 
+        {/* No dog detected */}
+        {results && !isLoading && results.dog_detected === false && (
+          <div className="error">
+            <AlertCircle size={20} style={{ marginRight: '10px' }} />
+            <strong>{results.message || 'Aucun chien détecté dans l\'image'}</strong>
+            <button 
+              onClick={handleReset}
+              className="btn"
+              style={{ marginLeft: '15px' }}
+            >
+              Essayer une autre image
+            </button>
+          </div>
+        )}
+
         {/* Results */}
-        {results && !isLoading && (
-          <>
+        {results && !isLoading && results.dog_detected !== false && (
+          <Suspense fallback={<div className="loading"><div className="spinner"></div></div>}>
             <ResultsDisplay results={results} />
             
             {/* Detailed Model Comparison */}
@@ -127,7 +196,7 @@ const App: React.FC = () => {
                 Analyser une nouvelle image
               </button>
             </div>
-          </>
+          </Suspense>
         )}
 
         {/* Footer */}
@@ -6,9 +6,11 @@ import { UploadedImage } from '../types';
 interface ImageUploaderProps {
   onImageUpload: (image: UploadedImage) => void;
   isLoading: boolean;
+  localMode: boolean;
+  onLocalModeChange: (enabled: boolean) => void;
 }
 
-const ImageUploader: React.FC<ImageUploaderProps> = ({ onImageUpload, isLoading }) => {
+const ImageUploader: React.FC<ImageUploaderProps> = ({ onImageUpload, isLoading, localMode, onLocalModeChange }) => {
   const [uploadedImage, setUploadedImage] = useState<UploadedImage | null>(null);
 
   const onDrop = useCallback((acceptedFiles: File[]) => {
@@ -91,6 +93,16 @@ const ImageUploader: React.FC<ImageUploaderProps> = ({ onImageUpload, isLoading
           )}
         </div>
       )}
+      <label style={{ display: 'block', marginTop: '15px', fontSize: '0.9rem', opacity: 0.8 }}>
+        <input
+          type="checkbox"
+          checked={localMode}
+          onChange={(e) => onLocalModeChange(e.target.checked)}
+          disabled={isLoading}
+          style={{ marginRight: '8px' }}
+        />
+        Analyse rapide dans le navigateur (modèle MPO, télécharge ~20 MB une seule fois)
+      </label>
     </div>
   );
 };
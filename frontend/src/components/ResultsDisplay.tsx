@@ -38,6 +38,11 @@ const ResultsDisplay: React.FC<ResultsDisplayProps> = ({ results }) => {
       <div className="results-header">
         <h2>Résultats de la Classification</h2>
         <p>Analyse réalisée par {results.models_used.length} modèle(s) de Deep Learning</p>
+        {!!results.degradation_level && (
+          <p style={{ fontSize: '0.9rem', marginTop: '5px', opacity: 0.8 }}>
+            Serveur très sollicité : analyse allégée (niveau {results.degradation_level}/3)
+          </p>
+        )}
       </div>
 
       {/* Aggregated Results */}
@@ -82,6 +87,9 @@ const ResultsDisplay: React.FC<ResultsDisplayProps> = ({ results }) => {
             <div key={modelName} className="model-card">
               <div className="model-header">
                 <div className="model-name">{modelName.toUpperCase()}</div>
+                {results.prediction_sources?.[modelName] === 'client' && (
+                  <p style={{ fontSize: '0.8rem', color: '#666' }}>Calculé dans le navigateur</p>
+                )}
                 <p style={{ fontSize: '0.9rem', color: '#666' }}>
                   Top 3 des prédictions
                 </p>
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { PredictionResponse, ModelInfo, ApiError } from '../types';
+import { PredictionResponse, ModelInfo, ApiError, LocalPrediction } from '../types';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000/api/v1';
 
@@ -11,10 +11,19 @@ const api = axios.create({
 export const apiService = {
   /**
    * Upload image and get breed predictions
+   * (a local result is sent along so the server does not run that model again)
    */
-  async predictBreed(file: File): Promise<PredictionResponse> {
+  async predictBreed(file: File, localPrediction?: LocalPrediction | null): Promise<PredictionResponse> {
     const formData = new FormData();
     formData.append('file', file);
+    if (localPrediction) {
+      formData.append('client_predictions', JSON.stringify({
+        [localPrediction.model_name]: {
+          version: localPrediction.version,
+          predictions: localPrediction.predictions.map(({ breed, confidence }) => ({ breed, confidence })),
+        },
+      }));
+    }
 
     try {
       const response = await api.post<PredictionResponse>('/predict', formData, {
@@ -0,0 +1,144 @@
+import type { LayersModel, Tensor } from '@tensorflow/tfjs';
+import { BreedPrediction, LocalPrediction, PredictionResponse } from '../types';
+
+// Written by `python -m app.training.export_web --output ../frontend/public/models/mpo`
+const MODEL_URL = process.env.REACT_APP_LOCAL_MODEL_URL || `${process.env.PUBLIC_URL}/models/mpo/model.json`;
+
+// Above this local confidence the server is not called at all
+export const LOCAL_CONFIDENCE_THRESHOLD = parseFloat(process.env.REACT_APP_LOCAL_CONFIDENCE_THRESHOLD || '0.9');
+
+interface ModelMetadata {
+  model_name: string;
+  version: string;
+  input_size: [number, number];
+  scale: number;
+  class_names: string[];
+}
+
+interface LoadedModel {
+  tf: typeof import('@tensorflow/tfjs');
+  model: LayersModel;
+  metadata: ModelMetadata;
+}
+
+let loading: Promise<LoadedModel> | null = null;
+
+const loadModel = (): Promise<LoadedModel> => {
+  if (!loading) {
+    loading = (async () => {
+      // TensorFlow.js is only downloaded once local mode is turned on
+      const tf = await import(/* webpackChunkName: "tfjs" */ '@tensorflow/tfjs');
+      const model = await tf.loadLayersModel(MODEL_URL);
+      const metadata = model.getUserDefinedMetadata() as ModelMetadata;
+
+      // The first call compiles the WebGL shaders: do it now rather than on the user's image
+      const [height, width] = metadata.input_size;
+      tf.tidy(() => {
+        model.predict(tf.zeros([1, height, width, 3]));
+      });
+      return { tf, model, metadata };
+    })();
+    // Allow a new attempt after a failed download
+    loading.catch(() => {
+      loading = null;
+    });
+  }
+  return loading;
+};
+
+interface ResizedImage {
+  canvas: HTMLCanvasElement;
+  originalSize: [number, number];
+}
+
+const drawResized = (file: File, width: number, height: number): Promise<ResizedImage> =>
+  new Promise((resolve, reject) => {
+    const url = URL.createObjectURL(file);
+    const image = new Image();
+    image.onload = () => {
+      const canvas = document.createElement('canvas');
+      canvas.width = width;
+      canvas.height = height;
+      const context = canvas.getContext('2d');
+      if (!context) {
+        URL.revokeObjectURL(url);
+        reject(new Error('Canvas non disponible'));
+        return;
+      }
+      context.imageSmoothingQuality = 'high';
+      context.drawImage(image, 0, 0, width, height);
+      URL.revokeObjectURL(url);
+      resolve({ canvas, originalSize: [image.naturalWidth, image.naturalHeight] });
+    };
+    image.onerror = () => {
+      URL.revokeObjectURL(url);
+      reject(new Error('Image illisible'));
+    };
+    image.src = url;
+  });
+
+export const localInference = {
+  /**
+   * Start downloading TensorFlow.js and the model
+   */
+  preload(): void {
+    loadModel().catch((err) => console.warn('Local model unavailable:', err));
+  },
+
+  /**
+   * Run the MPO model in the browser and return its top 3 breeds
+   */
+  async predict(file: File): Promise<LocalPrediction> {
+    const { tf, model, metadata } = await loadModel();
+    const [height, width] = metadata.input_size;
+    // Resized by the browser before upload to the GPU, like the server's resize to 150x150
+    const { canvas, originalSize } = await drawResized(file, width, height);
+
+    const start = performance.now();
+    const probabilities = tf.tidy(() => {
+      const input = tf.browser.fromPixels(canvas).toFloat().mul(metadata.scale).expandDims(0);
+      return (model.predict(input) as Tensor).squeeze();
+    });
+    const { values, indices } = tf.topk(probabilities, 3);
+    const [confidences, classIndices] = await Promise.all([values.data(), indices.data()]);
+    tf.dispose([probabilities, values, indices]);
+
+    const predictions: BreedPrediction[] = [];
+    for (let i = 0; i < confidences.length; i++) {
+      predictions.push({
+        breed: metadata.class_names[classIndices[i]],
+        confidence: confidences[i],
+        percentage: Math.round(confidences[i] * 10000) / 100,
+      });
+    }
+
+    return {
+      model_name: metadata.model_name,
+      version: metadata.version,
+      predictions,
+      image_size: originalSize,
+      inference_ms: Math.round((performance.now() - start) * 100) / 100,
+    };
+  },
+
+  /**
+   * Present a local result like a server response, when the server is skipped
+   */
+  toResponse(local: LocalPrediction, file: File): PredictionResponse {
+    return {
+      success: true,
+      message: 'Résultat calculé dans le navigateur',
+      image_info: {
+        format: file.type,
+        mode: 'RGB',
+        size: local.image_size,
+        file_size: file.size,
+      },
+      model_predictions: { [local.model_name]: local.predictions },
+      aggregated_results: local.predictions.map((prediction) => ({ ...prediction, model_count: 1 })),
+      models_used: [local.model_name],
+      model_versions: { [local.model_name]: `${local.model_name}@client-${local.version}` },
+      prediction_sources: { [local.model_name]: 'client' },
+    };
+  },
+};
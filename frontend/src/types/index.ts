@@ -18,10 +18,30 @@ export interface ImageInfo {
 
 export interface PredictionResponse {
   success: boolean;
+  dog_detected?: boolean;
+  dog_score?: number | null;
+  image_hash?: string;
+  message?: string;
   image_info: ImageInfo;
   model_predictions: ModelPrediction;
   aggregated_results: BreedPrediction[];
   models_used: string[];
+  model_versions?: { [modelName: string]: string };
+  prediction_sources?: { [modelName: string]: 'server' | 'client' };
+  // 0 = all models, up to 3 = fastest model only when the server is overloaded
+  degradation_level?: number;
+  timings?: {
+    queue_wait_ms: number;
+    inference_ms: number;
+  };
+}
+
+export interface LocalPrediction {
+  model_name: string;
+  version: string;
+  predictions: BreedPrediction[];
+  image_size: [number, number];
+  inference_ms: number;
 }
 
 export interface ApiError {
@@ -35,6 +55,9 @@ export interface UploadedImage {
 
 export interface ModelInfo {
   loaded_models: string[];
+  model_versions?: { [modelName: string]: string };
+  // Web export version the local model must have for its results to be used (null: none)
+  client_model_versions?: { [modelName: string]: string | null };
   total_models: number;
   supported_breeds: number;
   image_size: [number, number];